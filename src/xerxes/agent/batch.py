@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from ..executor.command import APPROVAL_POLICIES
+from ..llm.base import BaseLLMProvider
+from .core import AsyncAgent
+
+ResultCallback = Callable[[dict[str, Any]], None]
+
+
+@dataclass
+class BatchTask:
+    id: str
+    prompt: str
+    approval: str | None = None
+    timeout: float | None = None
+
+
+def load_tasks(path: Path) -> list[BatchTask]:
+    with open(path, "r") as f:
+        data = yaml.safe_load(f) or []
+
+    if isinstance(data, dict):
+        data = data.get("tasks") or []
+    if not isinstance(data, list):
+        raise ValueError(f"{path} must contain a list of tasks")
+
+    tasks = []
+    for idx, entry in enumerate(data, 1):
+        if isinstance(entry, str):
+            entry = {"prompt": entry}
+        if not isinstance(entry, dict) or not entry.get("prompt"):
+            raise ValueError(f"Task {idx} in {path} has no prompt")
+        if entry.get("approval") not in (None, *APPROVAL_POLICIES):
+            raise ValueError(f"Task {idx} in {path} has unknown approval {entry['approval']!r}")
+
+        tasks.append(
+            BatchTask(
+                id=str(entry.get("id", idx)),
+                prompt=str(entry["prompt"]),
+                approval=entry.get("approval"),
+                timeout=entry.get("timeout"),
+            )
+        )
+
+    return tasks
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        llm: BaseLLMProvider,
+        workers: int = 4,
+        approval_policy: str = "readonly",
+        max_processes: int = 4,
+        timeout: float | None = None,
+        persist_sessions: bool = False,
+    ):
+        self.llm = llm
+        self.workers = max(1, workers)
+        self.approval_policy = approval_policy
+        self.max_processes = max(1, max_processes)
+        self.timeout = timeout
+        self.persist_sessions = persist_sessions
+
+    async def run(
+        self, tasks: list[BatchTask], on_result: ResultCallback | None = None
+    ) -> list[dict[str, Any]]:
+        task_slots = asyncio.Semaphore(self.workers)
+        run_slots = asyncio.Semaphore(self.max_processes)
+
+        async def run_bounded(task: BatchTask) -> dict[str, Any]:
+            async with task_slots:
+                result = await self._run_task(task, run_slots)
+
+            if on_result:
+                on_result(result)
+            return result
+
+        return await asyncio.gather(*(run_bounded(task) for task in tasks))
+
+    async def _run_task(self, task: BatchTask, run_slots: asyncio.Semaphore) -> dict[str, Any]:
+        agent = AsyncAgent(
+            llm=self.llm,
+            interactive=False,
+            approval_policy=task.approval or self.approval_policy,
+            persist_session=self.persist_sessions,
+        )
+        agent.executor.run_slots = run_slots
+        timeout = task.timeout if task.timeout is not None else self.timeout
+
+        started = time.perf_counter()
+        response = ""
+        error = None
+
+        try:
+            response = await asyncio.wait_for(agent.chat(task.prompt), timeout)
+            status = agent.turn_status
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except Exception as e:
+            status = "error"
+            error = str(e)
+        finally:
+            await asyncio.to_thread(agent.close)
+
+        result = {
+            "id": task.id,
+            "prompt": task.prompt,
+            "status": status,
+            "response": response,
+            "session": agent.session_id if agent.session.log else None,
+            "seconds": round(time.perf_counter() - started, 3),
+            "first_token_seconds": (
+                round(agent.last_ttft, 3) if agent.last_ttft is not None else None
+            ),
+            "usage": agent.turn_usage,
+        }
+        if error:
+            result["error"] = error
+        return result
@@ -0,0 +1,128 @@
+import json
+import re
+from typing import Any
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)|\x1b[@-Z\\-_]")
+
+CHARS_PER_TOKEN = 4
+
+TEXT_FIELDS = ("stdout", "stderr")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def strip_ansi(text: str) -> str:
+    return ANSI_ESCAPE.sub("", text)
+
+
+def collapse_repeats(text: str) -> str:
+    lines = text.split("\n")
+    collapsed = []
+    previous = None
+    repeats = 0
+
+    for line in lines:
+        if line == previous:
+            repeats += 1
+            continue
+
+        if repeats:
+            collapsed.append(f"[previous line repeated {repeats} more times]")
+        collapsed.append(line)
+        previous = line
+        repeats = 0
+
+    if repeats:
+        collapsed.append(f"[previous line repeated {repeats} more times]")
+
+    return "\n".join(collapsed)
+
+
+class ToolResultCompactor:
+    def __init__(self, token_budget: int = 4000):
+        self.token_budget = token_budget
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+        self.results_elided = 0
+
+    def compact(self, tool_results: list[dict[str, Any]]) -> str:
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+        self.results_elided = 0
+        per_result_budget = max(1, self.token_budget // max(1, len(tool_results)))
+
+        compacted = [self._compact_entry(entry, per_result_budget) for entry in tool_results]
+        return json.dumps(compacted, separators=(",", ":"), ensure_ascii=False)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "bytes_saved": self.bytes_saved,
+            "tokens_saved": self.tokens_saved,
+            "results_elided": self.results_elided,
+        }
+
+    def _compact_entry(self, entry: dict[str, Any], token_budget: int) -> dict[str, Any]:
+        result = entry.get("result")
+        if not isinstance(result, dict):
+            return entry
+
+        result = {key: value for key, value in result.items() if value not in ("", None)}
+        elided = {}
+
+        for field in TEXT_FIELDS:
+            text = result.get(field)
+            if not isinstance(text, str):
+                continue
+
+            original_chars = len(text)
+            text = collapse_repeats(strip_ansi(text))
+            budget = token_budget if field == "stdout" else max(1, token_budget // 4)
+            text, info = self._truncate(text, budget * CHARS_PER_TOKEN)
+
+            saved = max(0, original_chars - len(text))
+            self.bytes_saved += saved
+            self.tokens_saved += saved // CHARS_PER_TOKEN
+            result[field] = text
+            if info:
+                elided[field] = info
+
+        if elided:
+            self.results_elided += 1
+            result["elided"] = elided
+            if result.get("spooled"):
+                result["note"] = (
+                    "Output was compacted. Call output_query with handle "
+                    f"{result['spooled']['handle']} to read the elided parts."
+                )
+            else:
+                result["note"] = (
+                    "Output was compacted. Narrow the command (grep, head, tail, sed -n) "
+                    "to see the elided parts."
+                )
+
+        return {**entry, "result": result}
+
+    def _truncate(self, text: str, max_chars: int) -> tuple[str, dict[str, int] | None]:
+        if len(text) <= max_chars:
+            return text, None
+
+        head_chars = max_chars * 2 // 3
+        tail_chars = max_chars - head_chars
+
+        head = text[:head_chars]
+        cut = head.rfind("\n")
+        if cut > head_chars // 2:
+            head = head[:cut]
+
+        tail = text[len(text) - tail_chars :]
+        cut = tail.find("\n")
+        if 0 <= cut < tail_chars // 2:
+            tail = tail[cut + 1 :]
+
+        elided = text[len(head) : len(text) - len(tail)]
+        info = {"lines": elided.count("\n"), "bytes": len(elided.encode())}
+        marker = f"\n[... {info['lines']} lines ({info['bytes']} bytes) elided ...]\n"
+
+        return head + marker + tail, info
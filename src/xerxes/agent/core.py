@@ -1,26 +1,37 @@
-import json
+import asyncio
 import logging
 import os
 import platform
+import signal
 import sys
 import time
+import uuid
 import warnings
-from contextlib import contextmanager
+from collections.abc import AsyncIterator, Coroutine
+from contextlib import aclosing, contextmanager
+from typing import Any
 
 from rich.console import Console
 from rich.markdown import Markdown
 
 from ..config.settings import get_settings
 from ..executor.command import CommandExecutor
-from ..llm.vertex import VertexAIProvider
+from ..llm.base import BaseLLMProvider, StreamChunk, ToolCall, response_to_chunks
+from ..llm.factory import create_provider, provider_setup_hint
 from ..tools.registry import get_registry
-from ..ui.prompt import create_input_session, get_user_input
+from ..ui.prompt import create_input_session, get_user_input_async
+from ..ui.stream import StreamRenderer
+from ..utils.tracing import TOKEN_FIELDS, current_session, get_tracer
+from .compaction import ToolResultCompactor
 from .prompts import get_system_prompt
 from .session import ChatSession
+from .session_log import SessionLog, read_tail, session_path
+from .summarizer import HistorySummarizer
 
 warnings.filterwarnings("ignore")
 logging.getLogger("absl").setLevel(logging.CRITICAL)
 logging.getLogger("google").setLevel(logging.CRITICAL)
+logging.getLogger("grpc").setLevel(logging.CRITICAL)
 os.environ["GRPC_VERBOSITY"] = "NONE"
 os.environ["GLOG_minloglevel"] = "3"
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
@@ -43,29 +54,68 @@ def suppress_stderr():
 console = Console()
 
 
-class Agent:
-    def __init__(self):
+class AsyncAgent:
+    def __init__(
+        self,
+        llm: BaseLLMProvider | None = None,
+        interactive: bool = True,
+        approval_policy: str = "readonly",
+        session_id: str | None = None,
+        persist_session: bool | None = None,
+    ):
         self.settings = get_settings()
         self.registry = get_registry()
-        self.executor = CommandExecutor()
-        self.session = ChatSession()
+        self.executor = CommandExecutor(interactive=interactive, approval_policy=approval_policy)
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        if persist_session is None:
+            persist_session = self.settings.persist_sessions
+        log = SessionLog(session_path(self.session_id)) if persist_session else None
+        self.session = ChatSession(max_prompt_tokens=self.settings.max_prompt_tokens, log=log)
+        self.compactor = ToolResultCompactor(self.settings.tool_result_token_budget)
         self.last_interrupt_time = 0
+        self.last_ttft: float | None = None
+        self.last_usage: dict[str, int] | None = None
+        self.turn_usage: dict[str, int] = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.turn_status = "idle"
         self.os_type = platform.system()
+        self.tracer = get_tracer()
 
-        with suppress_stderr():
-            self.llm = VertexAIProvider(
-                project_id=self.settings.vertex_project_id,
-                location=self.settings.vertex_location,
-                model_name=self.settings.vertex_model,
-                credentials_path=self.settings.google_application_credentials,
-            )
+        self._owns_llm = llm is None
+        if llm is not None:
+            self.llm = llm
+        else:
+            with suppress_stderr():
+                self.llm = create_provider(self.settings)
+
+        if self.settings.summarize_history:
+            with suppress_stderr():
+                self.session.summarizer = HistorySummarizer(create_provider(self.settings))
 
-        self._initialize_session()
+        self._initialize_session(resume=session_id is not None)
 
-    def _initialize_session(self) -> None:
+    def _initialize_session(self, resume: bool = False) -> None:
         system_prompt = get_system_prompt(self.os_type)
         self.session.add_system_message(system_prompt)
 
+        if resume:
+            with self.tracer.span("agent.resume") as attrs:
+                messages = read_tail(session_path(self.session_id), self.session.max_prompt_tokens)
+                self.session.restore(messages)
+                attrs["messages"] = len(messages)
+
+    def close(self) -> None:
+        if self.session.summarizer:
+            self.session.summarizer.close()
+        if self.session.log:
+            self.session.log.close()
+        if self._owns_llm:
+            self.llm.close()
+
+    async def aclose(self) -> None:
+        if self._owns_llm:
+            await self.llm.aclose()
+        self.close()
+
     def _handle_interrupt(self) -> bool:
         current_time = time.time()
         time_since_last = current_time - self.last_interrupt_time
@@ -75,87 +125,260 @@ class Agent:
             return True
         return False
 
-    def chat(self, user_message: str) -> str:
+    def _refresh_settings(self) -> None:
+        settings = get_settings()
+        if settings is self.settings:
+            return
+
+        self.settings = settings
+        self.executor.update_settings(settings)
+        self.llm.invalidate_cache()
+        self.session.max_prompt_tokens = settings.max_prompt_tokens
+        self.compactor.token_budget = settings.tool_result_token_budget
+
+    async def chat(self, user_message: str) -> str:
+        current_session.set(self.session_id)
+        self._refresh_settings()
+        self.turn_usage = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.turn_status = "running"
         self.session.add_message("user", user_message)
-        tools = self.registry.get_function_schemas()
+        self.executor.loops.reset()
+        with self.tracer.span("agent.schemas"):
+            tools = self.registry.get_function_schemas()
 
-        max_iterations = 100
+        max_iterations = self.settings.max_iterations
         iteration = 0
 
         try:
             while iteration < max_iterations:
                 iteration += 1
 
-                with console.status("[cyan]Thinking... (Ctrl+C to cancel, twice to exit)", spinner="dots"):
-                    with suppress_stderr():
-                        response = self.llm.chat(
-                            messages=self.session.get_messages(),
-                            tools=tools if tools else None,
-                            max_tokens=self.settings.max_tokens,
-                            temperature=self.settings.temperature,
-                        )
+                content, tool_results, skipped = await self._run_iteration(tools)
 
-                if response.tool_calls:
-                    tool_results = []
-                    num_commands = len(response.tool_calls)
-                    any_skipped = False
+                if skipped:
+                    self.turn_status = "skipped"
+                    console.print("[yellow]Command skipped. Returning control to user.[/yellow]\n")
+                    return ""
 
-                    for idx, tool_call in enumerate(response.tool_calls, 1):
-                        if num_commands > 1:
-                            console.print(f"[cyan]Command {idx}/{num_commands}[/cyan]")
+                if tool_results:
+                    with self.tracer.span("agent.compact") as attrs:
+                        tool_results_message = self.compactor.compact(tool_results)
+                        attrs.update(self.compactor.stats())
+                    with self.tracer.span("agent.session"):
+                        self.session.add_tool_results(f"Tool results:\n{tool_results_message}")
 
-                        result = self.executor.execute_tool_call(
-                            tool_call.name, tool_call.arguments
-                        )
+                    if any(entry["result"].get("loop", {}).get("stop") for entry in tool_results):
+                        return self._stop_looping()
 
-                        if result.get("skipped"):
-                            any_skipped = True
-                            break
+                elif content:
+                    self.session.add_message("assistant", content)
+                    self.turn_status = "completed"
+                    self._print_turn_stats()
+                    return content
+
+                else:
+                    break
 
-                        tool_results.append(
-                            {
-                                "tool_call_id": tool_call.id,
-                                "function_name": tool_call.name,
-                                "result": result,
-                            }
-                        )
+            self.turn_status = "incomplete"
+            final_message = "I've completed the task or reached the maximum number of iterations."
+            console.print(Markdown(final_message))
+            return final_message
+        except KeyboardInterrupt:
+            self.turn_status = "cancelled"
+            self._print_cancelled()
+            return ""
+        except asyncio.CancelledError:
+            self.turn_status = "cancelled"
+            raise
+
+    def _print_cancelled(self) -> None:
+        console.print(
+            "\n[yellow]Execution cancelled. You can now provide additional context.[/yellow]\n"
+        )
+
+    async def _run_iteration(
+        self, tools: list[dict[str, Any]]
+    ) -> tuple[str, list[dict[str, Any]], bool]:
+        renderer = StreamRenderer(console, "[cyan]Thinking... (Ctrl+C to cancel, twice to exit)")
+        parallel = self.settings.parallel_tool_calls
+        content = ""
+        tool_results = []
+        deferred_calls: list[ToolCall] = []
+        started = time.perf_counter()
+        raw_estimate = self.session.raw_token_estimate()
+        self.last_ttft = None
+        self.last_usage = None
+
+        renderer.start()
+        try:
+            async with aclosing(self._request_chunks(tools)) as chunks:
+                async for chunk in chunks:
+                    if self.last_ttft is None and (chunk.text or chunk.tool_call):
+                        self.last_ttft = time.perf_counter() - started
 
-                    if any_skipped:
-                        console.print("[yellow]Command skipped. Returning control to user.[/yellow]\n")
-                        return ""
+                    if chunk.usage:
+                        self.last_usage = chunk.usage
 
-                    tool_results_message = json.dumps(tool_results, indent=2)
-                    self.session.add_message("user", f"Tool results:\n{tool_results_message}")
+                    if chunk.text:
+                        content += chunk.text
+                        with self.tracer.span("ui.render"):
+                            renderer.feed(chunk.text)
 
-                elif response.content:
-                    self.session.add_message("assistant", response.content)
-                    return response.content
+                    elif chunk.tool_call and parallel:
+                        deferred_calls.append(chunk.tool_call)
 
-                else:
-                    break
+                    elif chunk.tool_call:
+                        renderer.pause()
+                        tool_call = chunk.tool_call
 
-            return "I've completed the task or reached the maximum number of iterations."
-        except KeyboardInterrupt:
-            console.print("\n[yellow]Execution cancelled. You can now provide additional context.[/yellow]\n")
+                        if tool_results:
+                            console.print(f"[cyan]Command {len(tool_results) + 1}[/cyan]")
+
+                        with self.tracer.span("tool.execute"):
+                            result = await self._execute_tool_call(tool_call)
+
+                        if result.get("skipped"):
+                            return content, tool_results, True
+
+                        tool_results.append(self._tool_result(tool_call, result))
+                        renderer.start()
+        finally:
+            renderer.stop()
+
+        for field in TOKEN_FIELDS:
+            self.turn_usage[field] += (self.last_usage or {}).get(field, 0)
+
+        if self.last_usage and self.last_usage.get("prompt_tokens"):
+            self.session.calibrate(self.last_usage["prompt_tokens"], raw_estimate)
+
+        if len(deferred_calls) == 1:
+            tool_call = deferred_calls[0]
+            with self.tracer.span("tool.execute"):
+                result = await self._execute_tool_call(tool_call)
+            if result.get("skipped"):
+                return content, tool_results, True
+            tool_results.append(self._tool_result(tool_call, result))
+
+        elif deferred_calls:
+            valid_calls = [tool_call for tool_call in deferred_calls if not tool_call.error]
+            with self.tracer.span("tool.execute"):
+                executed = iter(await self.executor.aexecute_tool_calls(
+                    [(tool_call.name, tool_call.arguments) for tool_call in valid_calls]
+                ))
+            results = [
+                self._invalid_call_result(tool_call) if tool_call.error else next(executed)
+                for tool_call in deferred_calls
+            ]
+            if any(result.get("skipped") for result in results):
+                return content, tool_results, True
+            tool_results.extend(
+                self._tool_result(tool_call, result)
+                for tool_call, result in zip(deferred_calls, results)
+            )
+
+        return content, tool_results, False
+
+    def _stop_looping(self) -> str:
+        self.turn_status = "looping"
+        message = (
+            "I stopped because I kept repeating the same commands with the same results. "
+            "Please check the last output or give me more context on how to proceed."
+        )
+        self.session.add_message("assistant", message)
+        console.print(Markdown(message))
+        return message
+
+    def _print_turn_stats(self) -> None:
+        stats = []
+        if self.last_ttft is not None:
+            stats.append(f"First token in {self.last_ttft:.2f}s")
+        if self.turn_usage["prompt_tokens"]:
+            prompt = f"{self.turn_usage['prompt_tokens']:,} prompt tokens"
+            if self.turn_usage["cached_tokens"]:
+                prompt += f" ({self.turn_usage['cached_tokens']:,} from context cache)"
+            stats.append(prompt)
+        if stats:
+            console.print(f"[dim]{' · '.join(stats)}[/dim]")
+
+    async def _execute_tool_call(self, tool_call: ToolCall) -> dict[str, Any]:
+        if tool_call.error:
+            return self._invalid_call_result(tool_call)
+        return await self.executor.aexecute_tool_call(tool_call.name, tool_call.arguments)
+
+    def _invalid_call_result(self, tool_call: ToolCall) -> dict[str, Any]:
+        console.print(f"[red]{tool_call.error}[/red]")
+        return {"success": False, "error": tool_call.error}
+
+    def _tool_result(self, tool_call: ToolCall, result: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "tool_call_id": tool_call.id,
+            "function_name": tool_call.name,
+            "result": result,
+        }
+
+    async def _request_chunks(self, tools: list[dict[str, Any]]) -> AsyncIterator[StreamChunk]:
+        request = {
+            "messages": self.session.get_messages(),
+            "tools": tools if tools else None,
+            "max_tokens": self.settings.max_tokens,
+            "temperature": self.settings.temperature,
+        }
+
+        if not self.settings.stream_responses:
+            with self.tracer.span("llm.request"):
+                response = await self.llm.achat(**request)
+            for chunk in response_to_chunks(response):
+                yield chunk
+            return
+
+        waited = 0.0
+        try:
+            async with aclosing(self.llm.astream_chat(**request)) as stream:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        chunk = await anext(stream)
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        waited += time.perf_counter() - started
+                    yield chunk
+        finally:
+            self.tracer.record("llm.request", waited)
+
+    async def _run_cancellable(self, coro: Coroutine[Any, Any, str]) -> str:
+        task = asyncio.ensure_future(coro)
+        loop = asyncio.get_running_loop()
+
+        try:
+            loop.add_signal_handler(signal.SIGINT, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            return await task
+
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            self._print_cancelled()
             return ""
+        finally:
+            loop.remove_signal_handler(signal.SIGINT)
 
-    def run_interactive(self) -> None:
+    async def run_interactive(self) -> None:
         shell_name = "PowerShell" if self.os_type == "Windows" else "Bash"
         console.print(f"[cyan]OS:[/cyan] {self.os_type} | [cyan]Shell:[/cyan] {shell_name}")
         console.print("Type your requests or 'exit' to quit\n")
 
         if not self.llm.is_available():
-            console.print(
-                "[red]Error: Vertex AI not properly configured. "
-                "Please set vertex_project_id and ensure authentication is set up.[/red]"
-            )
+            console.print(f"[red]Error: {provider_setup_hint(self.llm.name)}[/red]")
             return
 
         prompt_session = create_input_session()
 
         while True:
             try:
-                user_input = get_user_input(prompt_session)
+                user_input = await get_user_input_async(prompt_session)
 
                 if not user_input.strip():
                     continue
@@ -166,8 +389,7 @@ class Agent:
 
                 console.print()
 
-                response = self.chat(user_input)
-                console.print(Markdown(response))
+                await self._run_cancellable(self.chat(user_input))
                 console.print()
 
             except KeyboardInterrupt:
@@ -183,3 +405,41 @@ class Agent:
                 break
             except Exception as e:
                 console.print(f"\n[red]Error: {str(e)}[/red]\n")
+
+
+class Agent:
+    def __init__(
+        self,
+        llm: BaseLLMProvider | None = None,
+        interactive: bool = True,
+        approval_policy: str = "readonly",
+        session_id: str | None = None,
+        persist_session: bool | None = None,
+    ):
+        self._loop = asyncio.new_event_loop()
+        self.agent = AsyncAgent(
+            llm=llm,
+            interactive=interactive,
+            approval_policy=approval_policy,
+            session_id=session_id,
+            persist_session=persist_session,
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.agent, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in ("_loop", "agent"):
+            super().__setattr__(name, value)
+        else:
+            setattr(self.agent, name, value)
+
+    def chat(self, user_message: str) -> str:
+        return self._loop.run_until_complete(self.agent.chat(user_message))
+
+    def run_interactive(self) -> None:
+        self._loop.run_until_complete(self.agent.run_interactive())
+
+    def close(self) -> None:
+        self._loop.run_until_complete(self.agent.aclose())
+        self._loop.close()
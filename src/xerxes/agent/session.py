@@ -1,24 +1,72 @@
 from ..llm.base import Message
+from .compaction import estimate_tokens
+from .session_log import SessionLog
+from .summarizer import HistorySummarizer
+
+TOOL_RESULT = "tool_result"
+EVICTED = "evicted"
+SUMMARY = "summary"
+
+SUMMARIZE_AT = 0.8
+SUMMARY_KEEP = 0.5
+
+EVICTED_PLACEHOLDER = "Tool results: [evicted from history to stay within the context budget]"
 
 
 class ChatSession:
-    def __init__(self, max_history: int = 20):
+    def __init__(
+        self,
+        max_prompt_tokens: int = 100_000,
+        log: SessionLog | None = None,
+        summarizer: HistorySummarizer | None = None,
+    ):
         self.messages: list[Message] = []
-        self.max_history = max_history
+        self.max_prompt_tokens = max_prompt_tokens
+        self.token_ratio = 1.0
+        self.log = log
+        self.summarizer = summarizer
+        self._summary_boundary: Message | None = None
+        self._raw_tokens = 0
+        self._evict_from = 0
 
-    def add_message(self, role: str, content: str) -> None:
-        self.messages.append(Message(role=role, content=content))
+    def add_message(self, role: str, content: str, kind: str | None = None) -> None:
+        self._apply_summary()
+        self.messages.append(Message(role=role, content=content, kind=kind))
+        self._raw_tokens += estimate_tokens(content)
+        if self.log:
+            record = {"role": role, "content": content}
+            if kind:
+                record["kind"] = kind
+            self.log.append(record)
         self._trim_history()
+        self._request_summary()
+
+    def add_tool_results(self, content: str) -> None:
+        self.add_message("user", content, kind=TOOL_RESULT)
 
     def add_system_message(self, content: str) -> None:
         if self.messages and self.messages[0].role == "system":
+            self._raw_tokens -= estimate_tokens(self.messages[0].content)
             self.messages[0] = Message(role="system", content=content)
         else:
             self.messages.insert(0, Message(role="system", content=content))
+        self._raw_tokens += estimate_tokens(content)
 
     def get_messages(self) -> list[Message]:
+        self._apply_summary()
         return self.messages
 
+    def restore(self, messages: list[Message]) -> None:
+        start = 0
+        while start < len(messages) and (
+            messages[start].role != "user" or messages[start].kind not in (None, SUMMARY)
+        ):
+            start += 1
+
+        self.messages[self._first_trimmable_index() :] = messages[start:]
+        self._recount_tokens()
+        self._trim_history()
+
     def clear(self) -> None:
         system_msg = None
         if self.messages and self.messages[0].role == "system":
@@ -27,21 +75,121 @@ class ChatSession:
         self.messages = []
         if system_msg:
             self.messages.append(system_msg)
+        self._recount_tokens()
+        if self.summarizer:
+            self.summarizer.discard()
+        self._summary_boundary = None
+        if self.log:
+            self.log.append({"op": "clear"})
+
+    def raw_token_estimate(self) -> int:
+        return self._raw_tokens
+
+    def token_estimate(self) -> int:
+        return int(self.raw_token_estimate() * self.token_ratio)
+
+    def calibrate(self, prompt_tokens: int, raw_estimate: int) -> None:
+        if prompt_tokens <= 0 or raw_estimate <= 0:
+            return
+
+        observed = min(4.0, max(0.25, prompt_tokens / raw_estimate))
+        self.token_ratio = 0.5 * self.token_ratio + 0.5 * observed
+        self._trim_history()
+
+    def _recount_tokens(self) -> None:
+        self._raw_tokens = sum(estimate_tokens(msg.content) for msg in self.messages)
+        self._evict_from = 0
 
     def _trim_history(self) -> None:
-        if len(self.messages) <= self.max_history:
+        while self.token_estimate() > self.max_prompt_tokens:
+            if not self._evict_oldest_tool_result() and not self._drop_oldest_message():
+                return
+
+    def _history_start(self) -> int:
+        return 1 if self.messages and self.messages[0].role == "system" else 0
+
+    def _first_trimmable_index(self) -> int:
+        start = self._history_start()
+        if start < len(self.messages) and self.messages[start].kind == SUMMARY:
+            return start + 1
+        return start
+
+    def _request_summary(self) -> None:
+        if not self.summarizer or self.summarizer.pending:
+            return
+        if self.token_estimate() < SUMMARIZE_AT * self.max_prompt_tokens:
             return
 
-        system_msg = None
-        if self.messages and self.messages[0].role == "system":
-            system_msg = self.messages[0]
-            remaining = self.messages[1:]
-        else:
-            remaining = self.messages
+        start = self._history_start()
+        keep_budget = SUMMARY_KEEP * self.max_prompt_tokens / self.token_ratio
+        kept = 0
+        end = None
 
-        trimmed = remaining[-(self.max_history - 1) :]
+        for idx in range(len(self.messages) - 1, start + 1, -1):
+            kept += estimate_tokens(self.messages[idx].content)
+            if kept > keep_budget:
+                break
+            if self.messages[idx].role == "user" and self.messages[idx].kind is None:
+                end = idx
 
-        self.messages = []
-        if system_msg:
-            self.messages.append(system_msg)
-        self.messages.extend(trimmed)
+        if end is None:
+            return
+
+        self._summary_boundary = self.messages[end]
+        self.summarizer.submit(self.messages[start:end])
+
+    def _apply_summary(self) -> None:
+        if not self.summarizer or self._summary_boundary is None:
+            return
+
+        summary = self.summarizer.collect()
+        if summary is None:
+            if not self.summarizer.pending:
+                self._summary_boundary = None
+            return
+
+        start = self._history_start()
+        boundary, self._summary_boundary = self._summary_boundary, None
+        end = next(
+            (idx for idx in range(start, len(self.messages)) if self.messages[idx] is boundary),
+            None,
+        )
+        if end is None:
+            return
+
+        self.messages = [
+            *self.messages[:start],
+            Message(role="user", content=summary, kind=SUMMARY),
+            *self.messages[end:],
+        ]
+        self._recount_tokens()
+        if self.log:
+            kept = len(self.messages) - start - 1
+            self.log.append({"op": "summary", "content": summary, "kept": kept})
+        self._trim_history()
+
+    def _evict_oldest_tool_result(self) -> bool:
+        start = max(self._first_trimmable_index(), self._evict_from)
+        for idx in range(start, len(self.messages) - 1):
+            msg = self.messages[idx]
+            if msg.kind == TOOL_RESULT:
+                self.messages[idx] = Message(role=msg.role, content=EVICTED_PLACEHOLDER, kind=EVICTED)
+                self._raw_tokens += estimate_tokens(EVICTED_PLACEHOLDER) - estimate_tokens(msg.content)
+                self._evict_from = idx + 1
+                return True
+
+        self._evict_from = max(start, len(self.messages) - 1)
+        return False
+
+    def _drop_oldest_message(self) -> bool:
+        idx = self._first_trimmable_index()
+        if idx >= len(self.messages) - 1:
+            return False
+
+        dropped = 1
+        self._raw_tokens -= estimate_tokens(self.messages.pop(idx).content)
+        while idx < len(self.messages) - 1 and self.messages[idx].role == "assistant":
+            self._raw_tokens -= estimate_tokens(self.messages.pop(idx).content)
+            dropped += 1
+        self._evict_from = max(idx, self._evict_from - dropped)
+        return True
@@ -0,0 +1,161 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from ..config.settings import Settings
+from ..llm.base import Message
+from .compaction import estimate_tokens
+
+FSYNC_INTERVAL = 1.0
+READ_BLOCK = 64 * 1024
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_CLOSE = object()
+
+
+def session_path(session_id: str) -> Path:
+    if not SESSION_ID.match(session_id):
+        raise ValueError(f"Invalid session id: {session_id}")
+    return Settings.get_sessions_dir() / f"{session_id}.jsonl"
+
+
+def latest_session() -> str | None:
+    logs = list(Settings.get_sessions_dir().glob("*.jsonl"))
+    if not logs:
+        return None
+    return max(logs, key=lambda path: path.stat().st_mtime).stem
+
+
+class SessionLog:
+    def __init__(self, path: Path, fsync_interval: float = FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.records = 0
+        self.syncs = 0
+        self.error: OSError | None = None
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+
+    def append(self, record: dict[str, Any]) -> None:
+        if self.error is not None:
+            return
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+        self.records += 1
+        self._queue.put({"ts": round(time.time(), 3), **record})
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        try:
+            self._write()
+        except OSError as e:
+            self.error = e
+
+    def _write(self) -> None:
+        is_new = not self.path.exists()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+        with open(fd, "a", encoding="utf-8") as f:
+            if is_new:
+                header = {"session": self.path.stem, "ts": round(time.time(), 3)}
+                f.write(json.dumps({**header, "cwd": os.getcwd()}) + "\n")
+
+            synced = time.monotonic()
+            dirty = is_new
+            closing = False
+
+            while not closing:
+                try:
+                    batch = [self._queue.get(timeout=self.fsync_interval if dirty else None)]
+                except queue.Empty:
+                    batch = []
+                while not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+
+                closing = _CLOSE in batch
+                lines = [
+                    json.dumps(record, ensure_ascii=False) + "\n"
+                    for record in batch
+                    if record is not _CLOSE
+                ]
+                if lines:
+                    f.write("".join(lines))
+                    f.flush()
+                    dirty = True
+
+                if dirty and (closing or time.monotonic() - synced >= self.fsync_interval):
+                    os.fsync(f.fileno())
+                    self.syncs += 1
+                    synced = time.monotonic()
+                    dirty = False
+
+
+def read_tail(path: Path, max_tokens: int) -> list[Message]:
+    messages = []
+    tokens = 0
+    summary = None
+    remaining = None
+
+    for line in _reverse_lines(path):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+        if record.get("op") == "clear" or remaining == 0:
+            break
+        if record.get("op") == "summary" and summary is None:
+            summary = Message(role="user", content=record["content"], kind="summary")
+            remaining = record.get("kept", 0)
+            tokens += estimate_tokens(summary.content)
+            continue
+        if "role" not in record:
+            continue
+        if remaining is not None:
+            remaining -= 1
+
+        content = record["content"]
+        messages.append(Message(role=record["role"], content=content, kind=record.get("kind")))
+        tokens += estimate_tokens(content)
+        if tokens >= max_tokens:
+            break
+
+    if summary is not None:
+        messages.append(summary)
+    messages.reverse()
+    return messages
+
+
+def _reverse_lines(path: Path) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        remainder = b""
+
+        while position > 0:
+            size = min(READ_BLOCK, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+
+        if remainder:
+            yield remainder
@@ -0,0 +1,94 @@
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from ..llm.base import BaseLLMProvider, Message
+from ..utils.tracing import get_tracer
+
+SUMMARY_PROMPT = """You are compacting the older part of a conversation between a user and a DevOps agent that runs shell commands. The messages below are about to be removed from the agent's context.
+
+Write the facts the agent still needs to continue without re-running discovery commands:
+- exact names it found: files and paths, pods, deployments, namespaces, containers, hosts, branches, ids, ports, versions
+- what the user asked for and what is still open
+- commands that worked, commands that failed and why, and anything already changed on the system
+
+Use terse bullet points, keep names verbatim, and stay under 300 words. Do not add advice or anything that is not in the messages."""
+
+SUMMARY_HEADER = "Facts so far (summary of earlier conversation):"
+
+
+class HistorySummarizer:
+    def __init__(
+        self,
+        llm: BaseLLMProvider,
+        max_tokens: int = 1024,
+        max_message_chars: int = 4000,
+    ):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.max_message_chars = max_message_chars
+        self.summaries = 0
+        self.failures = 0
+        self.tracer = get_tracer()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="xerxes-summary")
+        self._future: Future[str] | None = None
+
+    @property
+    def pending(self) -> bool:
+        return self._future is not None
+
+    def submit(self, messages: list[Message]) -> None:
+        transcript = self._transcript(messages)
+        context = contextvars.copy_context()
+        self._future = self._executor.submit(context.run, self._summarize, transcript)
+
+    def collect(self) -> str | None:
+        future = self._future
+        if future is None or not future.done():
+            return None
+
+        self._future = None
+        try:
+            summary = future.result()
+        except Exception:
+            self.failures += 1
+            return None
+
+        self.summaries += 1
+        return f"{SUMMARY_HEADER}\n{summary}"
+
+    def discard(self) -> None:
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def close(self) -> None:
+        self.discard()
+        self._executor.shutdown(wait=False)
+        self.llm.close()
+
+    def _summarize(self, transcript: str) -> str:
+        with self.tracer.span("llm.summarize", chars=len(transcript)) as attrs:
+            response = self.llm.chat(
+                [
+                    Message(role="system", content=SUMMARY_PROMPT),
+                    Message(role="user", content=transcript),
+                ],
+                max_tokens=self.max_tokens,
+                temperature=0.0,
+            )
+            attrs.update(response.usage or {})
+
+        summary = (response.content or "").strip()
+        if not summary:
+            raise ValueError("Summary response was empty")
+        return summary
+
+    def _transcript(self, messages: list[Message]) -> str:
+        parts = []
+        for msg in messages:
+            content = msg.content
+            if len(content) > self.max_message_chars:
+                half = self.max_message_chars // 2
+                content = f"{content[:half]}\n[...]\n{content[-half:]}"
+            parts.append(f"[{msg.kind or msg.role}]\n{content}")
+        return "\n\n".join(parts)
@@ -1,42 +1,204 @@
 import os
 import sys
+from contextlib import contextmanager
+from pathlib import Path
 
 os.environ["GRPC_VERBOSITY"] = "ERROR"
 os.environ["GRPC_TRACE"] = ""
 os.environ["GLOG_minloglevel"] = "3"
 
-stderr_fileno = sys.stderr.fileno()
-old_stderr = os.dup(stderr_fileno)
-devnull = os.open(os.devnull, os.O_WRONLY)
-os.dup2(devnull, stderr_fileno)
-
 import typer
 from rich.console import Console
 from rich.table import Table
 
-os.dup2(old_stderr, stderr_fileno)
-os.close(devnull)
-os.close(old_stderr)
-
-from .agent.core import Agent
-from .config.settings import get_settings
-from .tools.registry import register_tool
-from .tools.shell import ShellTool
-
 app = typer.Typer(help="Xerxes: CLI Agent")
 console = Console()
 
 
-def init_tools():
-    register_tool(ShellTool())
+@contextmanager
+def suppress_stderr():
+    stderr_fileno = sys.stderr.fileno()
+    old_stderr = os.dup(stderr_fileno)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, stderr_fileno)
+    try:
+        yield
+    finally:
+        os.dup2(old_stderr, stderr_fileno)
+        os.close(devnull)
+        os.close(old_stderr)
+
+
+def init_tools(persistent: bool | None = None):
+    from .config.settings import get_settings
+    from .tools.output_query import OutputQueryTool
+    from .tools.registry import register_tool
+    from .tools.shell import ShellTool
+    from .tools.spool import OutputSpool
+
+    settings = get_settings()
+    spool = None
+    if settings.spool_threshold_bytes > 0:
+        spool = OutputSpool(threshold=settings.spool_threshold_bytes)
+        register_tool(OutputQueryTool(spool))
+
+    register_tool(
+        ShellTool(
+            max_output_bytes=settings.max_output_bytes,
+            persistent=settings.persistent_shell if persistent is None else persistent,
+            cache_results=settings.cache_readonly_results,
+            spool=spool,
+        )
+    )
 
 
 @app.command()
-def chat():
+def chat(
+    resume: str = typer.Option(
+        None, "--resume", "-r", help="Continue a saved session by id, or 'last' for the most recent"
+    ),
+):
     """Start an interactive chat session with the DevOps agent"""
+    with suppress_stderr():
+        from .agent.core import Agent
+
+    from .agent.session_log import latest_session, session_path
+    from .config.settings import Settings, get_settings
+    from .utils.tracing import get_tracer
+
+    if resume == "last":
+        resume = latest_session()
+        if resume is None:
+            console.print("[red]Error: No saved sessions to resume[/red]")
+            raise typer.Exit(1)
+    if resume is not None:
+        try:
+            found = session_path(resume).exists()
+        except ValueError:
+            found = False
+        if not found:
+            console.print(f"[red]Error: Unknown session: {resume}[/red]")
+            raise typer.Exit(1)
+
     init_tools()
-    agent = Agent()
-    agent.run_interactive()
+    tracer = get_tracer()
+    if get_settings().trace_turns:
+        tracer.open(Settings.get_trace_file())
+
+    agent = None
+    try:
+        agent = Agent(session_id=resume)
+        if resume:
+            restored = len(agent.session.messages) - 1
+            console.print(f"[dim]Resumed session {resume} ({restored} messages)[/dim]")
+        agent.run_interactive()
+    finally:
+        if agent is not None:
+            agent.close()
+            if agent.session.log and agent.session.log.records:
+                console.print(
+                    f"[dim]Resume with: xerxes chat --resume {agent.session_id}[/dim]"
+                )
+        tracer.close()
+
+
+@app.command()
+def run(
+    tasks_file: Path = typer.Option(..., "--tasks", "-t", help="YAML file with the prompts to run"),
+    workers: int = typer.Option(4, "--workers", "-w", help="Tasks running at the same time"),
+    approval: str = typer.Option(
+        "readonly",
+        "--approval",
+        "-a",
+        help="Commands run without a prompt: readonly, safe (anything not destructive) or all",
+    ),
+    llm_concurrency: int = typer.Option(
+        None, "--llm-concurrency", help="Concurrent LLM calls (default: workers)"
+    ),
+    process_concurrency: int = typer.Option(
+        None, "--process-concurrency", help="Concurrent commands (default: max_parallel_tool_calls)"
+    ),
+    timeout: float = typer.Option(None, "--timeout", help="Seconds before a task is abandoned"),
+    output: Path = typer.Option(
+        None, "--output", "-o", help="Write JSON results here instead of stdout"
+    ),
+    save_sessions: bool = typer.Option(
+        False, "--save-sessions", help="Keep each task's session so it can be resumed"
+    ),
+):
+    """Run prompts from a task file headlessly and print one JSON result per task"""
+    import asyncio
+    import json
+
+    from .executor.command import APPROVAL_POLICIES
+
+    if approval not in APPROVAL_POLICIES:
+        console.print(f"[red]Unknown approval policy: {approval}[/red]")
+        console.print(f"Available policies: {', '.join(APPROVAL_POLICIES)}")
+        raise typer.Exit(1)
+
+    with suppress_stderr():
+        from .agent import core
+        from .agent.batch import BatchRunner, load_tasks
+        from .executor import command
+        from .llm.factory import create_provider, provider_setup_hint
+
+    from .config.settings import Settings, get_settings
+    from .utils.tracing import get_tracer
+
+    try:
+        tasks = load_tasks(tasks_file)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(1)
+
+    settings = get_settings()
+    init_tools(persistent=False)
+
+    core.console.quiet = True
+    command.console.quiet = True
+
+    llm = create_provider(settings, max_concurrency=llm_concurrency or workers)
+    if not llm.is_available():
+        console.print(f"[red]Error: {provider_setup_hint(llm.name)}[/red]")
+        raise typer.Exit(1)
+
+    runner = BatchRunner(
+        llm,
+        workers=workers,
+        approval_policy=approval,
+        max_processes=process_concurrency or settings.max_parallel_tool_calls,
+        timeout=timeout,
+        persist_sessions=save_sessions,
+    )
+
+    tracer = get_tracer()
+    if settings.trace_turns:
+        tracer.open(Settings.get_trace_file())
+
+    sink = open(output, "w") if output else sys.stdout
+
+    def write_result(result: dict) -> None:
+        sink.write(json.dumps(result) + "\n")
+        sink.flush()
+
+    async def run_batch() -> list[dict]:
+        try:
+            return await runner.run(tasks, on_result=write_result)
+        finally:
+            await llm.aclose()
+
+    try:
+        results = asyncio.run(run_batch())
+    finally:
+        llm.close()
+        tracer.close()
+        if output:
+            sink.close()
+
+    failed = [result for result in results if result["status"] != "completed"]
+    if failed:
+        raise typer.Exit(1)
 
 
 @app.command()
@@ -46,6 +208,8 @@ def config(
     value: str = typer.Argument(None, help="Config value"),
 ):
     """Manage configuration settings"""
+    from .config.settings import SECRET_SETTINGS, get_settings
+
     settings = get_settings()
 
     if action == "show":
@@ -53,6 +217,8 @@ def config(
         config_data = settings.model_dump(exclude_none=True)
 
         for k, v in config_data.items():
+            if k in SECRET_SETTINGS:
+                v = "********"
             console.print(f"[green]{k}:[/green] {v}")
 
         console.print()
@@ -64,7 +230,8 @@ def config(
 
         try:
             settings.update_setting(key, value)
-            console.print(f"[green]Set {key} = {value}[/green]")
+            shown = "********" if key in SECRET_SETTINGS else value
+            console.print(f"[green]Set {key} = {shown}[/green]")
         except ValueError as e:
             console.print(f"[red]Error: {e}[/red]")
             raise typer.Exit(1)
@@ -111,6 +278,67 @@ def tools():
     console.print(table)
 
 
+@app.command()
+def stats(
+    sessions: int = typer.Option(5, "--sessions", "-n", help="Number of recent sessions to show"),
+    session_id: str = typer.Option(None, "--session", "-s", help="Show a single session"),
+):
+    """Show per-session latency percentiles and token usage from the trace log"""
+    from datetime import datetime
+
+    from .config.settings import Settings
+    from .utils.tracing import TOKEN_FIELDS, load_trace, summarize_sessions
+
+    trace_file = Settings.get_trace_file()
+    rotated = trace_file.with_name(f"{trace_file.name}.1")
+    events = [
+        event for path in (rotated, trace_file) if path.exists() for event in load_trace(path)
+    ]
+
+    if not events:
+        console.print(f"[yellow]No traces recorded yet in {trace_file}[/yellow]")
+        raise typer.Exit()
+
+    summaries = summarize_sessions(events)
+    if session_id:
+        selected = [(sid, s) for sid, s in summaries.items() if sid.startswith(session_id)]
+    else:
+        selected = sorted(summaries.items(), key=lambda item: item[1]["started"])[-sessions:]
+
+    if not selected:
+        console.print(f"[red]No session matching {session_id}[/red]")
+        raise typer.Exit(1)
+
+    for sid, summary in selected:
+        started = datetime.fromtimestamp(summary["started"]).strftime("%Y-%m-%d %H:%M")
+        table = Table(title=f"Session {sid} ({started})")
+        table.add_column("Span", style="cyan")
+        table.add_column("Count", justify="right")
+        table.add_column("p50 ms", justify="right", style="green")
+        table.add_column("p95 ms", justify="right", style="yellow")
+        table.add_column("Total ms", justify="right")
+
+        for name, span in summary["spans"].items():
+            table.add_row(
+                name,
+                str(span["count"]),
+                f"{span['p50_ms']:.1f}",
+                f"{span['p95_ms']:.1f}",
+                f"{span['total_ms']:.1f}",
+            )
+
+        console.print(table)
+        tokens = ", ".join(f"{field}={summary['tokens'][field]:,}" for field in TOKEN_FIELDS)
+        console.print(f"[dim]Tokens: {tokens}[/dim]")
+        cache = summary["cache"]
+        if cache["hits"] or cache["misses"]:
+            console.print(
+                f"[dim]Result cache: {cache['hits']} hits, {cache['misses']} misses, "
+                f"{cache['flushes']} flushes[/dim]"
+            )
+        console.print()
+
+
 @app.command()
 def version():
     """Show version information"""
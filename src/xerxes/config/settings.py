@@ -1,9 +1,13 @@
+import os
+import threading
 from pathlib import Path
 
 import yaml
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+SECRET_SETTINGS = ("openai_api_key",)
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -13,13 +17,45 @@ class Settings(BaseSettings):
         extra="ignore",
     )
 
+    llm_provider: str = Field(default="vertex")
+
     vertex_project_id: str | None = Field(default=None)
     vertex_location: str = Field(default="us-central1")
     vertex_model: str = Field(default="gemini-2.0-flash-exp")
     google_application_credentials: str | None = Field(default=None)
 
+    openai_base_url: str = Field(default="https://api.openai.com/v1")
+    openai_api_key: str | None = Field(default=None)
+    openai_model: str = Field(default="gpt-4o-mini")
+    http_max_connections: int = Field(default=10)
+    http2: bool = Field(default=True)
+
     max_tokens: int = Field(default=3000)
     temperature: float = Field(default=0.4)
+    stream_responses: bool = Field(default=True)
+    parallel_tool_calls: bool = Field(default=False)
+    max_parallel_tool_calls: int = Field(default=4)
+    max_output_bytes: int = Field(default=1_000_000)
+    stream_command_output: bool = Field(default=True)
+    persistent_shell: bool = Field(default=False)
+    cache_readonly_results: bool = Field(default=True)
+    spool_threshold_bytes: int = Field(default=65536)
+    tool_result_token_budget: int = Field(default=4000)
+    max_prompt_tokens: int = Field(default=100_000)
+    summarize_history: bool = Field(default=False)
+    trace_turns: bool = Field(default=True)
+    persist_sessions: bool = Field(default=True)
+    llm_max_retries: int = Field(default=4)
+    llm_max_concurrency: int = Field(default=8)
+    llm_hedge_after_seconds: float = Field(default=0.0)
+    context_cache: bool = Field(default=False)
+    context_cache_ttl_seconds: int = Field(default=3600)
+
+    max_iterations: int = Field(default=100)
+    loop_window: int = Field(default=20)
+    loop_max_repeats: int = Field(default=3)
+    loop_max_cycles: int = Field(default=2)
+    loop_stop_after_warnings: int = Field(default=2)
 
     auto_execute_readonly: bool = Field(default=True)
     confirm_destructive: bool = Field(default=True)
@@ -27,13 +63,27 @@ class Settings(BaseSettings):
     @classmethod
     def get_config_dir(cls) -> Path:
         config_dir = Path.home() / ".xerxes"
-        config_dir.mkdir(exist_ok=True)
+        if config_dir not in _created_dirs:
+            config_dir.mkdir(exist_ok=True)
+            _created_dirs.add(config_dir)
         return config_dir
 
     @classmethod
     def get_config_file(cls) -> Path:
         return cls.get_config_dir() / "config.yaml"
 
+    @classmethod
+    def get_trace_file(cls) -> Path:
+        return cls.get_config_dir() / "traces.jsonl"
+
+    @classmethod
+    def get_sessions_dir(cls) -> Path:
+        sessions_dir = cls.get_config_dir() / "sessions"
+        if sessions_dir not in _created_dirs:
+            sessions_dir.mkdir(mode=0o700, exist_ok=True)
+            _created_dirs.add(sessions_dir)
+        return sessions_dir
+
     @classmethod
     def load_from_file(cls) -> "Settings":
         config_file = cls.get_config_file()
@@ -72,7 +122,45 @@ class Settings(BaseSettings):
 
         setattr(self, key, converted_value)
         self.save_to_file()
+        invalidate_settings()
+
+
+_created_dirs: set[Path] = set()
+_settings: Settings | None = None
+_settings_paths: tuple[str, ...] = ()
+_settings_sources: tuple[int | None, ...] | None = None
+_settings_lock = threading.Lock()
+
+
+def _mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _source_mtimes(paths: tuple[str, ...]) -> tuple[int | None, ...]:
+    return tuple(_mtime(path) for path in paths)
 
 
 def get_settings() -> Settings:
-    return Settings.load_from_file()
+    global _settings, _settings_paths, _settings_sources
+
+    if _settings is not None and _source_mtimes(_settings_paths) == _settings_sources:
+        return _settings
+
+    with _settings_lock:
+        paths = (str(Settings.get_config_file()), os.path.abspath(".env"))
+        sources = _source_mtimes(paths)
+        if _settings is None or paths != _settings_paths or sources != _settings_sources:
+            _settings = Settings.load_from_file()
+            _settings_paths = paths
+            _settings_sources = sources
+        return _settings
+
+
+def invalidate_settings() -> None:
+    global _settings_sources
+
+    with _settings_lock:
+        _settings_sources = None
@@ -1,74 +1,123 @@
+import asyncio
+from contextlib import nullcontext
+from dataclasses import dataclass
 from typing import Any
 
 from prompt_toolkit import Application
+from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.layout import Layout
 from prompt_toolkit.layout.containers import Window
 from prompt_toolkit.layout.controls import FormattedTextControl
 from rich.console import Console
 from rich.panel import Panel
 
-from ..config.settings import get_settings
+from ..config.settings import Settings, get_settings
+from ..tools.capture import OutputCallback
 from ..tools.registry import get_registry
+from ..tools.spool import SpooledOutput
 from ..ui.keybindings import create_command_preview_bindings, create_output_expansion_bindings
+from ..ui.output import LiveTail
+from ..ui.pager import LineIndex, Pager
+from ..utils.tracing import get_tracer
+from .loops import LoopDetector, call_key
+from .safety import MUTATING, READONLY, CommandClassification, classify_command
 
 console = Console()
 
+APPROVAL_POLICIES = ("readonly", "safe", "all")
+LOOP_SETTINGS = ("loop_window", "loop_max_repeats", "loop_max_cycles", "loop_stop_after_warnings")
+
+
+@dataclass
+class PreparedCall:
+    function_name: str
+    arguments: dict[str, Any]
+    full_command: str
+    reasoning: str
+    classification: CommandClassification
+
 
 class CommandExecutor:
-    def __init__(self, auto_approve_session: bool = False):
+    def __init__(
+        self,
+        auto_approve_session: bool = False,
+        interactive: bool = True,
+        approval_policy: str = "readonly",
+    ):
+        if approval_policy not in APPROVAL_POLICIES:
+            raise ValueError(f"Unknown approval policy: {approval_policy}")
+
         self.registry = get_registry()
         self.settings = get_settings()
         self.auto_approve_session = auto_approve_session
-        self.last_function_name: str | None = None
-        self.last_arguments: dict[str, Any] | None = None
+        self.interactive = interactive
+        self.approval_policy = approval_policy
+        self.run_slots: asyncio.Semaphore | None = None
+        self.tracer = get_tracer()
+        self.loops = self._create_loop_detector()
 
     def set_auto_approve(self, value: bool):
         self.auto_approve_session = value
 
+    def update_settings(self, settings: Settings) -> None:
+        previous, self.settings = self.settings, settings
+        if any(getattr(previous, name) != getattr(settings, name) for name in LOOP_SETTINGS):
+            self.loops = self._create_loop_detector()
+
+    def _create_loop_detector(self) -> LoopDetector:
+        return LoopDetector(
+            window=self.settings.loop_window,
+            max_repeats=self.settings.loop_max_repeats,
+            max_cycles=self.settings.loop_max_cycles,
+            stop_after=self.settings.loop_stop_after_warnings,
+        )
+
     def execute_tool_call(self, function_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        return asyncio.run(self.aexecute_tool_call(function_name, arguments))
+
+    def execute_tool_calls(self, tool_calls: list[tuple[str, dict[str, Any]]]) -> list[dict[str, Any]]:
+        return asyncio.run(self.aexecute_tool_calls(tool_calls))
+
+    async def aexecute_tool_call(self, function_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        with self.tracer.span("tool.call", tool=function_name) as attrs:
+            result = await self._execute_tool_call(function_name, arguments)
+            attrs.update(
+                success=result.get("success"),
+                exit_code=result.get("exit_code"),
+                cached=result.get("cached"),
+                skipped=result.get("skipped"),
+                denied=result.get("denied"),
+            )
+            return result
+
+    async def _execute_tool_call(self, function_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
         try:
-            if self._is_duplicate_command(function_name, arguments):
-                return {
-                    "success": False,
-                    "error": "This command was just executed. The task is likely already complete. Please verify the state or try a different approach.",
-                    "duplicate": True,
-                }
+            if self.loops.is_duplicate(function_name, arguments):
+                return self._check_loop(function_name, arguments, self._duplicate_result())
 
-            command = arguments.get("command", "")
-            reasoning = arguments.get("reasoning", "")
+            call = self._prepare_call(function_name, arguments)
 
-            tool_name = function_name.replace("_execute", "")
-            cli_command = self._get_cli_command(tool_name)
-            full_command = f"{cli_command} {command}" if cli_command else command
+            if self._needs_approval(call):
+                if self._policy_denies(call):
+                    return self._check_loop(function_name, arguments, self._deny(call))
 
-            if not self.auto_approve_session:
-                approval = self._show_command_preview(full_command, reasoning)
+                approval = await self._show_command_preview(call)
 
                 if approval == "skip":
-                    return {
-                        "success": False,
-                        "error": "Command skipped by user",
-                        "skipped": True,
-                    }
+                    return self._skipped_result()
                 elif approval == "always":
-                    self.auto_approve_session = True
-                    console.print("[green]Auto-approve enabled for this session[/green]\n")
+                    self._enable_auto_approve()
 
-            console.print(f"[cyan]Executing:[/cyan] {full_command}\n")
+            console.print(f"[cyan]Executing:[/cyan] {call.full_command}\n")
 
-            result = self.registry.execute_function(function_name, arguments)
-
-            self.last_function_name = function_name
-            self.last_arguments = arguments
-
-            if result.get("success"):
-                if result.get("stdout"):
-                    self._show_output(result["stdout"], "Output")
+            if self.settings.stream_command_output:
+                with LiveTail(console, f"Running: {call.full_command}") as tail:
+                    result = await self._run_call(call, on_output=tail.feed)
             else:
-                if result.get("stderr"):
-                    console.print(
-                        Panel(result["stderr"], title="Error", border_style="red")
-                    )
+                result = await self._run_call(call)
+
+            result = self._check_loop(function_name, arguments, result)
+            await self._report_result(call, result)
 
             return result
 
@@ -77,32 +126,197 @@ class CommandExecutor:
             console.print(f"[red]{error_msg}[/red]")
             return {"success": False, "error": error_msg}
 
-    def _is_duplicate_command(self, function_name: str, arguments: dict[str, Any]) -> bool:
-        if self.last_function_name is None or self.last_arguments is None:
-            return False
+    async def aexecute_tool_calls(
+        self, tool_calls: list[tuple[str, dict[str, Any]]]
+    ) -> list[dict[str, Any]]:
+        results: list[dict[str, Any] | None] = [None] * len(tool_calls)
+        pending: list[tuple[int, PreparedCall]] = []
+        seen = {self.loops.last_call}
+
+        for idx, (function_name, arguments) in enumerate(tool_calls):
+            key = call_key(function_name, arguments)
+            if key in seen:
+                results[idx] = self._duplicate_result()
+                continue
+            seen.add(key)
+
+            call = self._prepare_call(function_name, arguments)
+            if self._needs_approval(call) and self._policy_denies(call):
+                results[idx] = self._deny(call)
+                continue
+            pending.append((idx, call))
+
+        if any(self._needs_approval(call) for _, call in pending):
+            approval = await self._show_batch_preview([call for _, call in pending])
+
+            if approval == "skip":
+                return [self._skipped_result() for _ in tool_calls]
+            elif approval == "always":
+                self._enable_auto_approve()
+
+        for _, call in pending:
+            console.print(f"[cyan]Executing:[/cyan] {call.full_command}")
+        console.print()
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.max_parallel_tool_calls))
+
+        async def run_bounded(call: PreparedCall) -> dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self._run_call(call)
+                except Exception as e:
+                    return {
+                        "success": False,
+                        "error": f"Error executing {call.function_name}: {str(e)}",
+                    }
 
-        return (
-            self.last_function_name == function_name
-            and self.last_arguments == arguments
+        completed = await asyncio.gather(*(run_bounded(call) for _, call in pending))
+
+        for position, ((idx, call), result) in enumerate(zip(pending, completed), 1):
+            results[idx] = result
+            console.print(f"[cyan]Command {position}/{len(pending)}:[/cyan] {call.full_command}")
+            await self._report_result(call, result)
+
+        return [
+            self._check_loop(function_name, arguments, result)
+            for (function_name, arguments), result in zip(tool_calls, results)
+        ]
+
+    def _prepare_call(self, function_name: str, arguments: dict[str, Any]) -> PreparedCall:
+        command = arguments.get("command", "")
+        tool = self.registry.get_tool(function_name.replace("_execute", ""))
+        cli_command = tool.cli_command if tool else None
+        full_command = f"{cli_command} {command}" if cli_command else command
+
+        if tool is not None and tool.readonly:
+            full_command = " ".join(
+                [tool.cli_command]
+                + [f"{key}={value}" for key, value in arguments.items() if key != "reasoning"]
+            )
+            classification = CommandClassification(READONLY)
+        elif cli_command == "powershell":
+            classification = CommandClassification(MUTATING)
+        else:
+            classification = classify_command(command if cli_command == "bash" else full_command)
+
+        return PreparedCall(
+            function_name=function_name,
+            arguments=arguments,
+            full_command=full_command,
+            reasoning=arguments.get("reasoning", ""),
+            classification=classification,
         )
 
-    def _get_cli_command(self, tool_name: str) -> str | None:
-        tool = self.registry.get_tool(tool_name)
-        return tool.cli_command if tool else None
+    def _needs_approval(self, call: PreparedCall) -> bool:
+        if call.classification.is_destructive and self.settings.confirm_destructive:
+            return True
+        if self.auto_approve_session:
+            return False
+        return not (call.classification.is_readonly and self.settings.auto_execute_readonly)
+
+    async def _run_call(
+        self, call: PreparedCall, on_output: OutputCallback | None = None
+    ) -> dict[str, Any]:
+        async with self.run_slots or nullcontext():
+            with self.tracer.span("tool.run"):
+                return await self.registry.aexecute_function(
+                    call.function_name, call.arguments, on_output=on_output
+                )
+
+    async def _report_result(self, call: PreparedCall, result: dict[str, Any]) -> None:
+        with self.tracer.span("ui.output"):
+            await self._print_result(call, result)
+
+    async def _print_result(self, call: PreparedCall, result: dict[str, Any]) -> None:
+        if result.get("cached"):
+            console.print(f"[dim]Reused result from {result['cache_age_seconds']}s ago[/dim]")
+
+        if result.get("success"):
+            if result.get("stdout"):
+                spooled = self._spooled_output(call, result)
+                await self._show_output(result["stdout"], "Output", spooled)
+        elif result.get("stderr"):
+            console.print(Panel(result["stderr"], title="Error", border_style="red"))
+        elif result.get("error"):
+            console.print(f"[red]{result['error']}[/red]")
+
+    def _enable_auto_approve(self) -> None:
+        self.auto_approve_session = True
+        console.print("[green]Auto-approve enabled for this session[/green]\n")
+
+    def _duplicate_result(self) -> dict[str, Any]:
+        return {
+            "success": False,
+            "error": "This command was just executed. The task is likely already complete. Please verify the state or try a different approach.",
+            "duplicate": True,
+        }
+
+    def _deny(self, call: PreparedCall) -> dict[str, Any]:
+        risk = call.classification.risk
+        console.print(f"[yellow]Denied by policy ({risk}):[/yellow] {call.full_command}")
+        return {
+            "success": False,
+            "error": (
+                f"Denied by policy: {risk}. The '{self.approval_policy}' approval policy does not "
+                f"run {risk} commands without a user, so try a different approach."
+            ),
+            "denied": True,
+        }
+
+    def _skipped_result(self) -> dict[str, Any]:
+        return {
+            "success": False,
+            "error": "Command skipped by user",
+            "skipped": True,
+        }
+
+    def _check_loop(
+        self, function_name: str, arguments: dict[str, Any], result: dict[str, Any]
+    ) -> dict[str, Any]:
+        loop = self.loops.record(function_name, arguments, result)
+        if loop is None:
+            return result
+
+        self.tracer.record("tool.loop", 0.0, detected=loop["detected"], stop=loop["stop"])
+        console.print(f"[yellow]Loop detected: {loop['hint']}[/yellow]")
+        return {**result, "loop": loop}
+
+    def _spooled_output(self, call: PreparedCall, result: dict[str, Any]) -> SpooledOutput | None:
+        tool = self.registry.find_tool(call.function_name)
+        if not result.get("spooled") or tool is None or tool.spool is None:
+            return None
+        return tool.spool.get(result["spooled"]["handle"])
+
+    async def _show_output(
+        self, output: str, title: str, spooled: SpooledOutput | None = None
+    ) -> None:
+        if spooled is not None:
+            total_lines, size = spooled.lines, spooled.size
+        else:
+            total_lines, size = output.count("\n") + 1, len(output)
+
+        with self.tracer.span("ui.show_output", lines=total_lines, bytes=size) as attrs:
+            attrs["expanded"] = await self._render_output(output, title, total_lines, size, spooled)
 
-    def _show_output(self, output: str, title: str) -> None:
-        lines = output.split('\n')
-        total_lines = len(lines)
-        output_size_kb = len(output) / 1024
+    async def _render_output(
+        self,
+        output: str,
+        title: str,
+        total_lines: int,
+        size: int,
+        spooled: SpooledOutput | None = None,
+    ) -> bool:
+        output_size_kb = size / 1024
 
         if total_lines <= 20:
             console.print(Panel(output, title=title, border_style="green"))
+            return False
         else:
-            preview_lines = lines[:10] + [
+            preview_lines = output.split("\n", 10)[:10] + [
                 "",
                 f"[dim]... ({total_lines - 15} lines hidden, {output_size_kb:.1f} KB total) ...[/dim]",
                 ""
-            ] + lines[-5:]
+            ] + output.rsplit("\n", 5)[-5:]
             preview = '\n'.join(preview_lines)
 
             console.print(Panel(
@@ -111,34 +325,96 @@ class CommandExecutor:
                 border_style="green"
             ))
 
-            console.print("\n[dim]Press [bold cyan]Ctrl+O[/bold cyan] to expand full output, [bold green]Enter[/bold green] to continue[/dim]")
+            if not self.interactive:
+                console.print()
+                return False
 
-            bindings, state = create_output_expansion_bindings()
-            layout = Layout(Window(FormattedTextControl(text="")))
-            app = Application(layout=layout, key_bindings=bindings, full_screen=False)
+            console.print("\n[dim]Press [bold cyan]Ctrl+O[/bold cyan] to page through full output, [bold green]Enter[/bold green] to continue[/dim]")
 
-            app.run()
+            bindings, state = create_output_expansion_bindings()
+            await self._wait_for_keys(bindings)
 
             if state["expand"]:
-                console.print(Panel(output, title=f"{title} (full)", border_style="cyan"))
+                await self._page_output(output, f"{title} ({total_lines} lines)", spooled)
 
             console.print()
+            return state["expand"]
+
+    async def _page_output(self, output: str, title: str, spooled: SpooledOutput | None) -> None:
+        if spooled is not None:
+            try:
+                with spooled.mapped() as data:
+                    await Pager(LineIndex(data), title).run_async()
+                return
+            except OSError:
+                console.print("[yellow]Full output is gone from disk; paging the summary[/yellow]")
+
+        await Pager(LineIndex(output), title).run_async()
+
+    async def _show_command_preview(self, call: PreparedCall) -> str:
+        with self.tracer.span("ui.preview", commands=1) as attrs:
+            attrs["choice"] = await self._prompt_command_preview(call)
+            return attrs["choice"]
+
+    async def _prompt_command_preview(self, call: PreparedCall) -> str:
+        if not self.interactive:
+            return "run"
 
-    def _show_command_preview(self, command: str, reasoning: str) -> str:
+        destructive = call.classification.is_destructive
         console.print()
         console.print(Panel(
-            f"[bold cyan]Command:[/bold cyan]\n$ {command}\n\n"
-            f"[bold green]Reasoning:[/bold green]\n{reasoning}",
-            title="Command Preview",
-            border_style="blue"
+            f"[bold cyan]Command:[/bold cyan]\n$ {call.full_command}\n\n"
+            f"[bold green]Reasoning:[/bold green]\n{call.reasoning}",
+            title="Command Preview (destructive)" if destructive else "Command Preview",
+            border_style="red" if destructive else "blue"
         ))
 
         console.print("\n[dim]Press [bold cyan]R[/bold cyan]=Run | [bold yellow]S[/bold yellow]=Skip | [bold green]A[/bold green]=Always[/dim]")
 
         bindings, state = create_command_preview_bindings()
-        layout = Layout(Window(FormattedTextControl(text="")))
-        app = Application(layout=layout, key_bindings=bindings, full_screen=False)
+        await self._wait_for_keys(bindings)
+
+        return state["choice"] or "run"
+
+    async def _show_batch_preview(self, calls: list[PreparedCall]) -> str:
+        with self.tracer.span("ui.preview", commands=len(calls)) as attrs:
+            attrs["choice"] = await self._prompt_batch_preview(calls)
+            return attrs["choice"]
+
+    async def _prompt_batch_preview(self, calls: list[PreparedCall]) -> str:
+        if not self.interactive:
+            return "run"
 
-        app.run()
+        console.print()
+        body = "\n\n".join(
+            f"[bold cyan]{idx}.[/bold cyan] $ {call.full_command}"
+            f"{' [bold red](destructive)[/bold red]' if call.classification.is_destructive else ''}\n"
+            f"   [green]{call.reasoning}[/green]"
+            for idx, call in enumerate(calls, 1)
+        )
+        destructive = any(call.classification.is_destructive for call in calls)
+        console.print(Panel(
+            body,
+            title=f"Command Preview ({len(calls)} commands, run in parallel)",
+            border_style="red" if destructive else "blue"
+        ))
+
+        console.print("\n[dim]Press [bold cyan]R[/bold cyan]=Run all | [bold yellow]S[/bold yellow]=Skip all | [bold green]A[/bold green]=Always[/dim]")
+
+        bindings, state = create_command_preview_bindings()
+        await self._wait_for_keys(bindings)
 
         return state["choice"] or "run"
+
+    def _policy_denies(self, call: PreparedCall) -> bool:
+        if self.interactive or self.approval_policy == "all":
+            return False
+        if self.approval_policy == "safe":
+            return call.classification.is_destructive
+        return not call.classification.is_readonly
+
+    async def _wait_for_keys(self, bindings: KeyBindings) -> None:
+        layout = Layout(Window(FormattedTextControl(text="")))
+        app = Application(layout=layout, key_bindings=bindings, full_screen=False)
+
+        await app.run_async()
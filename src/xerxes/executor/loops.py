@@ -0,0 +1,137 @@
+import hashlib
+import json
+import shlex
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+RESULT_FIELDS = ("success", "exit_code", "stdout", "stderr", "error")
+
+
+@dataclass(frozen=True)
+class CallRecord:
+    call: str
+    result: str
+    command: str
+
+
+def call_key(function_name: str, arguments: dict[str, Any]) -> str:
+    normalized: dict[str, Any] = {
+        key: value for key, value in arguments.items() if key not in ("command", "reasoning")
+    }
+
+    command = arguments.get("command")
+    if isinstance(command, str):
+        try:
+            normalized["command"] = shlex.split(command.strip().rstrip(";"))
+        except ValueError:
+            normalized["command"] = command.split()
+
+    return _digest([function_name, normalized])
+
+
+def result_key(result: dict[str, Any]) -> str:
+    fields = {field: result.get(field) for field in RESULT_FIELDS}
+    spooled = result.get("spooled")
+    if spooled and isinstance(fields["stdout"], str):
+        fields["stdout"] = fields["stdout"].replace(spooled["handle"], "")
+    return _digest(fields)
+
+
+def _digest(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class LoopDetector:
+    def __init__(
+        self,
+        window: int = 20,
+        max_repeats: int = 3,
+        max_cycles: int = 2,
+        stop_after: int = 2,
+    ):
+        self.window = window
+        self.max_repeats = max_repeats
+        self.max_cycles = max_cycles
+        self.stop_after = stop_after
+        self.history: deque[CallRecord] = deque(maxlen=window)
+        self.warnings = 0
+        self.last_call: str | None = None
+
+    def reset(self) -> None:
+        self.history.clear()
+        self.warnings = 0
+        self.last_call = None
+
+    def is_duplicate(self, function_name: str, arguments: dict[str, Any]) -> bool:
+        return self.last_call == call_key(function_name, arguments)
+
+    def record(
+        self, function_name: str, arguments: dict[str, Any], result: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        self.last_call = call_key(function_name, arguments)
+        if result.get("skipped"):
+            return None
+
+        outcome = result_key(result)
+        if result.get("duplicate"):
+            outcome = self._previous_result(self.last_call) or outcome
+
+        command = arguments.get("command") or json.dumps(arguments, sort_keys=True)
+        self.history.append(CallRecord(self.last_call, outcome, command))
+
+        loop = self._detect()
+        if loop is None:
+            return None
+
+        self.warnings += 1
+        loop["stop"] = bool(self.stop_after) and self.warnings >= self.stop_after
+        return loop
+
+    def _previous_result(self, call: str) -> str | None:
+        for record in reversed(self.history):
+            if record.call == call:
+                return record.result
+        return None
+
+    def _detect(self) -> dict[str, Any] | None:
+        entries = [(record.call, record.result) for record in self.history]
+        latest = self.history[-1]
+
+        repeats = entries.count(entries[-1])
+        if self.max_repeats and repeats >= self.max_repeats:
+            return {
+                "detected": "repeat",
+                "count": repeats,
+                "commands": [latest.command],
+                "hint": (
+                    f"This command has now run {repeats} times with the same result. Running it "
+                    "again will not change anything: use the output you already have, try a "
+                    "different approach, or tell the user what is blocking you."
+                ),
+            }
+
+        if not self.max_cycles or self.max_cycles < 2:
+            return None
+
+        for period in range(2, len(entries) // self.max_cycles + 1):
+            span = period * self.max_cycles
+            tail = entries[-span:]
+            if len({call for call, _ in tail[:period]}) < 2:
+                continue
+            if all(tail[idx] == tail[idx + period] for idx in range(span - period)):
+                commands = [record.command for record in list(self.history)[-period:]]
+                return {
+                    "detected": "cycle",
+                    "period": period,
+                    "count": self.max_cycles,
+                    "commands": commands,
+                    "hint": (
+                        f"The last {span} calls repeat the same {period} commands with the same "
+                        "results, so the loop is making no progress. Stop alternating between "
+                        "them: change the approach or report what is blocking you to the user."
+                    ),
+                }
+
+        return None
@@ -1,18 +1,824 @@
-DESTRUCTIVE_KEYWORDS = {
-    "delete",
-    "remove",
-    "destroy",
-    "terminate",
-    "kill",
-    "stop",
-    "rm",
-    "prune",
-    "drop",
-    "truncate",
-    "purge",
+import os
+import re
+import shlex
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+READONLY = "readonly"
+STREAMING = "streaming"
+MUTATING = "mutating"
+DESTRUCTIVE = "destructive"
+
+RISK_ORDER = {READONLY: 0, STREAMING: 1, MUTATING: 2, DESTRUCTIVE: 3}
+
+PUNCTUATION = "();<>|&\n"
+
+ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\[[^\]]*\])?\+?=")
+SUBSTITUTION_STARTS = ("$(", "<(", ">(")
+
+AWK_UNSAFE = re.compile(r"\bsystem\s*\(|\|\s*getline|\bprintf?\b[^;{}]*[>|]")
+AWK_SCRIPT_FLAGS = ("-f", "-i", "-l", "-E", "--file", "--include", "--load", "--exec")
+
+SED_SUBSTITUTE = re.compile(
+    r"(?<![A-Za-z_])s([^\\\n])(?:\\.|(?!\1).)*?\1(?:\\.|(?!\1).)*?\1([A-Za-z0-9]*)"
+)
+SED_ADDRESS = re.compile(r"/(?:\\.|[^/\\\n])*/|\\([^\n])(?:\\.|(?!\1).)*?\1")
+SED_UNSAFE_COMMAND = re.compile(r"[ewW]")
+
+SAFE_REDIRECT_TARGETS = {"/dev/null", "/dev/stdout", "/dev/stderr", "/dev/tty"}
+
+SHELL_KEYWORDS = {"if", "then", "else", "elif", "fi", "do", "done", "while", "until", "{", "}", "!", "esac"}
+LOOP_HEADERS = {"for", "select", "case"}
+
+SHELLS = {"bash", "sh", "zsh", "dash", "ksh", "su"}
+
+SENSITIVE_VARIABLES = {
+    "PATH", "LD_PRELOAD", "LD_LIBRARY_PATH", "BASH_ENV", "ENV", "PROMPT_COMMAND", "IFS", "PS4",
+    "SHELLOPTS", "BASHOPTS", "CDPATH", "GIT_SSH", "GIT_SSH_COMMAND", "GIT_EXTERNAL_DIFF",
+    "GIT_PAGER", "PAGER", "MANPAGER", "EDITOR", "VISUAL",
+}
+
+
+@dataclass(frozen=True)
+class CommandClassification:
+    risk: str
+    categories: frozenset[str] = frozenset()
+
+    @property
+    def is_readonly(self) -> bool:
+        return self.risk == READONLY
+
+    @property
+    def is_destructive(self) -> bool:
+        return self.risk == DESTRUCTIVE
+
+
+@dataclass(frozen=True)
+class ProgramRules:
+    risk: str
+    category: str | None = None
+    verbs: dict[str, str] = field(default_factory=dict)
+    verb_prefixes: tuple[tuple[str, str], ...] = ()
+    groups: frozenset[str] = frozenset()
+    listing_verbs: frozenset[str] = frozenset()
+    scan_verbs: bool = False
+    verb_depth: int | None = None
+    value_flags: frozenset[str] = frozenset()
+    streaming_flags: frozenset[str] = frozenset()
+    mutating_flags: frozenset[str] = frozenset()
+    destructive_flags: frozenset[str] = frozenset()
+    nested_flags: frozenset[str] = frozenset()
+    check: Callable[[list[str]], str] | None = None
+
+
+@dataclass(frozen=True)
+class Wrapper:
+    value_flags: frozenset[str] = frozenset()
+    positional_args: int = 0
+    risk: str = READONLY
+    bare_risk: str = MUTATING
+
+
+def _programs(risk: str, category: str | None, *names: str) -> dict[str, ProgramRules]:
+    return {name: ProgramRules(risk, category) for name in names}
+
+
+def _verbs(risk: str, *names: str) -> dict[str, str]:
+    return {name: risk for name in names}
+
+
+def _awk_risk(args: list[str]) -> str:
+    if any(word.startswith(AWK_SCRIPT_FLAGS) for word in args):
+        return MUTATING
+    if any(AWK_UNSAFE.search(word) for word in args):
+        return MUTATING
+    return READONLY
+
+
+def _sed_risk(args: list[str]) -> str:
+    scripts = _sed_scripts(args)
+    if scripts is None:
+        return MUTATING
+
+    for script in scripts:
+        if any(set(match.group(2)) & {"e", "w"} for match in SED_SUBSTITUTE.finditer(script)):
+            return MUTATING
+        commands = SED_ADDRESS.sub("", SED_SUBSTITUTE.sub(";", script))
+        if SED_UNSAFE_COMMAND.search(commands):
+            return MUTATING
+    return READONLY
+
+
+def _sed_scripts(args: list[str]) -> list[str] | None:
+    scripts = []
+    positional = []
+    words = iter(args)
+
+    for word in words:
+        if word in ("-e", "--expression"):
+            scripts.append(next(words, ""))
+        elif word.startswith("--expression="):
+            scripts.append(word.split("=", 1)[1])
+        elif word in ("-f", "--file") or word.startswith("--file="):
+            return None
+        elif word.startswith("-") and not word.startswith("--"):
+            if "f" in word:
+                return None
+            if "e" in word:
+                attached = word[word.index("e") + 1 :]
+                scripts.append(attached or next(words, ""))
+        elif not word.startswith("-"):
+            positional.append(word)
+
+    return scripts or positional[:1]
+
+
+def _mount_risk(args: list[str]) -> str:
+    words = iter(args)
+    for word in words:
+        if word in ("-t", "--types"):
+            next(words, None)
+        elif word not in ("-l", "--show-labels", "-v", "--verbose"):
+            return MUTATING
+    return READONLY
+
+
+def _date_risk(args: list[str]) -> str:
+    if any(word.startswith(("-s", "--set")) for word in args):
+        return MUTATING
+    positional = _positional(args, frozenset({"-d", "--date", "-r", "--reference", "-f", "--file"}))
+    if any(not word.startswith("+") for word in positional):
+        return MUTATING
+    return READONLY
+
+
+def _hostname_risk(args: list[str]) -> str:
+    if _positional(args, frozenset()):
+        return MUTATING
+    if any(word.startswith(("-F", "--file", "-b", "--boot")) for word in args):
+        return MUTATING
+    return READONLY
+
+
+def _ifconfig_risk(args: list[str]) -> str:
+    if len(_positional(args, frozenset())) > 1:
+        return MUTATING
+    if any(word.startswith("-") and word not in ("-a", "-s", "-v", "-l") for word in args):
+        return MUTATING
+    return READONLY
+
+
+def _ping_risk(args: list[str]) -> str:
+    if _has_flag(args, frozenset({"-c", "-w", "--count", "--deadline"})):
+        return READONLY
+    return STREAMING
+
+
+def _docker_risk(args: list[str]) -> str:
+    command = _positional(args, DOCKER_VALUE_FLAGS)[:2]
+    if "stats" in command and "--no-stream" not in args:
+        return STREAMING
+    if "events" in command and not any(word.startswith("--until") for word in args):
+        return STREAMING
+    return READONLY
+
+
+def _git_risk(args: list[str]) -> str:
+    words = iter(args)
+    for word in words:
+        if word.startswith(("-c", "--config-env", "--exec-path")):
+            return MUTATING
+        if word in ("-C", "--git-dir", "--work-tree", "--namespace"):
+            next(words, None)
+        elif not word.startswith("-"):
+            break
+    return READONLY
+
+
+def _uniq_risk(args: list[str]) -> str:
+    value_flags = frozenset({"-f", "-s", "-w", "--skip-fields", "--skip-chars", "--check-chars"})
+    return MUTATING if len(_positional(args, value_flags)) > 1 else READONLY
+
+
+def _xxd_risk(args: list[str]) -> str:
+    value_flags = frozenset({
+        "-c", "-cols", "-g", "-groupsize", "-l", "-len", "-n", "-name", "-o", "-offset", "-s",
+        "-seek",
+    })
+    if _has_flag(args, frozenset({"-r", "-revert"}), value_flags):
+        return MUTATING
+    return MUTATING if len(_positional(args, value_flags)) > 1 else READONLY
+
+
+def _export_risk(args: list[str]) -> str:
+    if any(word.startswith("-") and "f" in word for word in args):
+        return MUTATING
+    return _assignment_risk(args)
+
+
+def _alias_risk(args: list[str]) -> str:
+    definitions = [word.split("=", 1)[1] for word in args if "=" in word and word[0] != "-"]
+    if not definitions:
+        return READONLY
+    nested = max((classify_command(value).risk for value in definitions), key=RISK_ORDER.get)
+    return max(MUTATING, nested, key=RISK_ORDER.__getitem__)
+
+
+def _assignment_risk(words: list[str]) -> str:
+    for word in words:
+        match = ASSIGNMENT.match(word)
+        if match and word[: match.end()].rstrip("+=").split("[", 1)[0] in SENSITIVE_VARIABLES:
+            return MUTATING
+    return READONLY
+
+
+def _terraform_risk(args: list[str]) -> str:
+    if _positional(args, frozenset())[:1] != ["fmt"]:
+        return READONLY
+    if "-check" in args or "-write=false" in args:
+        return READONLY
+    return MUTATING
+
+
+DOCKER_VALUE_FLAGS = frozenset(
+    {"-H", "--host", "--context", "-c", "--config", "-f", "--file", "-p", "--project-name"}
+)
+
+GCLOUD_GROUPS = frozenset({
+    "alpha", "beta", "compute", "instances", "instance-groups", "instance-templates", "managed",
+    "unmanaged", "disks", "snapshots", "images", "networks", "subnets", "firewall-rules",
+    "routers", "addresses", "forwarding-rules", "backend-services", "health-checks", "url-maps",
+    "target-pools", "ssl-certificates", "zones", "regions", "machine-types", "operations",
+    "project-info", "container", "clusters", "node-pools", "run", "services", "revisions",
+    "jobs", "executions", "domain-mappings", "functions", "sql", "databases", "users",
+    "backups", "iam", "service-accounts", "roles", "keys", "projects", "organizations",
+    "folders", "config", "configurations", "auth", "application-default", "storage", "buckets",
+    "objects", "pubsub", "topics", "subscriptions", "secrets", "versions", "logging", "logs",
+    "sinks", "metrics", "app", "dns", "record-sets", "managed-zones", "kms", "keyrings",
+    "artifacts", "repositories", "docker", "builds", "triggers", "scheduler", "tasks",
+    "queues", "redis", "monitoring", "dashboards", "policies", "channels", "components",
+    "workflows", "composer", "environments", "dataproc", "dataflow", "bigtable", "spanner",
+    "filestore", "billing", "accounts", "resource-manager", "endpoints", "deployment-manager",
+    "deployments", "source", "repos", "certificate-manager", "certificates", "asset", "ai",
+    "models",
+})
+
+AZ_GROUPS = frozenset({
+    "vm", "vmss", "group", "aks", "nodepool", "storage", "account", "blob", "container",
+    "webapp", "functionapp", "network", "vnet", "subnet", "nsg", "rule", "public-ip", "lb",
+    "keyvault", "secret", "key", "certificate", "sql", "server", "db", "cosmosdb", "acr",
+    "repository", "monitor", "log-analytics", "workspace", "ad", "sp", "app", "role",
+    "assignment", "definition", "resource", "deployment", "identity", "disk", "snapshot",
+    "image", "appservice", "plan", "redis", "postgres", "mysql", "flexible-server",
+    "eventhubs", "servicebus", "namespace", "queue", "topic", "extension", "policy",
+})
+
+
+PROGRAM_RULES: dict[str, ProgramRules] = {
+    **_programs(
+        READONLY, "filesystem",
+        "ls", "ll", "cat", "head", "less", "more", "wc", "du", "df", "stat",
+        "pwd", "realpath", "readlink", "basename", "dirname", "md5sum", "sha256sum", "sha1sum",
+        "locate", "lsblk", "findmnt", "zcat", "bat",
+    ),
+    **_programs(
+        READONLY, "text",
+        "grep", "egrep", "fgrep", "cut", "tr", "jq", "column", "echo", "printf", "true",
+        "false", "test", "[", "[[", "diff", "cmp", "comm", "nl", "rev", "fold", "base64", "od",
+        "strings", "seq", "expr", "tac", "paste", "join", "fmt", "printenv", ":",
+    ),
+    **_programs(
+        READONLY, "process",
+        "ps", "pgrep", "top", "htop", "netstat", "ss", "lsof", "free", "uptime", "vmstat",
+        "iostat", "w", "who", "last", "jobs", "pidof",
+    ),
+    **_programs(
+        READONLY, "system",
+        "uname", "whoami", "which", "type", "id", "groups", "cal", "arch",
+        "nproc", "lscpu", "lsb_release", "whereis", "help", "sw_vers", "getent",
+    ),
+    **_programs(READONLY, "network", "dig", "nslookup", "host", "traceroute"),
+    **_programs(READONLY, "shell", "cd", "pushd", "popd", "unset", "set", "read"),
+    "export": ProgramRules(READONLY, "shell", check=_export_risk),
+    "alias": ProgramRules(READONLY, "shell", check=_alias_risk),
+    "history": ProgramRules(
+        READONLY, "shell", mutating_flags=frozenset({"-c", "-d", "-a", "-n", "-r", "-w", "-s"})
+    ),
+    **_programs(
+        DESTRUCTIVE, None,
+        "rm", "rmdir", "shred", "unlink", "kill", "killall", "pkill", "dd", "mkfs", "wipefs",
+        "fdisk", "parted", "reboot", "shutdown", "halt", "poweroff", "truncate", "userdel", "groupdel",
+    ),
+    "file": ProgramRules(READONLY, "filesystem", mutating_flags=frozenset({"-C", "--compile"})),
+    "tree": ProgramRules(
+        READONLY,
+        "filesystem",
+        value_flags=frozenset({"-L", "-P", "-I", "-o", "--charset", "--filelimit", "--timefmt"}),
+        mutating_flags=frozenset({"-o"}),
+    ),
+    "uniq": ProgramRules(READONLY, "text", check=_uniq_risk),
+    "xxd": ProgramRules(READONLY, "text", check=_xxd_risk),
+    "yq": ProgramRules(READONLY, "text", mutating_flags=frozenset({"-i", "--inplace"})),
+    "rg": ProgramRules(READONLY, "text", mutating_flags=frozenset({"--pre"})),
+    "ag": ProgramRules(READONLY, "text", mutating_flags=frozenset({"--pager"})),
+    "man": ProgramRules(
+        READONLY,
+        "system",
+        mutating_flags=frozenset({"-P", "--pager", "-H", "--html", "-X", "--gxditview"}),
+    ),
+    "tail": ProgramRules(
+        READONLY, "filesystem", streaming_flags=frozenset({"-f", "-F", "--follow"})
+    ),
+    "mount": ProgramRules(READONLY, "filesystem", check=_mount_risk),
+    "awk": ProgramRules(READONLY, "text", check=_awk_risk),
+    "date": ProgramRules(READONLY, "system", check=_date_risk),
+    "hostname": ProgramRules(READONLY, "system", check=_hostname_risk),
+    "ping": ProgramRules(READONLY, "network", check=_ping_risk),
+    "ifconfig": ProgramRules(READONLY, "network", check=_ifconfig_risk),
+    "ip": ProgramRules(
+        MUTATING,
+        "network",
+        verbs=_verbs(
+            READONLY, "show", "list", "ls", "lst", "s", "sh", "get", "link", "l", "address",
+            "addr", "a", "route", "r", "neighbour", "neigh", "n", "rule", "maddress", "tunnel",
+        ),
+        groups=frozenset({
+            "link", "l", "address", "addr", "a", "route", "r", "neighbour", "neigh", "n", "rule",
+            "maddress", "tunnel", "netns", "xfrm", "tuntap", "token", "vrf",
+        }),
+        value_flags=frozenset({"-n", "-netns", "-f", "-family"}),
+    ),
+    "find": ProgramRules(
+        READONLY,
+        "filesystem",
+        mutating_flags=frozenset({"-fprint", "-fprintf", "-fls", "-fprint0"}),
+        destructive_flags=frozenset({"-delete"}),
+        nested_flags=frozenset({"-exec", "-execdir", "-ok", "-okdir"}),
+    ),
+    "sort": ProgramRules(READONLY, "text", mutating_flags=frozenset({"-o", "--output"})),
+    "sed": ProgramRules(
+        READONLY, "text", mutating_flags=frozenset({"-i", "--in-place"}), check=_sed_risk
+    ),
+    "tee": ProgramRules(MUTATING),
+    "curl": ProgramRules(
+        READONLY,
+        "network",
+        mutating_flags=frozenset({
+            "-o", "-O", "--output", "--remote-name", "-d", "--data", "--data-raw",
+            "--data-binary", "--data-urlencode", "--json", "-X", "--request", "-T",
+            "--upload-file", "-F", "--form",
+        }),
+    ),
+    "kubectl": ProgramRules(
+        MUTATING,
+        "kubernetes",
+        verbs={
+            **_verbs(
+                READONLY, "get", "describe", "logs", "top", "explain", "api-resources",
+                "api-versions", "version", "cluster-info", "view", "get-contexts",
+                "current-context", "get-clusters", "history", "status", "can-i", "diff",
+                "events", "whoami",
+            ),
+            **_verbs(DESTRUCTIVE, "delete", "drain"),
+        },
+        groups=frozenset({"config", "rollout", "auth", "certificate"}),
+        value_flags=frozenset({
+            "-n", "--namespace", "--context", "--kubeconfig", "--cluster", "--user", "-s",
+            "--server", "-o", "--output", "-l", "--selector", "-c", "--container",
+        }),
+        streaming_flags=frozenset({"-f", "--follow", "-w", "--watch", "--watch-only"}),
+        destructive_flags=frozenset({"--force"}),
+    ),
+    "helm": ProgramRules(
+        MUTATING,
+        "kubernetes",
+        verbs={
+            **_verbs(READONLY, "list", "ls", "status", "history", "get", "show", "search", "version", "template", "lint"),
+            **_verbs(DESTRUCTIVE, "uninstall", "delete", "rollback"),
+        },
+        value_flags=frozenset({"-n", "--namespace", "--kube-context", "--kubeconfig"}),
+    ),
+    "docker": ProgramRules(
+        MUTATING,
+        "docker",
+        verbs={
+            **_verbs(
+                READONLY, "ps", "images", "inspect", "logs", "version", "info", "stats", "top",
+                "port", "diff", "history", "search", "events", "ls", "list", "df",
+            ),
+            **_verbs(DESTRUCTIVE, "rm", "rmi", "kill", "stop", "prune", "down"),
+        },
+        groups=frozenset({"container", "image", "volume", "network", "system", "compose", "context", "buildx", "node", "service"}),
+        value_flags=DOCKER_VALUE_FLAGS,
+        streaming_flags=frozenset({"-f", "--follow"}),
+        check=_docker_risk,
+    ),
+    "git": ProgramRules(
+        MUTATING,
+        "git",
+        verbs={
+            **_verbs(
+                READONLY, "status", "log", "diff", "show", "rev-parse", "blame", "ls-files",
+                "ls-remote", "describe", "shortlog", "grep", "reflog", "cat-file", "rev-list",
+                "whatchanged", "branch", "tag", "remote", "config",
+            ),
+            **_verbs(DESTRUCTIVE, "clean"),
+        },
+        listing_verbs=frozenset({"branch", "tag", "remote", "config"}),
+        value_flags=frozenset({"-C", "-c", "--git-dir", "--work-tree", "-S", "-G"}),
+        mutating_flags=frozenset({"--output", "--open-files-in-pager", "-O"}),
+        destructive_flags=frozenset({"--hard", "--force", "-f", "-D", "--force-with-lease", "--delete"}),
+        check=_git_risk,
+    ),
+    "gcloud": ProgramRules(
+        MUTATING,
+        "cloud",
+        verbs={
+            **_verbs(READONLY, "list", "describe", "get-iam-policy", "get-value", "info", "read", "tail"),
+            **_verbs(DESTRUCTIVE, "delete", "stop", "reset"),
+        },
+        verb_prefixes=(("list-", READONLY), ("describe-", READONLY)),
+        groups=GCLOUD_GROUPS,
+        value_flags=frozenset({
+            "--project", "--account", "--configuration", "--format", "--zone", "--region",
+            "--impersonate-service-account", "--verbosity",
+        }),
+    ),
+    "aws": ProgramRules(
+        MUTATING,
+        "cloud",
+        verbs={**_verbs(READONLY, "ls", "get-caller-identity"), **_verbs(DESTRUCTIVE, "rm", "rb")},
+        verb_prefixes=(
+            ("describe-", READONLY), ("list-", READONLY), ("get-", READONLY),
+            ("delete-", DESTRUCTIVE), ("terminate-", DESTRUCTIVE), ("stop-", DESTRUCTIVE),
+            ("deregister-", DESTRUCTIVE),
+        ),
+        scan_verbs=True,
+        verb_depth=2,
+        value_flags=frozenset({"--profile", "--region", "--output", "--query", "--endpoint-url"}),
+    ),
+    "az": ProgramRules(
+        MUTATING,
+        "cloud",
+        verbs={**_verbs(READONLY, "list", "show", "get"), **_verbs(DESTRUCTIVE, "delete", "stop", "deallocate")},
+        groups=AZ_GROUPS,
+        value_flags=frozenset({"--subscription", "-o", "--output", "--query"}),
+    ),
+    "systemctl": ProgramRules(
+        MUTATING,
+        "system",
+        verbs={
+            **_verbs(READONLY, "status", "list-units", "list-unit-files", "is-active", "is-enabled", "show", "cat"),
+            **_verbs(DESTRUCTIVE, "stop", "disable", "mask", "kill"),
+        },
+    ),
+    "terraform": ProgramRules(
+        MUTATING,
+        "cloud",
+        verbs={**_verbs(READONLY, "plan", "show", "output", "validate", "version", "fmt", "providers", "state"), **_verbs(DESTRUCTIVE, "destroy")},
+        groups=frozenset({"state"}),
+        check=_terraform_risk,
+    ),
+    "npm": ProgramRules(MUTATING, "system", verbs=_verbs(READONLY, "ls", "list", "outdated", "view", "search")),
+    "pip": ProgramRules(MUTATING, "system", verbs={**_verbs(READONLY, "list", "show", "freeze"), **_verbs(DESTRUCTIVE, "uninstall")}),
+    "journalctl": ProgramRules(
+        READONLY,
+        "process",
+        streaming_flags=frozenset({"-f", "--follow"}),
+        mutating_flags=frozenset({"--vacuum-size", "--vacuum-time", "--rotate"}),
+    ),
 }
 
+PROGRAM_RULES["gawk"] = PROGRAM_RULES["awk"]
+PROGRAM_RULES["pip3"] = PROGRAM_RULES["pip"]
+PROGRAM_RULES["podman"] = PROGRAM_RULES["docker"]
+PROGRAM_RULES["docker-compose"] = PROGRAM_RULES["docker"]
+PROGRAM_RULES["k"] = PROGRAM_RULES["kubectl"]
+
+WRAPPERS: dict[str, Wrapper] = {
+    "sudo": Wrapper(frozenset({"-u", "-g", "-h", "-p", "-C"}), bare_risk=DESTRUCTIVE),
+    "doas": Wrapper(frozenset({"-u"}), bare_risk=DESTRUCTIVE),
+    "env": Wrapper(frozenset({"-u", "-C", "--unset", "--chdir"}), bare_risk=READONLY),
+    "nohup": Wrapper(),
+    "time": Wrapper(),
+    "command": Wrapper(),
+    "builtin": Wrapper(),
+    "exec": Wrapper(),
+    "nice": Wrapper(frozenset({"-n"}), bare_risk=READONLY),
+    "ionice": Wrapper(frozenset({"-c", "-n"})),
+    "stdbuf": Wrapper(frozenset({"-i", "-o", "-e"})),
+    "timeout": Wrapper(frozenset({"-s", "--signal", "-k", "--kill-after"}), positional_args=1),
+    "watch": Wrapper(frozenset({"-n", "--interval"}), risk=STREAMING),
+    "xargs": Wrapper(
+        frozenset({"-I", "-n", "-P", "-d", "-L", "-s", "-E", "-a", "--max-args", "--max-procs"}),
+        bare_risk=READONLY,
+    ),
+}
+
+
+@lru_cache(maxsize=4096)
+def classify_command(command: str) -> CommandClassification:
+    risk = READONLY
+    categories: set[str] = set()
+
+    try:
+        segments = _split_segments(command)
+        substitutions = _substitutions(command)
+    except ValueError:
+        return CommandClassification(MUTATING)
+
+    for words, redirect_risk in segments:
+        segment_risk, category = _classify_words(words)
+        risk = max(risk, segment_risk, redirect_risk, key=RISK_ORDER.__getitem__)
+        if category:
+            categories.add(category)
+
+    for nested_command in substitutions:
+        nested = classify_command(nested_command)
+        risk = max(risk, nested.risk, key=RISK_ORDER.__getitem__)
+        categories |= nested.categories
+
+    return CommandClassification(risk, frozenset(categories))
+
+
+def is_command_readonly(command: str) -> bool:
+    return classify_command(command).is_readonly
+
 
 def is_command_destructive(command: str) -> bool:
-    command_lower = command.lower()
-    return any(keyword in command_lower for keyword in DESTRUCTIVE_KEYWORDS)
+    return classify_command(command).is_destructive
+
+
+def _split_segments(command: str) -> list[tuple[list[str], str]]:
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=PUNCTUATION)
+    lexer.whitespace = " \t\r"
+    lexer.whitespace_split = True
+
+    segments = []
+    words: list[str] = []
+    redirect_risk = READONLY
+    tokens = iter(lexer)
+
+    for token in tokens:
+        if not token or token[0] not in PUNCTUATION or token.strip(PUNCTUATION):
+            words.append(token)
+            continue
+
+        if ">" in token and "(" not in token:
+            target = next(tokens, "")
+            if not (token.endswith("&") and (target.isdigit() or target == "-")):
+                if target not in SAFE_REDIRECT_TARGETS:
+                    redirect_risk = MUTATING
+            continue
+
+        if "<" in token and "(" not in token:
+            next(tokens, None)
+            continue
+
+        if token.startswith("()") and len(words) == 1:
+            redirect_risk = MUTATING
+
+        if words or redirect_risk != READONLY:
+            segments.append((words, redirect_risk))
+        words = []
+        redirect_risk = READONLY
+
+    if words or redirect_risk != READONLY:
+        segments.append((words, redirect_risk))
+
+    return segments
+
+
+def _substitutions(command: str) -> list[str]:
+    found = []
+    quote = None
+    idx = 0
+
+    while idx < len(command):
+        char = command[idx]
+        if quote == "'":
+            if char == "'":
+                quote = None
+        elif char == "\\":
+            idx += 1
+        elif char == "'" and quote is None:
+            quote = "'"
+        elif char == '"':
+            quote = None if quote else '"'
+        elif char == "`":
+            end = command.find("`", idx + 1)
+            if end < 0:
+                raise ValueError("Unterminated backtick substitution")
+            found.append(command[idx + 1 : end])
+            idx = end
+        elif command.startswith(SUBSTITUTION_STARTS if quote is None else "$(", idx):
+            end = _closing_paren(command, idx + 2)
+            inner = command[idx + 2 : end]
+            if inner.startswith("(") and inner.endswith(")"):
+                found.extend(_substitutions(inner[1:-1]))
+            else:
+                found.append(inner)
+            idx = end
+        idx += 1
+
+    return found
+
+
+def _closing_paren(command: str, start: int) -> int:
+    depth = 1
+    quote = None
+    idx = start
+
+    while idx < len(command):
+        char = command[idx]
+        if quote:
+            if char == quote:
+                quote = None
+            elif char == "\\" and quote == '"':
+                idx += 1
+        elif char == "\\":
+            idx += 1
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return idx
+        idx += 1
+
+    raise ValueError("Unterminated command substitution")
+
+
+def _classify_words(words: list[str]) -> tuple[str, str | None]:
+    risk, category = _classify_program(words)
+    prefix = []
+    for word in words:
+        if word not in SHELL_KEYWORDS and not ASSIGNMENT.match(word):
+            break
+        prefix.append(word)
+    return max(risk, _assignment_risk(prefix), key=RISK_ORDER.__getitem__), category
+
+
+def _classify_program(words: list[str]) -> tuple[str, str | None]:
+    idx = 0
+    while idx < len(words) and (words[idx] in SHELL_KEYWORDS or ASSIGNMENT.match(words[idx])):
+        idx += 1
+
+    if idx == len(words):
+        return READONLY, "shell" if words and ASSIGNMENT.match(words[-1]) else None
+
+    if words[idx] in LOOP_HEADERS:
+        return READONLY, None
+
+    if words[idx] == "function":
+        body_risk, category = _classify_words(words[idx + 2 :])
+        return max(MUTATING, body_risk, key=RISK_ORDER.__getitem__), category
+
+    program = os.path.basename(words[idx])
+    args = words[idx + 1 :]
+
+    wrapper = WRAPPERS.get(program)
+    if wrapper is not None:
+        inner = _skip_options(args, wrapper.value_flags, wrapper.positional_args)
+        env_risk = _assignment_risk(args[: len(args) - len(inner)])
+        risk = max(wrapper.risk, env_risk, key=RISK_ORDER.__getitem__)
+        if not inner:
+            return max(risk, wrapper.bare_risk, key=RISK_ORDER.__getitem__), "system"
+        if os.path.basename(inner[0]) in SHELLS and "-c" not in inner:
+            risk = max(risk, wrapper.bare_risk, MUTATING, key=RISK_ORDER.__getitem__)
+        inner_risk, category = _classify_words(inner)
+        return max(inner_risk, risk, key=RISK_ORDER.__getitem__), category
+
+    if program in SHELLS:
+        if "-c" in args and args.index("-c") + 1 < len(args):
+            nested = classify_command(args[args.index("-c") + 1])
+            return nested.risk, next(iter(sorted(nested.categories)), None)
+        return MUTATING, None
+
+    rules = PROGRAM_RULES.get(program)
+    if rules is None:
+        return MUTATING, None
+
+    risk = _verb_risk(rules, args)
+    if rules.check is not None:
+        risk = max(risk, rules.check(args), key=RISK_ORDER.__getitem__)
+
+    for flag in rules.nested_flags:
+        if flag in args:
+            nested = args[args.index(flag) + 1 :]
+            end = next((i for i, word in enumerate(nested) if word in (";", "+")), len(nested))
+            nested_risk, _ = _classify_words(nested[:end])
+            risk = max(risk, nested_risk, key=RISK_ORDER.__getitem__)
+
+    if rules.streaming_flags and _has_flag(args, rules.streaming_flags, rules.value_flags):
+        risk = max(risk, STREAMING, key=RISK_ORDER.__getitem__)
+    if rules.mutating_flags and _has_flag(args, rules.mutating_flags, rules.value_flags):
+        risk = max(risk, MUTATING, key=RISK_ORDER.__getitem__)
+    if rules.destructive_flags and _has_flag(args, rules.destructive_flags, rules.value_flags):
+        risk = DESTRUCTIVE
+
+    return risk, rules.category
+
+
+def _verb_risk(rules: ProgramRules, args: list[str]) -> str:
+    if not rules.verbs and not rules.verb_prefixes:
+        return rules.risk
+
+    positional = _positional(args, rules.value_flags)
+    if not positional:
+        return READONLY
+
+    if rules.scan_verbs:
+        for word in _command_path(args, rules.value_flags)[: rules.verb_depth]:
+            risk = _lookup_verb(rules, word)
+            if risk is not None:
+                return risk
+        return rules.risk
+
+    verb, rest = positional[0], positional[1:]
+    while verb in rules.groups and rest:
+        verb, rest = rest[0], rest[1:]
+
+    if verb in rules.listing_verbs and rest:
+        return rules.risk
+
+    return _lookup_verb(rules, verb) or rules.risk
+
+
+def _lookup_verb(rules: ProgramRules, word: str) -> str | None:
+    risk = rules.verbs.get(word)
+    if risk is not None:
+        return risk
+
+    for prefix, prefix_risk in rules.verb_prefixes:
+        if word.startswith(prefix):
+            return prefix_risk
+    return None
+
+
+def _positional(args: list[str], value_flags: frozenset[str]) -> list[str]:
+    positional = []
+    skip = False
+    for word in args:
+        if skip:
+            skip = False
+        elif word in value_flags:
+            skip = True
+        elif not word.startswith("-"):
+            positional.append(word)
+    return positional
+
+
+def _command_path(args: list[str], value_flags: frozenset[str]) -> list[str]:
+    path = []
+    words = iter(args)
+    for word in words:
+        if word in value_flags:
+            next(words, None)
+        elif word.startswith("-"):
+            if word.split("=", 1)[0] not in value_flags:
+                break
+        else:
+            path.append(word)
+    return path
+
+
+def _skip_options(args: list[str], value_flags: frozenset[str], positional_args: int) -> list[str]:
+    idx = 0
+    while idx < len(args):
+        word = args[idx]
+        if word == "--":
+            idx += 1
+            break
+        if word in value_flags:
+            idx += 2
+        elif word.startswith("-") or ASSIGNMENT.match(word):
+            idx += 1
+        else:
+            break
+
+    return args[idx + positional_args :]
+
+
+def _has_flag(
+    args: list[str], flags: frozenset[str], value_flags: frozenset[str] = frozenset()
+) -> bool:
+    for word in args:
+        if not word.startswith("-"):
+            continue
+        if word in flags:
+            return True
+        if word.startswith("--"):
+            if word.split("=", 1)[0] in flags:
+                return True
+            continue
+
+        for char in word[1:]:
+            if f"-{char}" in flags:
+                return True
+            if f"-{char}" in value_flags:
+                break
+    return False
@@ -1,12 +1,25 @@
+import asyncio
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass, field
 from typing import Any
 
 
+class ProviderError(Exception):
+    def __init__(
+        self, message: str, status_code: int | None = None, retry_after: float | None = None
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
 @dataclass
 class Message:
     role: str
     content: str
+    kind: str | None = None
+    native: dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
 
 
 @dataclass
@@ -14,6 +27,7 @@ class ToolCall:
     id: str
     name: str
     arguments: dict[str, Any]
+    error: str | None = None
 
 
 @dataclass
@@ -24,6 +38,14 @@ class LLMResponse:
     usage: dict[str, int] | None = None
 
 
+@dataclass
+class StreamChunk:
+    text: str | None = None
+    tool_call: ToolCall | None = None
+    stop_reason: str | None = None
+    usage: dict[str, int] | None = None
+
+
 class BaseLLMProvider(ABC):
     def __init__(self):
         pass
@@ -38,6 +60,51 @@ class BaseLLMProvider(ABC):
     ) -> LLMResponse:
         pass
 
+    def stream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> Iterator[StreamChunk]:
+        response = self.chat(messages, tools=tools, max_tokens=max_tokens, temperature=temperature)
+        yield from response_to_chunks(response)
+
+    async def achat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        return await asyncio.to_thread(
+            self.chat, messages, tools=tools, max_tokens=max_tokens, temperature=temperature
+        )
+
+    async def astream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[StreamChunk]:
+        stream = self.stream_chat(
+            messages, tools=tools, max_tokens=max_tokens, temperature=temperature
+        )
+        done = object()
+
+        while (chunk := await asyncio.to_thread(next, stream, done)) is not done:
+            yield chunk
+
+    def invalidate_cache(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
     @abstractmethod
     def is_available(self) -> bool:
         pass
@@ -46,3 +113,11 @@ class BaseLLMProvider(ABC):
     @abstractmethod
     def name(self) -> str:
         pass
+
+
+def response_to_chunks(response: LLMResponse) -> Iterator[StreamChunk]:
+    if response.content:
+        yield StreamChunk(text=response.content)
+    for tool_call in response.tool_calls or []:
+        yield StreamChunk(tool_call=tool_call)
+    yield StreamChunk(stop_reason=response.stop_reason, usage=response.usage)
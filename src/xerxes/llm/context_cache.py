@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vertexai.generative_models import GenerativeModel, Tool
+    from vertexai.preview.caching import CachedContent
+
+
+class ContextCache(ABC):
+    def __init__(self, ttl_seconds: int = 3600):
+        self.ttl_seconds = ttl_seconds
+        self.created = 0
+
+    @abstractmethod
+    def create(
+        self, model_name: str, system_instruction: str | None, tools: list[Tool] | None
+    ) -> GenerativeModel:
+        pass
+
+    def delete(self) -> None:
+        pass
+
+
+class VertexContextCache(ContextCache):
+    def __init__(self, ttl_seconds: int = 3600):
+        super().__init__(ttl_seconds)
+        self._content: CachedContent | None = None
+
+    def create(
+        self, model_name: str, system_instruction: str | None, tools: list[Tool] | None
+    ) -> GenerativeModel:
+        from vertexai.preview import caching
+        from vertexai.preview.generative_models import GenerativeModel
+
+        self.delete()
+        self._content = caching.CachedContent.create(
+            model_name=model_name,
+            system_instruction=system_instruction,
+            tools=tools,
+            ttl=timedelta(seconds=self.ttl_seconds),
+        )
+        self.created += 1
+        return GenerativeModel.from_cached_content(cached_content=self._content)
+
+    def delete(self) -> None:
+        content, self._content = self._content, None
+        if content is not None:
+            try:
+                content.delete()
+            except Exception:
+                pass
+
+
+class LocalContextCache(ContextCache):
+    def create(
+        self, model_name: str, system_instruction: str | None, tools: list[Tool] | None
+    ) -> GenerativeModel:
+        from vertexai.generative_models import GenerativeModel
+
+        self.created += 1
+        return GenerativeModel(model_name, system_instruction=system_instruction, tools=tools)
@@ -0,0 +1,55 @@
+from ..config.settings import Settings
+from .base import BaseLLMProvider
+from .context_cache import VertexContextCache
+from .openai_compat import OpenAICompatibleProvider
+from .resilient import ResilientProvider
+from .vertex import VertexAIProvider
+
+PROVIDERS = ("vertex", "openai")
+
+
+def create_provider(settings: Settings, max_concurrency: int | None = None) -> BaseLLMProvider:
+    if settings.llm_provider == "openai":
+        provider: BaseLLMProvider = OpenAICompatibleProvider(
+            base_url=settings.openai_base_url,
+            api_key=settings.openai_api_key,
+            model_name=settings.openai_model,
+            max_connections=settings.http_max_connections,
+            http2=settings.http2,
+        )
+    elif settings.llm_provider == "vertex":
+        provider = VertexAIProvider(
+            project_id=settings.vertex_project_id,
+            location=settings.vertex_location,
+            model_name=settings.vertex_model,
+            credentials_path=settings.google_application_credentials,
+            context_cache=(
+                VertexContextCache(settings.context_cache_ttl_seconds)
+                if settings.context_cache
+                else None
+            ),
+        )
+    else:
+        raise ValueError(
+            f"Unknown llm_provider: {settings.llm_provider} "
+            f"(expected one of {', '.join(PROVIDERS)})"
+        )
+
+    return ResilientProvider(
+        provider,
+        max_retries=settings.llm_max_retries,
+        max_concurrency=max_concurrency or settings.llm_max_concurrency,
+        hedge_after=settings.llm_hedge_after_seconds,
+    )
+
+
+def provider_setup_hint(name: str) -> str:
+    if name == "openai":
+        return (
+            "OpenAI-compatible provider not configured. "
+            "Please set openai_base_url and openai_model."
+        )
+    return (
+        "Vertex AI not properly configured. "
+        "Please set vertex_project_id and ensure authentication is set up."
+    )
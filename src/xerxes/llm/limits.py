@@ -0,0 +1,48 @@
+import asyncio
+from collections import deque
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 32):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self) -> None:
+        while not self.has_capacity:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    self._wake()
+                raise
+
+        self.in_flight += 1
+
+    def release(self, ok: bool = True, overloaded: bool = False) -> None:
+        self.in_flight -= 1
+
+        if overloaded:
+            self.limit = max(self.minimum, self.limit / 2)
+        elif ok:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
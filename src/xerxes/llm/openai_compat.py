@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import os
+import time
+from collections.abc import AsyncIterator, Iterator
+from typing import TYPE_CHECKING, Any
+
+from ..utils.tracing import get_tracer
+from .base import BaseLLMProvider, LLMResponse, Message, ProviderError, StreamChunk, ToolCall
+from .resilient import parse_retry_after
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class OpenAICompatibleProvider(BaseLLMProvider):
+    def __init__(
+        self,
+        base_url: str = "https://api.openai.com/v1",
+        api_key: str | None = None,
+        model_name: str = "gpt-4o-mini",
+        timeout: float = 120.0,
+        max_connections: int = 10,
+        http2: bool = True,
+    ):
+        super().__init__()
+
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+
+        self._client: httpx.Client | None = None
+        self._async_client: httpx.AsyncClient | None = None
+        self._tools_key: str | None = None
+        self._tools: list[dict[str, Any]] | None = None
+        self.tracer = get_tracer()
+
+    def chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        body = self._prepare_request(messages, tools, max_tokens, temperature)
+
+        with self.tracer.span("llm.chat", model=self.model_name) as attrs:
+            try:
+                response = self._get_client().post("/chat/completions", json=body)
+            except Exception as e:
+                raise self._transport_error(e) from e
+            self._check_status(response)
+            result = self._parse_response(response.json())
+            attrs.update(result.usage or {})
+
+        return result
+
+    def stream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> Iterator[StreamChunk]:
+        body = self._prepare_request(messages, tools, max_tokens, temperature, stream=True)
+        parser = StreamParser()
+        waited = 0.0
+        started = time.perf_counter()
+
+        try:
+            with self._get_client().stream("POST", "/chat/completions", json=body) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    self._check_status(response)
+
+                for line in response.iter_lines():
+                    waited += time.perf_counter() - started
+                    yield from parser.feed(line)
+                    started = time.perf_counter()
+                waited += time.perf_counter() - started
+        except ProviderError:
+            raise
+        except Exception as e:
+            if parser.started:
+                raise
+            raise self._transport_error(e) from e
+        finally:
+            self._record_stream(waited, parser.usage)
+
+        yield from parser.finish()
+
+    async def achat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        body = self._prepare_request(messages, tools, max_tokens, temperature)
+
+        with self.tracer.span("llm.chat", model=self.model_name) as attrs:
+            try:
+                response = await self._get_async_client().post("/chat/completions", json=body)
+            except Exception as e:
+                raise self._transport_error(e) from e
+            self._check_status(response)
+            result = self._parse_response(response.json())
+            attrs.update(result.usage or {})
+
+        return result
+
+    async def astream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[StreamChunk]:
+        body = self._prepare_request(messages, tools, max_tokens, temperature, stream=True)
+        client = self._get_async_client()
+        parser = StreamParser()
+        waited = 0.0
+        started = time.perf_counter()
+
+        try:
+            async with client.stream("POST", "/chat/completions", json=body) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    self._check_status(response)
+
+                async for line in response.aiter_lines():
+                    waited += time.perf_counter() - started
+                    for chunk in parser.feed(line):
+                        yield chunk
+                    started = time.perf_counter()
+                waited += time.perf_counter() - started
+        except ProviderError:
+            raise
+        except Exception as e:
+            if parser.started:
+                raise
+            raise self._transport_error(e) from e
+        finally:
+            self._record_stream(waited, parser.usage)
+
+        for chunk in parser.finish():
+            yield chunk
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def _record_stream(self, waited: float, usage: dict[str, int] | None) -> None:
+        self.tracer.record("llm.chat", waited, model=self.model_name, stream=True, **(usage or {}))
+
+    def _client_options(self) -> dict[str, Any]:
+        import httpx
+
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        return {
+            "base_url": self.base_url,
+            "headers": headers,
+            "http2": self.http2,
+            "timeout": httpx.Timeout(self.timeout, connect=10.0),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60.0,
+            ),
+        }
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            import httpx
+
+            self._async_client = httpx.AsyncClient(**self._client_options())
+        return self._async_client
+
+    def _prepare_request(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        with self.tracer.span("llm.convert"):
+            body: dict[str, Any] = {
+                "model": self.model_name,
+                "messages": self._convert_messages(messages),
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            }
+            converted_tools = self._get_tools(tools)
+            if converted_tools:
+                body["tools"] = converted_tools
+            if stream:
+                body["stream"] = True
+                body["stream_options"] = {"include_usage": True}
+            return body
+
+    def _convert_messages(self, messages: list[Message]) -> list[dict[str, Any]]:
+        converted = []
+
+        for msg in messages:
+            content = msg.native.get(self.name)
+            if content is None:
+                content = {"role": msg.role, "content": msg.content}
+                msg.native[self.name] = content
+            converted.append(content)
+
+        return converted
+
+    def _get_tools(self, tools: list[dict[str, Any]] | None) -> list[dict[str, Any]] | None:
+        if not tools:
+            return None
+
+        key = hashlib.sha256(json.dumps(tools, sort_keys=True).encode()).hexdigest()
+        if key != self._tools_key:
+            self._tools = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool["name"],
+                        "description": tool.get("description", ""),
+                        "parameters": tool.get("parameters", {}),
+                    },
+                }
+                for tool in tools
+            ]
+            self._tools_key = key
+
+        return self._tools
+
+    def _check_status(self, response: httpx.Response) -> None:
+        if response.status_code < 400:
+            return
+
+        raise ProviderError(
+            f"{self.base_url} returned {response.status_code}: {response.text[:500]}",
+            status_code=response.status_code,
+            retry_after=parse_retry_after(response.headers.get("retry-after")),
+        )
+
+    def _transport_error(self, error: Exception) -> Exception:
+        import httpx
+
+        if isinstance(error, httpx.TimeoutException):
+            return TimeoutError(f"Request to {self.base_url} timed out: {error}")
+        if isinstance(error, httpx.TransportError):
+            return ConnectionError(f"Request to {self.base_url} failed: {error}")
+        return error
+
+    def _parse_response(self, data: dict[str, Any]) -> LLMResponse:
+        choice = (data.get("choices") or [{}])[0]
+        message = choice.get("message") or {}
+
+        tool_calls = [
+            parse_tool_call(call.get("id"), call.get("function") or {})
+            for call in message.get("tool_calls") or []
+        ]
+
+        return LLMResponse(
+            content=message.get("content") or None,
+            tool_calls=tool_calls or None,
+            stop_reason=choice.get("finish_reason"),
+            usage=parse_usage(data.get("usage")),
+        )
+
+    def is_available(self) -> bool:
+        return bool(self.base_url and self.model_name)
+
+    @property
+    def name(self) -> str:
+        return "openai"
+
+
+class StreamParser:
+    def __init__(self):
+        self.started = False
+        self.stop_reason: str | None = None
+        self.usage: dict[str, int] | None = None
+        self._tool_calls: dict[int, dict[str, str]] = {}
+        self._emitted: set[int] = set()
+
+    def feed(self, line: str) -> Iterator[StreamChunk]:
+        if not line.startswith("data:"):
+            return
+
+        payload = line[len("data:") :].strip()
+        if not payload or payload == "[DONE]":
+            return
+
+        data = json.loads(payload)
+        self.started = True
+        self.usage = parse_usage(data.get("usage")) or self.usage
+
+        for choice in data.get("choices") or []:
+            self.stop_reason = choice.get("finish_reason") or self.stop_reason
+            delta = choice.get("delta") or {}
+
+            for call in delta.get("tool_calls") or []:
+                index = call.get("index", len(self._tool_calls) + len(self._emitted))
+                if index in self._emitted:
+                    continue
+                if index not in self._tool_calls:
+                    yield from self._flush(below=index)
+
+                pending = self._tool_calls.setdefault(index, {"id": "", "name": "", "arguments": ""})
+                function = call.get("function") or {}
+                pending["id"] = call.get("id") or pending["id"]
+                pending["name"] += function.get("name") or ""
+                pending["arguments"] += function.get("arguments") or ""
+
+            if delta.get("content"):
+                yield StreamChunk(text=delta["content"])
+
+            if choice.get("finish_reason") == "tool_calls":
+                yield from self._flush()
+
+    def finish(self) -> Iterator[StreamChunk]:
+        yield from self._flush()
+        yield StreamChunk(stop_reason=self.stop_reason, usage=self.usage)
+
+    def _flush(self, below: int | None = None) -> Iterator[StreamChunk]:
+        for index in sorted(self._tool_calls):
+            if below is not None and index >= below:
+                break
+            call = self._tool_calls.pop(index)
+            self._emitted.add(index)
+            yield StreamChunk(tool_call=parse_tool_call(call["id"], call))
+
+
+def parse_tool_call(call_id: str | None, function: dict[str, Any]) -> ToolCall:
+    name = function.get("name", "")
+    arguments = function.get("arguments") or {}
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        except json.JSONDecodeError as e:
+            error = f"Arguments for {name} are not valid JSON ({e}): {arguments[:2000]}"
+            return ToolCall(id=call_id or name, name=name, arguments={}, error=error)
+
+    return ToolCall(id=call_id or name, name=name, arguments=arguments)
+
+
+def parse_usage(usage: dict[str, Any] | None) -> dict[str, int] | None:
+    if not usage or not usage.get("total_tokens"):
+        return None
+
+    parsed = {
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage["total_tokens"],
+    }
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    if cached_tokens:
+        parsed["cached_tokens"] = cached_tokens
+    return parsed
@@ -0,0 +1,290 @@
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from contextlib import AsyncExitStack
+from email.utils import parsedate_to_datetime
+from typing import Any, TypeVar
+
+from ..utils.tracing import get_tracer
+from .base import BaseLLMProvider, LLMResponse, Message, StreamChunk
+from .limits import AdaptiveLimiter
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+OVERLOAD_STATUS = frozenset({429, 503})
+GRPC_STATUS = {
+    "RESOURCE_EXHAUSTED": 429,
+    "INTERNAL": 500,
+    "UNAVAILABLE": 503,
+    "DEADLINE_EXCEEDED": 504,
+}
+
+
+def error_status(error: BaseException) -> int | None:
+    code = getattr(error, "code", None)
+    if callable(code):
+        try:
+            return GRPC_STATUS.get(getattr(code(), "name", ""))
+        except Exception:
+            return None
+    if isinstance(code, int):
+        return code
+
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def retry_after(error: BaseException) -> float | None:
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        value = headers.get("retry-after") if headers else None
+    return parse_retry_after(value)
+
+
+def parse_retry_after(value: float | str | None) -> float | None:
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return error_status(error) in RETRYABLE_STATUS
+
+
+def is_overload(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    return error_status(error) in OVERLOAD_STATUS
+
+
+class ResilientProvider(BaseLLMProvider):
+    def __init__(
+        self,
+        provider: BaseLLMProvider,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_concurrency: int = 8,
+        hedge_after: float | None = None,
+    ):
+        super().__init__()
+        self.provider = provider
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after or None
+        self.limiter = AdaptiveLimiter(initial=max_concurrency, maximum=max_concurrency)
+        self.tracer = get_tracer()
+        self.retries = 0
+        self.hedges = 0
+
+    def chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        attempt = 0
+        while True:
+            try:
+                return self.provider.chat(
+                    messages, tools=tools, max_tokens=max_tokens, temperature=temperature
+                )
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    def stream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> Iterator[StreamChunk]:
+        attempt = 0
+        while True:
+            started = False
+            try:
+                for chunk in self.provider.stream_chat(
+                    messages, tools=tools, max_tokens=max_tokens, temperature=temperature
+                ):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                delay = None if started else self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def achat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        def request() -> Awaitable[LLMResponse]:
+            return self.provider.achat(
+                messages, tools=tools, max_tokens=max_tokens, temperature=temperature
+            )
+
+        attempt = 0
+        while True:
+            try:
+                return await self._hedged(lambda: self._limited(request))
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def astream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[StreamChunk]:
+        def request() -> AsyncIterator[StreamChunk]:
+            return self.provider.astream_chat(
+                messages, tools=tools, max_tokens=max_tokens, temperature=temperature
+            )
+
+        attempt = 0
+        while True:
+            try:
+                stack, stream, first = await self._hedged(
+                    lambda: self._open_stream(request), discard=lambda opened: opened[0].aclose()
+                )
+                break
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        async with stack:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+
+    async def _limited(self, request: Callable[[], Awaitable[T]]) -> T:
+        await self.limiter.acquire()
+        try:
+            result = await request()
+        except Exception as e:
+            self.limiter.release(ok=False, overloaded=is_overload(e))
+            raise
+        except BaseException:
+            self.limiter.release(ok=False)
+            raise
+
+        self.limiter.release()
+        return result
+
+    async def _open_stream(
+        self, request: Callable[[], AsyncIterator[StreamChunk]]
+    ) -> tuple[AsyncExitStack, AsyncIterator[StreamChunk], StreamChunk | None]:
+        await self.limiter.acquire()
+        try:
+            stream = request()
+            first = await anext(stream, None)
+        except BaseException as e:
+            self.limiter.release(ok=False, overloaded=isinstance(e, Exception) and is_overload(e))
+            raise
+
+        stack = AsyncExitStack()
+        stack.push(lambda exc_type, exc, tb: self.limiter.release(ok=exc_type is None))
+        stack.push_async_callback(stream.aclose)
+        return stack, stream, first
+
+    async def _hedged(
+        self,
+        attempt: Callable[[], Awaitable[T]],
+        discard: Callable[[T], Awaitable[Any]] | None = None,
+    ) -> T:
+        if self.hedge_after is None:
+            return await attempt()
+
+        done: set[asyncio.Future] = set()
+        pending = {asyncio.ensure_future(attempt())}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done and self.limiter.has_capacity:
+                self.hedges += 1
+                pending.add(asyncio.ensure_future(attempt()))
+
+            while True:
+                if not done:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                task = done.pop()
+                if task.exception() is None or not (done or pending):
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            for task in pending | done:
+                try:
+                    result = await task
+                except BaseException:
+                    continue
+                if discard:
+                    await discard(result)
+
+    def _backoff(self, error: Exception, attempt: int) -> float | None:
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        hint = retry_after(error)
+        if hint is not None:
+            delay = max(delay, min(hint, self.max_delay))
+
+        self.retries += 1
+        self.tracer.record("llm.backoff", delay, attempt=attempt + 1, status=error_status(error))
+        return delay
+
+    def invalidate_cache(self) -> None:
+        self.provider.invalidate_cache()
+
+    def close(self) -> None:
+        self.provider.close()
+
+    async def aclose(self) -> None:
+        await self.provider.aclose()
+
+    def is_available(self) -> bool:
+        return self.provider.is_available()
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
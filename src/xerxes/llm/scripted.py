@@ -0,0 +1,205 @@
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any
+
+from .base import (
+    BaseLLMProvider,
+    LLMResponse,
+    Message,
+    ProviderError,
+    StreamChunk,
+    ToolCall,
+    response_to_chunks,
+)
+
+RequestHook = Callable[[list[Message], list[dict[str, Any]] | None, int, float], Any]
+
+
+class ScriptedProvider(BaseLLMProvider):
+    def __init__(
+        self,
+        responses: list[LLMResponse],
+        chunk_size: int = 64,
+        prepare: RequestHook | None = None,
+    ):
+        super().__init__()
+        self.responses = responses
+        self.chunk_size = chunk_size
+        self.prepare = prepare
+        self.calls = 0
+
+    def chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        return self._next_response(messages, tools, max_tokens, temperature)
+
+    def stream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> Iterator[StreamChunk]:
+        response = self._next_response(messages, tools, max_tokens, temperature)
+
+        content = response.content or ""
+        for start in range(0, len(content), self.chunk_size):
+            yield StreamChunk(text=content[start : start + self.chunk_size])
+        for tool_call in response.tool_calls or []:
+            yield StreamChunk(tool_call=tool_call)
+        yield StreamChunk(stop_reason=response.stop_reason, usage=response.usage)
+
+    async def achat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        return self.chat(messages, tools=tools, max_tokens=max_tokens, temperature=temperature)
+
+    async def astream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ):
+        for chunk in self.stream_chat(
+            messages, tools=tools, max_tokens=max_tokens, temperature=temperature
+        ):
+            yield chunk
+
+    def _next_response(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None,
+        max_tokens: int,
+        temperature: float,
+    ) -> LLMResponse:
+        if self.prepare:
+            self.prepare(messages, tools, max_tokens, temperature)
+
+        if self.calls >= len(self.responses):
+            raise RuntimeError(f"ScriptedProvider ran out of responses after {self.calls} calls")
+
+        response = self.responses[self.calls]
+        self.calls += 1
+        return response
+
+    def is_available(self) -> bool:
+        return True
+
+    @property
+    def name(self) -> str:
+        return "scripted"
+
+
+class FlakyProvider(BaseLLMProvider):
+    def __init__(
+        self,
+        response: LLMResponse,
+        latency: float = 0.02,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.5,
+        error_rate: float = 0.0,
+        capacity: int | None = None,
+        retry_after: float | None = None,
+        seed: int = 0,
+    ):
+        super().__init__()
+        self.response = response
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+
+    def chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        self._admit()
+        try:
+            time.sleep(self._latency())
+        finally:
+            self.in_flight -= 1
+        return self.response
+
+    async def achat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        self._admit()
+        try:
+            await asyncio.sleep(self._latency())
+        finally:
+            self.in_flight -= 1
+        return self.response
+
+    async def astream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[StreamChunk]:
+        response = await self.achat(messages, tools, max_tokens, temperature)
+        for chunk in response_to_chunks(response):
+            yield chunk
+
+    def _admit(self) -> None:
+        self.calls += 1
+        overloaded = self.capacity is not None and self.in_flight >= self.capacity
+        if overloaded or self.rng.random() < self.error_rate:
+            self.rejected += 1
+            raise ProviderError(
+                "429 Resource exhausted", status_code=429, retry_after=self.retry_after
+            )
+        self.in_flight += 1
+
+    def _latency(self) -> float:
+        return self.slow_latency if self.rng.random() < self.slow_rate else self.latency
+
+    def is_available(self) -> bool:
+        return True
+
+    @property
+    def name(self) -> str:
+        return "flaky"
+
+
+def tool_call_response(*commands: str, content: str | None = None) -> LLMResponse:
+    return LLMResponse(
+        content=content,
+        tool_calls=[
+            ToolCall(
+                id=f"call_{idx}",
+                name="bash_execute",
+                arguments={"command": command, "reasoning": "scripted"},
+            )
+            for idx, command in enumerate(commands)
+        ],
+        stop_reason="tool_use",
+    )
+
+
+def text_response(content: str) -> LLMResponse:
+    return LLMResponse(content=content, stop_reason="end_turn")
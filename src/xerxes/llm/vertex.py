@@ -1,10 +1,21 @@
+from __future__ import annotations
+
+import hashlib
+import json
 import os
-from typing import Any
+import time
+from collections.abc import AsyncIterator, Iterator
+from typing import TYPE_CHECKING, Any
+
+from ..utils.tracing import get_tracer
+from .base import BaseLLMProvider, LLMResponse, Message, StreamChunk, ToolCall
+from .context_cache import ContextCache
+from .resilient import is_retryable
 
-from google.cloud import aiplatform
-from vertexai.generative_models import Content, FunctionDeclaration, GenerativeModel, Part, Tool
+if TYPE_CHECKING:
+    from vertexai.generative_models import Content, GenerativeModel, Tool
 
-from .base import BaseLLMProvider, LLMResponse, Message, ToolCall
+CACHE_RETRY_SECONDS = 60.0
 
 
 class VertexAIProvider(BaseLLMProvider):
@@ -14,19 +25,28 @@ class VertexAIProvider(BaseLLMProvider):
         location: str = "us-central1",
         model_name: str = "claude-3-5-sonnet@20240620",
         credentials_path: str | None = None,
+        context_cache: ContextCache | None = None,
     ):
         super().__init__()
 
         self.project_id = project_id or os.getenv("GOOGLE_CLOUD_PROJECT")
         self.location = location
         self.model_name = model_name
+        self.context_cache = context_cache
+
+        self._initialized = False
+        self._model: GenerativeModel | None = None
+        self._model_key: tuple[str | None, str | None] | None = None
+        self._model_cached = False
+        self._cache_expires = 0.0
+        self._cache_retry_at: float | None = None
+        self._tools_key: str | None = None
+        self._tools: list[Tool] | None = None
+        self.tracer = get_tracer()
 
         if credentials_path:
             os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
 
-        if self.project_id:
-            aiplatform.init(project=self.project_id, location=self.location)
-
     def chat(
         self,
         messages: list[Message],
@@ -34,45 +54,196 @@ class VertexAIProvider(BaseLLMProvider):
         max_tokens: int = 4096,
         temperature: float = 0.0,
     ) -> LLMResponse:
-        model = GenerativeModel(self.model_name)
-        contents = self._convert_messages(messages)
+        model, request = self._prepare_request(messages, tools, max_tokens, temperature)
+        with self.tracer.span("llm.chat", model=self.model_name) as attrs:
+            response = self._parse_response(model.generate_content(**request))
+            attrs.update(response.usage or {})
 
-        vertex_tools = None
-        if tools:
-            vertex_tools = [self._convert_tools(tools)]
+        return response
 
-        generation_config = {
-            "max_output_tokens": max_tokens,
-            "temperature": temperature,
-        }
+    def stream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> Iterator[StreamChunk]:
+        model, request = self._prepare_request(messages, tools, max_tokens, temperature)
 
-        response = model.generate_content(
-            contents,
-            tools=vertex_tools,
-            generation_config=generation_config,
-        )
+        stop_reason = None
+        usage = None
+        waited = 0.0
+        started = time.perf_counter()
+
+        try:
+            for response in model.generate_content(**request, stream=True):
+                waited += time.perf_counter() - started
+                yield from self._parse_stream_parts(response)
+                stop_reason = self._parse_stop_reason(response) or stop_reason
+                usage = self._parse_usage(response) or usage
+                started = time.perf_counter()
+            waited += time.perf_counter() - started
+        finally:
+            self._record_stream(waited, usage)
+
+        yield StreamChunk(stop_reason=stop_reason, usage=usage)
+
+    async def achat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> LLMResponse:
+        model, request = self._prepare_request(messages, tools, max_tokens, temperature)
+        with self.tracer.span("llm.chat", model=self.model_name) as attrs:
+            response = self._parse_response(await model.generate_content_async(**request))
+            attrs.update(response.usage or {})
+
+        return response
+
+    async def astream_chat(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[StreamChunk]:
+        model, request = self._prepare_request(messages, tools, max_tokens, temperature)
+
+        stop_reason = None
+        usage = None
+        waited = 0.0
+        started = time.perf_counter()
+
+        try:
+            responses = await model.generate_content_async(**request, stream=True)
+            async for response in responses:
+                waited += time.perf_counter() - started
+                for chunk in self._parse_stream_parts(response):
+                    yield chunk
+                stop_reason = self._parse_stop_reason(response) or stop_reason
+                usage = self._parse_usage(response) or usage
+                started = time.perf_counter()
+            waited += time.perf_counter() - started
+        finally:
+            self._record_stream(waited, usage)
+
+        yield StreamChunk(stop_reason=stop_reason, usage=usage)
 
-        return self._parse_response(response)
+    def _record_stream(self, waited: float, usage: dict[str, int] | None) -> None:
+        self.tracer.record("llm.chat", waited, model=self.model_name, stream=True, **(usage or {}))
+
+    def close(self) -> None:
+        if self.context_cache:
+            self.context_cache.delete()
+
+    def invalidate_cache(self) -> None:
+        self._model = None
+        self._model_key = None
+        self._tools_key = None
+        self._tools = None
+
+    def _prepare_request(
+        self,
+        messages: list[Message],
+        tools: list[dict[str, Any]] | None,
+        max_tokens: int,
+        temperature: float,
+    ) -> tuple[GenerativeModel, dict[str, Any]]:
+        with self.tracer.span("llm.convert"):
+            system_instruction, contents = self._convert_messages(messages)
+            converted_tools = self._get_tools(tools)
+            model = self._get_model(system_instruction, converted_tools)
+            request = {
+                "contents": contents,
+                "generation_config": {
+                    "max_output_tokens": max_tokens,
+                    "temperature": temperature,
+                },
+            }
+            if not self._model_cached:
+                request["tools"] = converted_tools
+            return model, request
+
+    def _initialize(self) -> None:
+        if self._initialized or not self.project_id:
+            return
+
+        from google.cloud import aiplatform
+
+        aiplatform.init(project=self.project_id, location=self.location)
+        self._initialized = True
+
+    def _get_model(
+        self, system_instruction: str | None, tools: list[Tool] | None
+    ) -> GenerativeModel:
+        key = (system_instruction, self._tools_key if tools else None)
+        now = time.monotonic()
+        expired = self._model_cached and now >= self._cache_expires
+        retry = self._cache_retry_at is not None and now >= self._cache_retry_at
+
+        if self._model is None or key != self._model_key or expired or retry:
+            self._initialize()
+            self._model = self._build_model(system_instruction, tools)
+            self._model_key = key
+        return self._model
+
+    def _build_model(
+        self, system_instruction: str | None, tools: list[Tool] | None
+    ) -> GenerativeModel:
+        self._cache_retry_at = None
+        if self.context_cache and (system_instruction or tools):
+            try:
+                model = self.context_cache.create(self.model_name, system_instruction, tools)
+                self._model_cached = True
+                self._cache_expires = time.monotonic() + self.context_cache.ttl_seconds * 0.9
+                return model
+            except Exception as e:
+                if is_retryable(e):
+                    self._cache_retry_at = time.monotonic() + CACHE_RETRY_SECONDS
+                else:
+                    self.context_cache = None
+
+        from vertexai.generative_models import GenerativeModel
+
+        self._model_cached = False
+        return GenerativeModel(self.model_name, system_instruction=system_instruction)
+
+    def _get_tools(self, tools: list[dict[str, Any]] | None) -> list[Tool] | None:
+        if not tools:
+            return None
+
+        key = hashlib.sha256(json.dumps(tools, sort_keys=True).encode()).hexdigest()
+        if key != self._tools_key:
+            self._tools = [self._convert_tools(tools)]
+            self._tools_key = key
+
+        return self._tools
+
+    def _convert_messages(self, messages: list[Message]) -> tuple[str | None, list[Content]]:
+        from vertexai.generative_models import Content, Part
 
-    def _convert_messages(self, messages: list[Message]) -> list[Content]:
         contents = []
         system_instruction = None
 
         for msg in messages:
             if msg.role == "system":
                 system_instruction = msg.content
-            else:
-                role = "model" if msg.role == "assistant" else msg.role
-                contents.append(Content(role=role, parts=[Part.from_text(msg.content)]))
+                continue
 
-        if system_instruction:
-            contents.insert(
-                0, Content(role="user", parts=[Part.from_text(f"System: {system_instruction}")])
-            )
+            content = msg.native.get(self.name)
+            if content is None:
+                role = "model" if msg.role == "assistant" else msg.role
+                content = Content(role=role, parts=[Part.from_text(msg.content)])
+                msg.native[self.name] = content
+            contents.append(content)
 
-        return contents
+        return system_instruction, contents
 
     def _convert_tools(self, tools: list[dict[str, Any]]) -> Tool:
+        from vertexai.generative_models import FunctionDeclaration, Tool
+
         function_declarations = []
 
         for tool in tools:
@@ -102,38 +273,69 @@ class VertexAIProvider(BaseLLMProvider):
             if hasattr(candidate.content, "parts"):
                 for part in candidate.content.parts:
                     if hasattr(part, "function_call") and part.function_call:
-                        fc = part.function_call
-                        tool_call = ToolCall(
-                            id=fc.name,
-                            name=fc.name,
-                            arguments=dict(fc.args) if fc.args else {},
-                        )
-                        tool_calls.append(tool_call)
+                        tool_calls.append(self._parse_function_call(part.function_call))
 
             if hasattr(candidate, "finish_reason"):
                 stop_reason = str(candidate.finish_reason)
 
-        usage = None
-        if hasattr(response, "usage_metadata"):
-            usage = {
-                "prompt_tokens": response.usage_metadata.prompt_token_count,
-                "completion_tokens": response.usage_metadata.candidates_token_count,
-                "total_tokens": response.usage_metadata.total_token_count,
-            }
-
         return LLMResponse(
             content=content,
             tool_calls=tool_calls if tool_calls else None,
             stop_reason=stop_reason,
-            usage=usage,
+            usage=self._parse_usage(response),
         )
 
+    def _parse_stream_parts(self, response) -> Iterator[StreamChunk]:
+        if not response.candidates:
+            return
+
+        for part in response.candidates[0].content.parts:
+            if part.function_call:
+                yield StreamChunk(tool_call=self._parse_function_call(part.function_call))
+                continue
+
+            try:
+                text = part.text
+            except (ValueError, AttributeError):
+                text = None
+
+            if text:
+                yield StreamChunk(text=text)
+
+    def _parse_stop_reason(self, response) -> str | None:
+        if response.candidates and response.candidates[0].finish_reason:
+            return str(response.candidates[0].finish_reason)
+        return None
+
+    def _parse_function_call(self, fc) -> ToolCall:
+        return ToolCall(
+            id=fc.name,
+            name=fc.name,
+            arguments=dict(fc.args) if fc.args else {},
+        )
+
+    def _parse_usage(self, response) -> dict[str, int] | None:
+        usage_metadata = getattr(response, "usage_metadata", None)
+        if not usage_metadata or not usage_metadata.total_token_count:
+            return None
+
+        usage = {
+            "prompt_tokens": usage_metadata.prompt_token_count,
+            "completion_tokens": usage_metadata.candidates_token_count,
+            "total_tokens": usage_metadata.total_token_count,
+        }
+        cached_tokens = getattr(usage_metadata, "cached_content_token_count", 0)
+        if cached_tokens:
+            usage["cached_tokens"] = cached_tokens
+        return usage
+
     def is_available(self) -> bool:
         if not self.project_id:
             return False
 
         try:
-            aiplatform.init(project=self.project_id, location=self.location)
+            self._initialized = False
+            self._initialize()
             return True
         except Exception:
             return False
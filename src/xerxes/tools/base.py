@@ -1,11 +1,17 @@
 import shlex
 import shutil
-import subprocess
 from abc import ABC, abstractmethod
 from typing import Any
 
+from .capture import OutputCallback, arun_captured, run_captured
+from .spool import OutputSpool
+
 
 class BaseTool(ABC):
+    max_output_bytes: int = 1_000_000
+    spool: OutputSpool | None = None
+    readonly: bool = False
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -46,44 +52,42 @@ class BaseTool(ABC):
             }
         ]
 
-    def execute_raw_command(self, command: list[str], timeout: int = 300) -> dict[str, Any]:
-        try:
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                check=False,
-            )
-
-            return {
-                "success": result.returncode == 0,
-                "stdout": result.stdout.strip(),
-                "stderr": result.stderr.strip(),
-                "exit_code": result.returncode,
-            }
-        except subprocess.TimeoutExpired:
-            return {
-                "success": False,
-                "stdout": "",
-                "stderr": f"Command timed out after {timeout} seconds",
-                "exit_code": -1,
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "stdout": "",
-                "stderr": str(e),
-                "exit_code": -1,
-            }
+    def execute_raw_command(
+        self, command: list[str], timeout: int = 300, on_output: OutputCallback | None = None
+    ) -> dict[str, Any]:
+        return run_captured(command, timeout, self.max_output_bytes, on_output, self.spool)
+
+    async def aexecute_raw_command(
+        self, command: list[str], timeout: int = 300, on_output: OutputCallback | None = None
+    ) -> dict[str, Any]:
+        return await arun_captured(
+            command, timeout, self.max_output_bytes, on_output, self.spool
+        )
 
-    def execute_function(self, function_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+    def execute_function(
+        self,
+        function_name: str,
+        arguments: dict[str, Any],
+        on_output: OutputCallback | None = None,
+    ) -> dict[str, Any]:
         if function_name != f"{self.name}_execute":
             return {"success": False, "error": f"Unknown function: {function_name}"}
 
+        return self.execute_raw_command(self._split_command(arguments), on_output=on_output)
+
+    async def aexecute_function(
+        self,
+        function_name: str,
+        arguments: dict[str, Any],
+        on_output: OutputCallback | None = None,
+    ) -> dict[str, Any]:
+        if function_name != f"{self.name}_execute":
+            return {"success": False, "error": f"Unknown function: {function_name}"}
+
+        return await self.aexecute_raw_command(self._split_command(arguments), on_output=on_output)
+
+    def _split_command(self, arguments: dict[str, Any]) -> list[str]:
         command_str = arguments.get("command", "")
 
         full_command = f"{self.cli_command} {command_str}"
-        command_parts = shlex.split(full_command)
-
-        return self.execute_raw_command(command_parts)
+        return shlex.split(full_command)
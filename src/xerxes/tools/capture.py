@@ -0,0 +1,275 @@
+import asyncio
+import codecs
+import subprocess
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import IO, Any
+
+from .spool import PREVIEW_LINES, OutputSpool, SpooledOutput
+
+OutputCallback = Callable[[str], None]
+
+CHUNK_SIZE = 64 * 1024
+
+
+class OutputBuffer:
+    def __init__(
+        self,
+        max_bytes: int,
+        on_output: OutputCallback | None = None,
+        spool: OutputSpool | None = None,
+    ):
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail: deque[bytes] = deque()
+        self.tail_size = 0
+        self.total_bytes = 0
+        self.on_output = on_output
+        self.spool = spool
+        self.spooled: SpooledOutput | None = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._handle: str | None = None
+        self._file: IO[bytes] | None = None
+        self._spooled_bytes = 0
+        self._spooled_lines = 0
+        self._last_byte = b""
+
+    def write(self, data: bytes) -> None:
+        self.total_bytes += len(data)
+
+        if self.on_output:
+            text = self._decoder.decode(data)
+            if text:
+                self.on_output(text)
+
+        if self._handle is not None:
+            self._spool_write(data)
+            return
+
+        spool = self.spool
+        if spool and self.total_bytes > min(spool.threshold, self.head_limit + self.tail_limit):
+            self._start_spool(data)
+            return
+
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+
+        if not data:
+            return
+
+        self.tail.append(data)
+        self.tail_size += len(data)
+
+        while self.tail and self.tail_size - len(self.tail[0]) >= self.tail_limit:
+            self.tail_size -= len(self.tail.popleft())
+
+    def finish(self) -> SpooledOutput | None:
+        file, self._file = self._file, None
+        if file is not None:
+            if self._last_byte not in (b"", b"\n"):
+                self._spooled_lines += 1
+            self.spooled = self.spool.register(
+                self._handle, file, self._spooled_lines, self.dropped_bytes
+            )
+        return self.spooled
+
+    @property
+    def dropped_bytes(self) -> int:
+        if self._handle is not None:
+            return self.total_bytes - self._spooled_bytes
+        return max(0, self.total_bytes - len(self.head) - self.tail_limit)
+
+    def getvalue(self) -> str:
+        if self.spooled is not None:
+            return self.spool.summarize(self.spooled)
+
+        tail = b"".join(self.tail)
+        if len(tail) > self.tail_limit:
+            tail = tail[len(tail) - self.tail_limit :]
+
+        dropped = self.dropped_bytes
+        if not dropped:
+            return (bytes(self.head) + tail).decode(errors="replace")
+
+        return (
+            self.head.decode(errors="replace")
+            + f"\n... [{dropped} bytes dropped] ...\n"
+            + tail.decode(errors="replace")
+        )
+
+    def _start_spool(self, data: bytes) -> None:
+        self._handle, self._file = self.spool.create()
+        buffered = bytes(self.head) + b"".join(self.tail)
+        self.head = bytearray()
+        self.tail.clear()
+        self.tail_size = 0
+        self._spool_write(buffered + data)
+
+    def _spool_write(self, data: bytes) -> None:
+        file = self._file
+        room = self.spool.max_output_bytes - self._spooled_bytes
+        if file is None or room <= 0 or not data:
+            return
+
+        data = data[:room]
+        file.write(data)
+        self._spooled_bytes += len(data)
+        self._spooled_lines += data.count(b"\n")
+        self._last_byte = data[-1:]
+
+
+def build_result(
+    exit_code: int, stdout: OutputBuffer, stderr: OutputBuffer, error: str | None = None
+) -> dict[str, Any]:
+    spooled = stdout.finish()
+    stderr_text = stderr.getvalue().strip()
+    if error:
+        stderr_text = f"{stderr_text}\n{error}".strip()
+
+    result = {
+        "success": exit_code == 0 and error is None,
+        "stdout": stdout.getvalue().strip(),
+        "stderr": stderr_text,
+        "exit_code": exit_code,
+    }
+
+    if stdout.dropped_bytes:
+        result["stdout_dropped_bytes"] = stdout.dropped_bytes
+    if stderr.dropped_bytes:
+        result["stderr_dropped_bytes"] = stderr.dropped_bytes
+    if spooled:
+        result["spooled"] = {
+            "handle": spooled.handle,
+            "lines": spooled.lines,
+            "bytes": spooled.size,
+        }
+        result["note"] = (
+            f"Output has {spooled.lines} lines; only the first and last {PREVIEW_LINES} are "
+            f"shown. Call output_query with handle {spooled.handle} to read or grep the rest "
+            "instead of re-running the command."
+        )
+
+    return result
+
+
+def error_result(message: str) -> dict[str, Any]:
+    return {
+        "success": False,
+        "stdout": "",
+        "stderr": message,
+        "exit_code": -1,
+    }
+
+
+def run_captured(
+    args: list[str] | str,
+    timeout: int,
+    max_bytes: int,
+    on_output: OutputCallback | None = None,
+    spool: OutputSpool | None = None,
+    **popen_kwargs: Any,
+) -> dict[str, Any]:
+    stdout = OutputBuffer(max_bytes, on_output, spool)
+    stderr = OutputBuffer(max_bytes, on_output)
+
+    try:
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **popen_kwargs,
+        )
+    except Exception as e:
+        return error_result(str(e))
+
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, stdout), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    error = None
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill(process)
+        process.wait()
+        error = f"Command timed out after {timeout} seconds"
+    except BaseException:
+        _kill(process)
+        raise
+    finally:
+        for reader in readers:
+            reader.join(timeout=1)
+
+    return build_result(process.returncode if error is None else -1, stdout, stderr, error)
+
+
+async def arun_captured(
+    args: list[str],
+    timeout: int,
+    max_bytes: int,
+    on_output: OutputCallback | None = None,
+    spool: OutputSpool | None = None,
+) -> dict[str, Any]:
+    stdout = OutputBuffer(max_bytes, on_output, spool)
+    stderr = OutputBuffer(max_bytes, on_output)
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except Exception as e:
+        return error_result(str(e))
+
+    readers = asyncio.gather(
+        _apump(process.stdout, stdout),
+        _apump(process.stderr, stderr),
+    )
+
+    error = None
+    try:
+        await asyncio.wait_for(process.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        _kill(process)
+        await process.wait()
+        error = f"Command timed out after {timeout} seconds"
+    except asyncio.CancelledError:
+        _kill(process)
+        readers.cancel()
+        raise
+
+    try:
+        await asyncio.wait_for(readers, timeout=1)
+    except asyncio.TimeoutError:
+        pass
+
+    return build_result(process.returncode if error is None else -1, stdout, stderr, error)
+
+
+def _pump(stream: IO[bytes], buffer: OutputBuffer) -> None:
+    with stream:
+        while chunk := stream.read1(CHUNK_SIZE):
+            buffer.write(chunk)
+
+
+async def _apump(stream: asyncio.StreamReader, buffer: OutputBuffer) -> None:
+    while chunk := await stream.read(CHUNK_SIZE):
+        buffer.write(chunk)
+
+
+def _kill(process: subprocess.Popen | asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
+
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Any
+
+from .base import BaseTool
+from .capture import OutputCallback
+from .spool import MAX_QUERY_LINES, OutputSpool
+
+
+class OutputQueryTool(BaseTool):
+    readonly = True
+
+    def __init__(self, spool: OutputSpool):
+        self.spool = spool
+
+    @property
+    def name(self) -> str:
+        return "output_query"
+
+    @property
+    def cli_command(self) -> str:
+        return "output_query"
+
+    @property
+    def description(self) -> str:
+        return "Read slices of large command outputs that were spooled to disk"
+
+    def is_installed(self) -> bool:
+        return True
+
+    def get_function_schemas(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "name": "output_query",
+                "description": (
+                    "Read part of a large command output that was spooled to disk. Results with a "
+                    "'spooled' handle only show the first and last lines; use this to page through "
+                    "or grep the rest instead of re-running the command. "
+                    f"Returns at most {MAX_QUERY_LINES} lines per call."
+                ),
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "handle": {
+                            "type": "string",
+                            "description": "Handle from the 'spooled' field of a previous result, e.g. 'out-3'",
+                        },
+                        "mode": {
+                            "type": "string",
+                            "enum": ["lines", "grep", "head", "tail"],
+                            "description": "lines: read start..end, grep: lines matching pattern, head/tail: first/last count lines",
+                        },
+                        "start": {
+                            "type": "integer",
+                            "description": "First line to read (1-based), for mode 'lines'",
+                        },
+                        "end": {
+                            "type": "integer",
+                            "description": "Last line to read (inclusive), for mode 'lines'",
+                        },
+                        "pattern": {
+                            "type": "string",
+                            "description": "Regular expression to search for, for mode 'grep'",
+                        },
+                        "count": {
+                            "type": "integer",
+                            "description": "Number of lines (head/tail) or matches (grep) to return, default 50",
+                        },
+                    },
+                    "required": ["handle", "mode"],
+                },
+            }
+        ]
+
+    def execute_function(
+        self,
+        function_name: str,
+        arguments: dict[str, Any],
+        on_output: OutputCallback | None = None,
+    ) -> dict[str, Any]:
+        if function_name != "output_query":
+            return {"success": False, "error": f"Unknown function: {function_name}"}
+
+        return self.spool.query(arguments)
+
+    async def aexecute_function(
+        self,
+        function_name: str,
+        arguments: dict[str, Any],
+        on_output: OutputCallback | None = None,
+    ) -> dict[str, Any]:
+        return await asyncio.to_thread(self.execute_function, function_name, arguments, on_output)
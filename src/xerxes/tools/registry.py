@@ -1,14 +1,26 @@
+import os
 from typing import Any
 
 from .base import BaseTool
+from .capture import OutputCallback
 
 
 class ToolRegistry:
     def __init__(self):
         self._tools: dict[str, BaseTool] = {}
+        self._availability: dict[str, bool] = {}
+        self._function_index: dict[str, BaseTool] | None = None
+        self._schemas: list[dict[str, Any]] = []
+        self._indexed_path: str | None = None
+        self.revision = 0
 
     def register(self, tool: BaseTool) -> None:
         self._tools[tool.name] = tool
+        self.refresh()
+
+    def refresh(self) -> None:
+        self._function_index = None
+        self.revision += 1
 
     def get_tool(self, name: str) -> BaseTool | None:
         return self._tools.get(name)
@@ -17,21 +29,62 @@ class ToolRegistry:
         return list(self._tools.values())
 
     def get_available_tools(self) -> list[BaseTool]:
-        return [tool for tool in self._tools.values() if tool.is_installed()]
+        self._ensure_index()
+        return [tool for name, tool in self._tools.items() if self._availability.get(name)]
 
     def get_function_schemas(self) -> list[dict[str, Any]]:
+        self._ensure_index()
+        return list(self._schemas)
+
+    def find_tool(self, function_name: str) -> BaseTool | None:
+        return self._ensure_index().get(function_name)
+
+    def execute_function(
+        self,
+        function_name: str,
+        arguments: dict[str, Any],
+        on_output: OutputCallback | None = None,
+    ) -> dict[str, Any]:
+        tool = self.find_tool(function_name)
+        if tool is None:
+            raise ValueError(f"Function '{function_name}' not found in any registered tool")
+
+        return tool.execute_function(function_name, arguments, on_output=on_output)
+
+    async def aexecute_function(
+        self,
+        function_name: str,
+        arguments: dict[str, Any],
+        on_output: OutputCallback | None = None,
+    ) -> dict[str, Any]:
+        tool = self.find_tool(function_name)
+        if tool is None:
+            raise ValueError(f"Function '{function_name}' not found in any registered tool")
+
+        return await tool.aexecute_function(function_name, arguments, on_output=on_output)
+
+    def _ensure_index(self) -> dict[str, BaseTool]:
+        path = os.environ.get("PATH", "")
+        if self._function_index is not None and path == self._indexed_path:
+            return self._function_index
+
+        availability = {name: tool.is_installed() for name, tool in self._tools.items()}
+        function_index = {}
         schemas = []
-        for tool in self.get_available_tools():
-            schemas.extend(tool.get_function_schemas())
-        return schemas
 
-    def execute_function(self, function_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
-        for tool in self.get_available_tools():
-            schemas = tool.get_function_schemas()
-            if any(schema["name"] == function_name for schema in schemas):
-                return tool.execute_function(function_name, arguments)
+        for name, tool in self._tools.items():
+            if not availability[name]:
+                continue
+            for schema in tool.get_function_schemas():
+                function_index[schema["name"]] = tool
+                schemas.append(schema)
+
+        self._availability = availability
+        self._schemas = schemas
+        self._indexed_path = path
+        self._function_index = function_index
 
-        raise ValueError(f"Function '{function_name}' not found in any registered tool")
+        return function_index
 
 
 _registry = ToolRegistry()
@@ -0,0 +1,90 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any
+
+from ..executor.safety import classify_command
+
+CLASS_TTLS = {
+    "filesystem": 5.0,
+    "text": 5.0,
+    "process": 5.0,
+    "docker": 10.0,
+    "kubernetes": 15.0,
+    "git": 10.0,
+    "cloud": 30.0,
+    "system": 300.0,
+}
+
+CLASS_ENV = {
+    "kubernetes": ("KUBECONFIG",),
+    "docker": ("DOCKER_HOST", "DOCKER_CONTEXT"),
+    "git": ("GIT_DIR", "GIT_WORK_TREE"),
+}
+
+CacheKey = tuple[str, str, tuple[str | None, ...]]
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.generation = 0
+        self._entries: OrderedDict[CacheKey, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def prepare(self, command: str, cwd: str | None) -> tuple[CacheKey | None, float]:
+        command = command.strip()
+        classification = classify_command(command)
+        if not classification.is_readonly or "shell" in classification.categories:
+            self.flush()
+            return None, 0.0
+
+        categories = classification.categories
+        if not categories or not categories <= CLASS_TTLS.keys():
+            return None, 0.0
+
+        env_names = sorted({name for category in categories for name in CLASS_ENV.get(category, ())})
+        env = tuple(os.environ.get(name) for name in env_names)
+        ttl = min(CLASS_TTLS[category] for category in categories)
+        return (command, cwd or os.getcwd(), env), ttl
+
+    def get(self, key: CacheKey, ttl: float) -> dict[str, Any] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, result = entry
+            age = time.monotonic() - stored_at
+
+            if age <= ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return {**result, "cached": True, "cache_age_seconds": round(age, 1)}
+
+            del self._entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, result: dict[str, Any], generation: int) -> None:
+        if generation != self.generation or not result.get("success"):
+            return
+
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def flush(self) -> None:
+        self.generation += 1
+        if self._entries:
+            self._entries.clear()
+            self.flushes += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "flushes": self.flushes,
+            "entries": len(self._entries),
+        }
@@ -1,16 +1,43 @@
+import asyncio
 import platform
 import subprocess
 from typing import Any
 
+from ..utils.tracing import get_tracer
 from .base import BaseTool
+from .capture import OutputCallback, arun_captured, run_captured
+from .result_cache import CacheKey, ResultCache
+from .shell_session import PersistentShell
+from .spool import OutputSpool
 
 
 class ShellTool(BaseTool):
-    def __init__(self):
+    def __init__(
+        self,
+        max_output_bytes: int | None = None,
+        persistent: bool = False,
+        cache_results: bool = False,
+        spool: OutputSpool | None = None,
+    ):
+        if max_output_bytes is not None:
+            self.max_output_bytes = max_output_bytes
+        self.spool = spool
+
         self.os_type = platform.system()
         self.is_windows = self.os_type == "Windows"
         self.shell_name = "powershell" if self.is_windows else "bash"
         self.shell_executable = "powershell.exe" if self.is_windows else "/bin/bash"
+
+        self.session: PersistentShell | None = None
+        if persistent and not self.is_windows:
+            self.session = PersistentShell(
+                self.shell_executable, self.max_output_bytes, self.spool
+            )
+
+        self.cache: ResultCache | None = None
+        if cache_results and not self.is_windows:
+            self.cache = ResultCache()
+
     @property
     def name(self) -> str:
         return "bash"
@@ -57,54 +84,107 @@ class ShellTool(BaseTool):
             }
         ]
 
-    def execute_raw_command(self, command: list[str], timeout: int = 300) -> dict[str, Any]:
-        try:
-            if self.is_windows:
-                result = subprocess.run(
-                    ["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", command],
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                    check=False,
-                )
-            else:
-                result = subprocess.run(
-                    command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                    check=False,
-                    executable="/bin/bash",
-                )
+    def execute_raw_command(
+        self, command: str, timeout: int = 300, on_output: OutputCallback | None = None
+    ) -> dict[str, Any]:
+        if self.session:
+            return self.session.run(command, timeout, on_output)
+        return run_captured(
+            self._shell_args(command), timeout, self.max_output_bytes, on_output, self.spool
+        )
 
-            return {
-                "success": result.returncode == 0,
-                "stdout": result.stdout.strip(),
-                "stderr": result.stderr.strip(),
-                "exit_code": result.returncode,
-            }
-        except subprocess.TimeoutExpired:
-            return {
-                "success": False,
-                "stdout": "",
-                "stderr": f"Command timed out after {timeout} seconds",
-                "exit_code": -1,
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "stdout": "",
-                "stderr": str(e),
-                "exit_code": -1,
-            }
+    async def aexecute_raw_command(
+        self, command: str, timeout: int = 300, on_output: OutputCallback | None = None
+    ) -> dict[str, Any]:
+        if self.session:
+            try:
+                return await asyncio.to_thread(self.session.run, command, timeout, on_output)
+            except asyncio.CancelledError:
+                self.session.interrupt()
+                raise
+        return await arun_captured(
+            self._shell_args(command), timeout, self.max_output_bytes, on_output, self.spool
+        )
 
-    def execute_function(self, function_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+    def execute_function(
+        self,
+        function_name: str,
+        arguments: dict[str, Any],
+        on_output: OutputCallback | None = None,
+    ) -> dict[str, Any]:
         if function_name != "bash_execute":
             return {"success": False, "error": f"Unknown function: {function_name}"}
 
         command_str = arguments.get("command", "")
-        return self.execute_raw_command(command_str)
+        if not self.cache:
+            return self.execute_raw_command(command_str, on_output=on_output)
+
+        key, cached = self._cache_lookup(command_str)
+        if key is None:
+            return self.execute_raw_command(command_str, on_output=on_output)
+        if cached is not None:
+            return cached
+
+        generation = self.cache.generation
+        result = self.execute_raw_command(command_str, on_output=on_output)
+        self.cache.put(key, result, generation)
+        return result
+
+    async def aexecute_function(
+        self,
+        function_name: str,
+        arguments: dict[str, Any],
+        on_output: OutputCallback | None = None,
+    ) -> dict[str, Any]:
+        if function_name != "bash_execute":
+            return {"success": False, "error": f"Unknown function: {function_name}"}
+
+        command_str = arguments.get("command", "")
+        if not self.cache:
+            return await self.aexecute_raw_command(command_str, on_output=on_output)
+
+        key, cached = self._cache_lookup(command_str)
+        if key is None:
+            return await self.aexecute_raw_command(command_str, on_output=on_output)
+        if cached is not None:
+            return cached
+
+        generation = self.cache.generation
+        result = await self.aexecute_raw_command(command_str, on_output=on_output)
+        self.cache.put(key, result, generation)
+        return result
+
+    def _cache_lookup(self, command: str) -> tuple[CacheKey | None, dict[str, Any] | None]:
+        key, ttl = self.cache.prepare(command, self._cwd())
+        if key is None:
+            return None, None
+
+        cached = self.cache.get(key, ttl)
+        stats = self.cache.stats()
+        get_tracer().record(
+            "tool.cache",
+            0.0,
+            hit=cached is not None,
+            entries=stats["entries"],
+            flushes=stats["flushes"],
+        )
+        return key, cached
+
+    def _shell_args(self, command: str) -> list[str]:
+        if self.is_windows:
+            return ["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", command]
+        return [self.shell_executable, "-c", command]
+
+    def _cwd(self) -> str | None:
+        return self.session.cwd if self.session else None
+
+    def restart_session(self) -> None:
+        if self.session:
+            self.session.restart()
+
+    def close(self) -> None:
+        if self.session:
+            self.session.close()
 
     def get_version(self) -> str | None:
         try:
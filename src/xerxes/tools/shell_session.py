@@ -0,0 +1,214 @@
+import os
+import signal
+import subprocess
+import threading
+import uuid
+from typing import IO, Any
+
+from .capture import CHUNK_SIZE, OutputBuffer, OutputCallback, build_result, error_result
+from .spool import OutputSpool
+
+INTERRUPT_GRACE = 2.0
+
+
+class _PendingCommand:
+    def __init__(
+        self,
+        token: str,
+        max_bytes: int,
+        on_output: OutputCallback | None,
+        spool: OutputSpool | None = None,
+    ):
+        self.token = token.encode()
+        self.stdout = OutputBuffer(max_bytes, on_output, spool)
+        self.stderr = OutputBuffer(max_bytes, on_output)
+        self.stdout_done = threading.Event()
+        self.stderr_done = threading.Event()
+        self.exit_code: int | None = None
+        self.cwd: str | None = None
+        self._held = {True: b"", False: b""}
+
+    def wait(self, timeout: float) -> bool:
+        return self.stdout_done.wait(timeout) and self.stderr_done.wait(timeout)
+
+    def write(self, line: bytes, is_stdout: bool) -> None:
+        data = self._held[is_stdout] + line
+        self._held[is_stdout] = b""
+        if data.endswith(b"\n"):
+            data, self._held[is_stdout] = data[:-1], b"\n"
+        if data:
+            (self.stdout if is_stdout else self.stderr).write(data)
+
+
+class PersistentShell:
+    def __init__(
+        self,
+        executable: str = "/bin/bash",
+        max_output_bytes: int = 1_000_000,
+        spool: OutputSpool | None = None,
+    ):
+        self.executable = executable
+        self.max_output_bytes = max_output_bytes
+        self.spool = spool
+        self.cwd: str | None = None
+        self.starts = 0
+        self._process: subprocess.Popen | None = None
+        self._pending: _PendingCommand | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def run(
+        self, command: str, timeout: int = 300, on_output: OutputCallback | None = None
+    ) -> dict[str, Any]:
+        with self._lock:
+            if not self.is_running:
+                try:
+                    self._start()
+                except Exception as e:
+                    return error_result(str(e))
+
+            token = f"__XERXES_{uuid.uuid4().hex}__"
+            pending = _PendingCommand(token, self.max_output_bytes, on_output, self.spool)
+            self._pending = pending
+
+            try:
+                self._process.stdin.write(self._wrap(command, token).encode())
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self._pending = None
+                self._terminate()
+                return error_result(f"Shell session died: {e}")
+
+            try:
+                finished = pending.wait(timeout)
+            except BaseException:
+                self._pending = None
+                self._terminate()
+                raise
+            self._pending = None
+
+            if not finished:
+                self._terminate()
+                return build_result(
+                    -1,
+                    pending.stdout,
+                    pending.stderr,
+                    f"Command timed out after {timeout} seconds; shell session was restarted",
+                )
+
+            if pending.exit_code is None:
+                exit_code = self._process.wait()
+                self._terminate()
+                return build_result(
+                    exit_code,
+                    pending.stdout,
+                    pending.stderr,
+                    "Shell session exited; a new session will be started for the next command",
+                )
+
+            self.cwd = pending.cwd
+            return build_result(pending.exit_code, pending.stdout, pending.stderr)
+
+    def interrupt(self) -> None:
+        process, pending = self._process, self._pending
+        if process is None or pending is None:
+            return
+
+        _signal_group(process, signal.SIGINT)
+        timer = threading.Timer(INTERRUPT_GRACE, self._kill_stuck, args=(process, pending))
+        timer.daemon = True
+        timer.start()
+
+    def restart(self) -> None:
+        with self._lock:
+            self._terminate()
+            self._start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._terminate()
+
+    def _start(self) -> None:
+        self._process = subprocess.Popen(
+            [self.executable, "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            start_new_session=True,
+        )
+        self.starts += 1
+        self._process.stdin.write(b"trap : INT\n")
+        self._process.stdin.flush()
+
+        for stream, is_stdout in ((self._process.stdout, True), (self._process.stderr, False)):
+            threading.Thread(
+                target=self._read, args=(self._process, stream, is_stdout), daemon=True
+            ).start()
+
+    def _terminate(self) -> None:
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+
+        if process.poll() is None:
+            _signal_group(process, signal.SIGKILL)
+        process.wait()
+
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+    def _kill_stuck(self, process: subprocess.Popen, pending: _PendingCommand) -> None:
+        if self._pending is pending and self._process is process:
+            _signal_group(process, signal.SIGKILL)
+
+    def _read(self, process: subprocess.Popen, stream: IO[bytes], is_stdout: bool) -> None:
+        with stream:
+            for line in iter(lambda: stream.readline(CHUNK_SIZE), b""):
+                pending = self._pending
+                if pending is None or self._process is not process:
+                    continue
+
+                if line.startswith(pending.token):
+                    if is_stdout:
+                        _, exit_code, cwd = line.decode(errors="replace").rstrip("\n").split(" ", 2)
+                        pending.exit_code = int(exit_code)
+                        pending.cwd = cwd
+                        pending.stdout_done.set()
+                    else:
+                        pending.stderr_done.set()
+                    continue
+
+                pending.write(line, is_stdout)
+
+        pending = self._pending
+        if pending is not None and self._process is process:
+            pending.stdout_done.set()
+            pending.stderr_done.set()
+
+    def _wrap(self, command: str, token: str) -> str:
+        return (
+            f"IFS= read -r -d '' __xerxes_cmd <<'{token}'\n"
+            f"{command}\n"
+            f"{token}\n"
+            f'eval "$__xerxes_cmd" < /dev/null\n'
+            f"__xerxes_status=$?\n"
+            f"printf '\\n%s %d %s\\n' '{token}' \"$__xerxes_status\" \"$PWD\"\n"
+            f"printf '\\n%s\\n' '{token}' >&2\n"
+        )
+
+
+def _signal_group(process: subprocess.Popen, sig: int) -> None:
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        try:
+            process.send_signal(sig)
+        except ProcessLookupError:
+            pass
@@ -0,0 +1,262 @@
+import atexit
+import itertools
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import IO, Any
+
+PREVIEW_LINES = 20
+MAX_QUERY_LINES = 200
+MAX_QUERY_BYTES = 32 * 1024
+SCAN_CHUNK = 1024 * 1024
+
+
+@dataclass
+class SpooledOutput:
+    handle: str
+    path: str
+    size: int
+    lines: int
+    dropped_bytes: int = 0
+
+    def mapped(self) -> "_mapped":
+        return _mapped(self.path)
+
+
+class OutputSpool:
+    def __init__(
+        self,
+        threshold: int = 64 * 1024,
+        max_output_bytes: int = 256 * 1024 * 1024,
+        max_total_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.threshold = threshold
+        self.max_output_bytes = max_output_bytes
+        self.max_total_bytes = max_total_bytes
+        self.total_bytes = 0
+        self._directory: str | None = None
+        self._outputs: OrderedDict[str, SpooledOutput] = OrderedDict()
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self) -> tuple[str, IO[bytes]]:
+        with self._lock:
+            if self._directory is None:
+                self._directory = tempfile.mkdtemp(prefix="xerxes-spool-")
+                atexit.register(self.close)
+            handle = f"out-{next(self._counter)}"
+
+        path = os.path.join(self._directory, f"{handle}.log")
+        return handle, open(path, "wb")
+
+    def register(
+        self, handle: str, file: IO[bytes], lines: int, dropped_bytes: int
+    ) -> SpooledOutput:
+        file.close()
+        output = SpooledOutput(
+            handle=handle,
+            path=file.name,
+            size=os.path.getsize(file.name),
+            lines=lines,
+            dropped_bytes=dropped_bytes,
+        )
+
+        with self._lock:
+            self._outputs[handle] = output
+            self.total_bytes += output.size
+            while self.total_bytes > self.max_total_bytes and len(self._outputs) > 1:
+                _, evicted = self._outputs.popitem(last=False)
+                self.total_bytes -= evicted.size
+                _remove(evicted.path)
+
+        return output
+
+    def get(self, handle: str) -> SpooledOutput | None:
+        with self._lock:
+            return self._outputs.get(handle)
+
+    def query(self, arguments: dict[str, Any]) -> dict[str, Any]:
+        handle = arguments.get("handle", "")
+        output = self.get(handle)
+        if output is None:
+            return {
+                "success": False,
+                "error": f"Unknown or expired output handle: {handle}. Re-run the command instead.",
+            }
+
+        mode = arguments.get("mode", "head")
+        count = int(arguments.get("count") or 50)
+        result: dict[str, Any] = {"success": True, "handle": handle, "total_lines": output.lines}
+
+        try:
+            if mode == "lines":
+                start = int(arguments.get("start") or 1)
+                end = int(arguments.get("end") or start + count - 1)
+                result["stdout"] = self.lines(output, start, end)
+            elif mode == "grep":
+                if not arguments.get("pattern"):
+                    return {"success": False, "error": "grep mode needs a pattern"}
+                result["stdout"], result["matches"] = self.grep(output, arguments["pattern"], count)
+            elif mode == "tail":
+                result["stdout"] = self.tail(output, count)
+            elif mode == "head":
+                result["stdout"] = self.head(output, count)
+            else:
+                return {"success": False, "error": f"Unknown mode: {mode}"}
+        except re.error as e:
+            return {"success": False, "error": f"Invalid pattern: {e}"}
+        except OSError as e:
+            return {"success": False, "error": f"Could not read {handle}: {e}"}
+
+        result["stdout"] = _cap(result["stdout"])
+        return result
+
+    def summarize(self, output: SpooledOutput) -> str:
+        head = self.head(output, PREVIEW_LINES)
+        tail = self.tail(output, PREVIEW_LINES)
+        hidden = output.lines - 2 * PREVIEW_LINES
+        if hidden <= 0:
+            return self.head(output, 2 * PREVIEW_LINES)
+
+        return f"{head}\n... [{hidden} lines spooled as {output.handle}] ...\n{tail}"
+
+    def head(self, output: SpooledOutput, count: int) -> str:
+        return self.lines(output, 1, count)
+
+    def lines(self, output: SpooledOutput, start: int, end: int) -> str:
+        start = max(1, start)
+        end = min(end, start + MAX_QUERY_LINES - 1)
+        if start > end:
+            return ""
+
+        with output.mapped() as data:
+            begin = _line_start(data, start)
+            stop = begin - 1
+            for _ in range(end - start + 1):
+                stop = data.find(b"\n", stop + 1)
+                if stop < 0:
+                    stop = len(data)
+                    break
+            return _decode(data[begin:stop])
+
+    def tail(self, output: SpooledOutput, count: int) -> str:
+        count = min(count, MAX_QUERY_LINES)
+        with output.mapped() as data:
+            end = len(data)
+            while end and data[end - 1 : end] == b"\n":
+                end -= 1
+            start = end
+            for _ in range(count):
+                start = data.rfind(b"\n", 0, start)
+                if start < 0:
+                    break
+            return _decode(data[start + 1 : end])
+
+    def grep(self, output: SpooledOutput, pattern: str, max_matches: int = 50) -> tuple[str, int]:
+        regex = re.compile(pattern.encode(), re.MULTILINE)
+        matches = []
+        total = 0
+
+        with output.mapped() as data:
+            position = 0
+            number = 1
+            while position < len(data) and (found := regex.search(data, position)):
+                start = data.rfind(b"\n", 0, found.start()) + 1
+                end = data.find(b"\n", found.start())
+                if end < 0:
+                    end = len(data)
+
+                number += _count_newlines(data, position, start)
+                line = data[start:end]
+                if regex.search(line):
+                    total += 1
+                    if len(matches) < min(max_matches, MAX_QUERY_LINES):
+                        matches.append(f"{number}:{_decode(line)}")
+
+                position = end + 1
+                number += 1
+
+        return _cap("\n".join(matches)), total
+
+    def close(self) -> None:
+        with self._lock:
+            directory, self._directory = self._directory, None
+            self._outputs.clear()
+            self.total_bytes = 0
+
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class _mapped:
+    def __init__(self, path: str):
+        self.path = path
+        self._file: IO[bytes] | None = None
+        self._map: mmap.mmap | None = None
+
+    def __enter__(self) -> mmap.mmap | bytes:
+        self._file = open(self.path, "rb")
+        if os.fstat(self._file.fileno()).st_size == 0:
+            return b""
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def __exit__(self, *exc_info) -> None:
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def _line_start(data: mmap.mmap | bytes, number: int) -> int:
+    remaining = number - 1
+    offset = 0
+
+    while remaining > 0:
+        chunk = data[offset : offset + SCAN_CHUNK]
+        if not chunk:
+            return len(data)
+
+        found = chunk.count(b"\n")
+        if found < remaining:
+            remaining -= found
+            offset += len(chunk)
+            continue
+
+        position = -1
+        for _ in range(remaining):
+            position = chunk.find(b"\n", position + 1)
+        return offset + position + 1
+
+    return offset
+
+
+def _count_newlines(data: mmap.mmap | bytes, start: int, end: int) -> int:
+    return sum(
+        data[offset : min(end, offset + SCAN_CHUNK)].count(b"\n")
+        for offset in range(start, end, SCAN_CHUNK)
+    )
+
+
+def _decode(data: bytes) -> str:
+    return data.decode(errors="replace").rstrip("\n")
+
+
+def _cap(text: str) -> str:
+    encoded = text.encode()
+    if len(encoded) <= MAX_QUERY_BYTES:
+        return text
+    truncated = encoded[:MAX_QUERY_BYTES].decode(errors="ignore")
+    return f"{truncated}\n... [truncated, narrow the query] ..."
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -1,5 +1,11 @@
+from typing import TYPE_CHECKING
+
+from prompt_toolkit.filters import Condition
 from prompt_toolkit.key_binding import KeyBindings
 
+if TYPE_CHECKING:
+    from .pager import Pager
+
 
 def create_cancellation_bindings() -> tuple[KeyBindings, dict]:
     bindings = KeyBindings()
@@ -59,3 +65,90 @@ def create_output_expansion_bindings() -> tuple[KeyBindings, dict]:
         event.app.exit()
 
     return bindings, state
+
+
+def create_pager_bindings(pager: "Pager") -> KeyBindings:
+    bindings = KeyBindings()
+    searching = Condition(lambda: pager.searching)
+    browsing = ~searching
+
+    @bindings.add("q", filter=browsing)
+    @bindings.add("Q", filter=browsing)
+    @bindings.add("escape", filter=browsing)
+    @bindings.add("enter", filter=browsing)
+    @bindings.add("c-c", filter=browsing)
+    def close(event):
+        event.app.exit()
+
+    @bindings.add("down", filter=browsing)
+    @bindings.add("j", filter=browsing)
+    def line_down(event):
+        pager.scroll(1)
+
+    @bindings.add("up", filter=browsing)
+    @bindings.add("k", filter=browsing)
+    def line_up(event):
+        pager.scroll(-1)
+
+    @bindings.add("pagedown", filter=browsing)
+    @bindings.add("space", filter=browsing)
+    @bindings.add("f", filter=browsing)
+    def page_down(event):
+        pager.scroll(pager.height)
+
+    @bindings.add("pageup", filter=browsing)
+    @bindings.add("b", filter=browsing)
+    def page_up(event):
+        pager.scroll(-pager.height)
+
+    @bindings.add("home", filter=browsing)
+    @bindings.add("g", filter=browsing)
+    def first_page(event):
+        pager.scroll_to(0)
+
+    @bindings.add("end", filter=browsing)
+    @bindings.add("G", filter=browsing)
+    def last_page(event):
+        pager.scroll_to(len(pager.index))
+
+    @bindings.add("right", filter=browsing)
+    @bindings.add("l", filter=browsing)
+    def scroll_right(event):
+        pager.shift(pager.width // 2)
+
+    @bindings.add("left", filter=browsing)
+    @bindings.add("h", filter=browsing)
+    def scroll_left(event):
+        pager.shift(-(pager.width // 2))
+
+    @bindings.add("/", filter=browsing)
+    def start_search(event):
+        pager.start_search()
+
+    @bindings.add("n", filter=browsing)
+    def next_match(event):
+        pager.next_match()
+
+    @bindings.add("N", filter=browsing)
+    def previous_match(event):
+        pager.next_match(forward=False)
+
+    @bindings.add("<any>", filter=searching)
+    def type_search(event):
+        if event.data.isprintable():
+            pager.type_search(event.data)
+
+    @bindings.add("backspace", filter=searching)
+    def erase_search(event):
+        pager.erase_search()
+
+    @bindings.add("enter", filter=searching)
+    def finish_search(event):
+        pager.finish_search()
+
+    @bindings.add("escape", filter=searching)
+    @bindings.add("c-c", filter=searching)
+    def cancel_search(event):
+        pager.cancel_search()
+
+    return bindings
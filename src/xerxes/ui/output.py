@@ -1,8 +1,13 @@
+from collections import deque
+
 from prompt_toolkit import Application
 from prompt_toolkit.layout import Layout
 from prompt_toolkit.layout.containers import Window
 from prompt_toolkit.layout.controls import FormattedTextControl
 from rich.console import Console
+from rich.live import Live
+from rich.panel import Panel
+from rich.text import Text
 
 from .keybindings import create_output_expansion_bindings
 
@@ -17,7 +22,6 @@ def show_condensed_output_with_expand(output: str, title: str, lines: list[str],
     ] + lines[-5:]
     preview = '\n'.join(preview_lines)
 
-    from rich.panel import Panel
     console.print(Panel(
         preview,
         title=f"{title} (condensed - {total_lines} lines)",
@@ -34,3 +38,50 @@ def show_condensed_output_with_expand(output: str, title: str, lines: list[str],
     app.run()
 
     return state["expand"]
+
+
+class LiveTail:
+    def __init__(self, console: Console, title: str, max_lines: int = 10, max_width: int = 500):
+        self.console = console
+        self.max_width = max_width
+        self.title = title
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self.partial = ""
+        self._live: Live | None = None
+
+    def feed(self, text: str) -> None:
+        pieces = (self.partial + text).split("\n")
+        self.partial = pieces.pop()[-self.max_width :]
+        self.lines.extend(piece[: self.max_width] for piece in pieces[-self.lines.maxlen :])
+
+        if self._live is None:
+            self._live = Live(
+                self._render(),
+                console=self.console,
+                refresh_per_second=8,
+                transient=True,
+            )
+            self._live.start()
+        else:
+            self._live.update(self._render())
+
+    def stop(self) -> None:
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+    def __enter__(self) -> "LiveTail":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _render(self) -> Panel:
+        lines = list(self.lines)
+        if self.partial:
+            lines.append(self.partial)
+        return Panel(
+            Text("\n".join(lines[-self.lines.maxlen :])),
+            title=self.title,
+            border_style="dim",
+        )
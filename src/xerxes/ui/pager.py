@@ -0,0 +1,222 @@
+import mmap
+import re
+from array import array
+from bisect import bisect_right
+
+from prompt_toolkit import Application
+from prompt_toolkit.application import get_app
+from prompt_toolkit.formatted_text import StyleAndTextTuples
+from prompt_toolkit.layout import HSplit, Layout
+from prompt_toolkit.layout.containers import Window
+from prompt_toolkit.layout.controls import FormattedTextControl
+from prompt_toolkit.styles import Style
+
+from .keybindings import create_pager_bindings
+
+PAGER_STYLE = Style.from_dict(
+    {
+        "status": "reverse",
+        "match": "bg:ansiyellow fg:ansiblack",
+        "error": "fg:ansired",
+    }
+)
+
+
+class LineIndex:
+    def __init__(self, text: str | bytes | mmap.mmap):
+        self.text = text
+        self.offsets = array("q", [0])
+
+        newline = "\n" if isinstance(text, str) else b"\n"
+        position = text.find(newline)
+        while position >= 0:
+            self.offsets.append(position + 1)
+            position = text.find(newline, position + 1)
+
+        if len(self.offsets) > 1 and self.offsets[-1] == len(text):
+            self.offsets.pop()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def line(self, number: int) -> str:
+        start = self.offsets[number]
+        end = self.offsets[number + 1] - 1 if number + 1 < len(self.offsets) else len(self.text)
+        line = self.text[start:end]
+        if isinstance(line, str):
+            return line.removesuffix("\n")
+        return line.removesuffix(b"\n").decode(errors="replace")
+
+    def lines(self, start: int, end: int) -> list[str]:
+        return [self.line(number) for number in range(max(0, start), min(end, len(self)))]
+
+    def line_at(self, offset: int) -> int:
+        return bisect_right(self.offsets, offset) - 1
+
+    def compile(self, query: str, flags: int = 0) -> re.Pattern:
+        pattern = re.escape(query)
+        return re.compile(pattern if isinstance(self.text, str) else pattern.encode(), flags)
+
+
+class Pager:
+    def __init__(self, index: LineIndex, title: str):
+        self.index = index
+        self.title = title
+        self.top = 0
+        self.column = 0
+        self.height = 24
+        self.width = 80
+        self.searching = False
+        self.query = ""
+        self.message = ""
+        self.pattern: re.Pattern | None = None
+        self.text_pattern: re.Pattern | None = None
+        self.match_line: int | None = None
+        self._origin = 0
+
+    async def run_async(self) -> None:
+        layout = Layout(
+            HSplit(
+                [
+                    Window(FormattedTextControl(self._render_visible), wrap_lines=False),
+                    Window(FormattedTextControl(self.status), height=1, style="class:status"),
+                ]
+            )
+        )
+        app = Application(
+            layout=layout,
+            key_bindings=create_pager_bindings(self),
+            style=PAGER_STYLE,
+            full_screen=True,
+        )
+        await app.run_async()
+
+    def render(self, height: int, width: int) -> StyleAndTextTuples:
+        self.height = max(1, height)
+        self.width = max(1, width)
+        self.scroll(0)
+
+        fragments: StyleAndTextTuples = []
+        for number in range(self.top, min(self.top + self.height, len(self.index))):
+            line = self.index.line(number)[self.column : self.column + self.width]
+            fragments.extend(self._highlight(line))
+            fragments.append(("", "\n"))
+        return fragments
+
+    def status(self) -> StyleAndTextTuples:
+        if self.searching:
+            return [("", f"/{self.query}  "), ("class:error", self.message)]
+
+        bottom = min(self.top + self.height, len(self.index))
+        text = f" {self.title}  lines {self.top + 1}-{bottom} of {len(self.index)}"
+        if self.message:
+            text += f"  {self.message}"
+        return [("", f"{text}   / search  n/N next/prev  q quit")]
+
+    def scroll(self, delta: int) -> None:
+        last_page = max(0, len(self.index) - self.height)
+        self.top = min(last_page, max(0, self.top + delta))
+
+    def scroll_to(self, number: int) -> None:
+        self.top = 0
+        self.scroll(number)
+
+    def shift(self, delta: int) -> None:
+        self.column = max(0, self.column + delta)
+
+    def start_search(self) -> None:
+        self.searching = True
+        self.query = ""
+        self.message = ""
+        self._origin = self.top
+
+    def type_search(self, text: str) -> None:
+        self.query += text
+        self._update_search()
+
+    def erase_search(self) -> None:
+        self.query = self.query[:-1]
+        self._update_search()
+
+    def finish_search(self) -> None:
+        self.searching = False
+        if not self.query:
+            self.pattern = None
+
+    def cancel_search(self) -> None:
+        self.searching = False
+        self.query = ""
+        self.message = ""
+        self.pattern = None
+        self.match_line = None
+        self.scroll_to(self._origin)
+
+    def next_match(self, forward: bool = True) -> None:
+        if self.pattern is None:
+            return
+
+        current = self.top if self.match_line is None else self.match_line
+        if forward:
+            found = self._find_forward(current + 1)
+        else:
+            found = self._find_backward(current - 1)
+        self._show_match(found)
+
+    def _update_search(self) -> None:
+        self.message = ""
+        self.match_line = None
+        if not self.query:
+            self.pattern = None
+            self.scroll_to(self._origin)
+            return
+
+        flags = re.IGNORECASE if self.query.islower() else 0
+        self.pattern = re.compile(re.escape(self.query), flags)
+        self.text_pattern = self.index.compile(self.query, flags)
+        self._show_match(self._find_forward(self._origin))
+
+    def _find_forward(self, start: int) -> int | None:
+        text = self.index.text
+        offset = self.index.offsets[start] if start < len(self.index) else len(text)
+        match = self.text_pattern.search(text, offset) or self.text_pattern.search(text, 0, offset)
+        return self.index.line_at(match.start()) if match else None
+
+    def _find_backward(self, start: int) -> int | None:
+        count = len(self.index)
+        for step in range(count):
+            number = (start - step) % count
+            if self.pattern.search(self.index.line(number)):
+                return number
+        return None
+
+    def _show_match(self, number: int | None) -> None:
+        if number is None:
+            self.message = "Pattern not found"
+            return
+
+        self.message = ""
+        self.match_line = number
+        self.scroll_to(number)
+        line = self.index.line(number)
+        match = self.pattern.search(line)
+        if match and not self.column <= match.start() < self.column + self.width:
+            self.column = max(0, match.start() - self.width // 4)
+
+    def _highlight(self, line: str) -> StyleAndTextTuples:
+        if self.pattern is None:
+            return [("", line)]
+
+        fragments: StyleAndTextTuples = []
+        position = 0
+        for match in self.pattern.finditer(line):
+            if match.start() == match.end():
+                continue
+            fragments.append(("", line[position : match.start()]))
+            fragments.append(("class:match", match.group()))
+            position = match.end()
+        fragments.append(("", line[position:]))
+        return fragments
+
+    def _render_visible(self) -> StyleAndTextTuples:
+        size = get_app().output.get_size()
+        return self.render(size.rows - 1, size.columns)
@@ -14,3 +14,7 @@ def create_input_session() -> PromptSession:
 
 def get_user_input(session: PromptSession) -> str:
     return session.prompt(HTML("<b><ansicyan>You:</ansicyan></b> "))
+
+
+async def get_user_input_async(session: PromptSession) -> str:
+    return await session.prompt_async(HTML("<b><ansicyan>You:</ansicyan></b> "))
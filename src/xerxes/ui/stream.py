@@ -0,0 +1,68 @@
+import time
+
+from rich.console import Console
+from rich.live import Live
+from rich.markdown import Markdown
+
+RENDER_INTERVAL = 0.05
+
+
+class StreamRenderer:
+    def __init__(self, console: Console, status_message: str):
+        self.console = console
+        self.status_message = status_message
+        self.text = ""
+        self._chunks: list[str] = []
+        self._rendered_at = 0.0
+        self._status = None
+        self._live: Live | None = None
+
+    def start(self) -> None:
+        self._status = self.console.status(self.status_message, spinner="dots")
+        self._status.start()
+
+    def feed(self, text: str) -> None:
+        self._stop_status()
+        self._chunks.append(text)
+
+        if self._live is None:
+            self._live = Live(
+                self._render(),
+                console=self.console,
+                refresh_per_second=10,
+                vertical_overflow="visible",
+            )
+            self._live.start()
+        elif time.monotonic() - self._rendered_at >= RENDER_INTERVAL:
+            self._live.update(self._render())
+
+    def pause(self) -> None:
+        self._stop_status()
+        self._stop_live()
+        self.text = ""
+        self._chunks = []
+
+    def stop(self) -> None:
+        self._stop_status()
+        self._stop_live()
+
+    def _render(self) -> Markdown:
+        if self._chunks:
+            self.text += "".join(self._chunks)
+            self._chunks = []
+        self._rendered_at = time.monotonic()
+        return Markdown(self.text)
+
+    def _stop_status(self) -> None:
+        if self._status is not None:
+            self._status.stop()
+            self._status = None
+
+    def _stop_live(self) -> None:
+        if self._live is not None:
+            self._live.update(self._render())
+            self._live.stop()
+            self._live = None
+
+            if not self.console.is_terminal:
+                self.console.line()
@@ -0,0 +1,138 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import IO, Any
+
+TOKEN_FIELDS = ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens")
+MAX_TRACE_BYTES = 20_000_000
+
+current_session: ContextVar[str | None] = ContextVar("current_session", default=None)
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self._sink: IO[str] | None = None
+        self._lock = threading.Lock()
+
+    def open(self, path: Path) -> None:
+        self.close()
+        if path.exists() and path.stat().st_size > MAX_TRACE_BYTES:
+            path.replace(path.with_name(f"{path.name}.1"))
+        self._sink = open(path, "a", buffering=1, encoding="utf-8")
+        self.enabled = True
+
+    def close(self) -> None:
+        if self._sink:
+            self._sink.close()
+            self._sink = None
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+        if not self.enabled:
+            yield attrs
+            return
+
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(name, time.perf_counter() - start, **attrs)
+
+    def record(self, name: str, seconds: float, **attrs: Any) -> None:
+        if not self.enabled:
+            return
+
+        self.durations[name].append(seconds)
+
+        if self._sink:
+            event = {
+                "ts": round(time.time(), 3),
+                "session": current_session.get(),
+                "span": name,
+                "ms": round(seconds * 1000, 3),
+                **{key: value for key, value in attrs.items() if value is not None},
+            }
+            line = json.dumps(event, default=str) + "\n"
+            with self._lock:
+                self._sink.write(line)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {"count": len(values), "total_ms": sum(values) * 1000}
+            for name, values in sorted(self.durations.items())
+        }
+
+    def reset(self) -> None:
+        self.durations.clear()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    rank = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def load_trace(path: Path) -> list[dict[str, Any]]:
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+
+def summarize_sessions(events: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    sessions: dict[str, dict[str, Any]] = {}
+
+    for event in events:
+        session_id = event.get("session") or "unknown"
+        session = sessions.setdefault(
+            session_id,
+            {
+                "started": event.get("ts", 0),
+                "ended": event.get("ts", 0),
+                "spans": defaultdict(list),
+                "tokens": dict.fromkeys(TOKEN_FIELDS, 0),
+                "cache": {"hits": 0, "misses": 0, "flushes": 0},
+            },
+        )
+        session["ended"] = max(session["ended"], event.get("ts", 0))
+        session["spans"][event["span"]].append(event["ms"])
+
+        if event["span"] == "tool.cache":
+            cache = session["cache"]
+            cache["hits" if event.get("hit") else "misses"] += 1
+            cache["flushes"] = max(cache["flushes"], event.get("flushes") or 0)
+
+        for field in TOKEN_FIELDS:
+            session["tokens"][field] += event.get(field) or 0
+
+    for session in sessions.values():
+        session["spans"] = {
+            name: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.5),
+                "p95_ms": percentile(values, 0.95),
+                "total_ms": sum(values),
+            }
+            for name, values in sorted(session["spans"].items())
+        }
+
+    return sessions
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASELINE_FILE = Path(__file__).with_name("agent_benchmark_baseline.json")
+REGRESSION_THRESHOLD = 0.25
+
+
+def tool_loop():
+    from xerxes.llm.scripted import text_response, tool_call_response
+
+    responses = [tool_call_response(f"echo step {idx}") for idx in range(99)]
+    return responses + [text_response("All 99 steps completed.")], {}
+
+
+def multi_call():
+    from xerxes.llm.scripted import text_response, tool_call_response
+
+    responses = [
+        tool_call_response(*(f"echo batch {idx} item {item}" for item in range(5)))
+        for idx in range(20)
+    ]
+    return responses + [text_response("Every batch finished.")], {"parallel_tool_calls": True}
+
+
+def large_output():
+    from xerxes.llm.scripted import text_response, tool_call_response
+
+    responses = [tool_call_response(f"seq {idx} 200000") for idx in range(1, 11)]
+    return responses + [text_response("Scanned the large outputs.")], {}
+
+
+def long_answer():
+    from xerxes.llm.scripted import text_response
+
+    section = "\n".join(
+        f"- `pod-{idx}` is **Running** on node-{idx % 7} with {idx % 5} restarts" for idx in range(60)
+    )
+    answer = f"## Cluster report\n\n{section}\n\n```bash\nkubectl get pods -A\n```\n"
+    return [text_response(answer * 4)], {}
+
+
+SCENARIOS = {
+    "tool_loop": tool_loop,
+    "multi_call": multi_call,
+    "large_output": large_output,
+    "long_answer": long_answer,
+}
+
+
+def run_scenario(name: str) -> dict[str, float]:
+    from rich.console import Console
+
+    import xerxes.agent.core as core
+    import xerxes.executor.command as command
+    from xerxes.agent.core import AsyncAgent
+    from xerxes.llm.scripted import ScriptedProvider
+    from xerxes.llm.vertex import VertexAIProvider
+    from xerxes.utils.tracing import get_tracer
+
+    headless = Console(file=open(os.devnull, "w"), force_terminal=True, width=120)
+    core.console = headless
+    command.console = headless
+
+    responses, overrides = SCENARIOS[name]()
+    converter = VertexAIProvider(project_id="xerxes-benchmark")
+    converter._prepare_request([], None, 0, 0.0)
+    provider = ScriptedProvider(responses, prepare=converter._prepare_request)
+
+    agent = AsyncAgent(llm=provider, interactive=False, persist_session=False)
+    agent.settings = agent.settings.model_copy(
+        update={"stream_command_output": False, "persistent_shell": False, **overrides}
+    )
+    agent.executor.settings = agent.settings
+    agent.executor.auto_approve_session = True
+
+    tracer = get_tracer()
+    tracer.reset()
+    tracer.enabled = True
+
+    started = time.perf_counter()
+    asyncio.run(agent.chat(f"run the {name} scenario"))
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    tracer.enabled = False
+    phases = {phase: round(stats["total_ms"], 2) for phase, stats in tracer.summary().items()}
+    return {"wall": round(wall_ms, 2), **phases}
+
+
+def run_median(name: str, runs: int) -> dict[str, float]:
+    samples = [run_scenario(name) for _ in range(runs)]
+    phases = dict.fromkeys(phase for sample in samples for phase in sample)
+    return {
+        phase: round(statistics.median(sample.get(phase, 0.0) for sample in samples), 2)
+        for phase in phases
+    }
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]]) -> list[str]:
+    regressions = []
+
+    for scenario, phases in results.items():
+        print(f"\n{scenario}")
+        for phase, value in phases.items():
+            reference = baseline.get(scenario, {}).get(phase)
+            if not reference:
+                print(f"  {phase:<16} {value:>10.2f} ms")
+                continue
+
+            change = (value - reference) / reference
+            marker = ""
+            if change > REGRESSION_THRESHOLD and value - reference > 5:
+                marker = "  ⚠ regression"
+                regressions.append(f"{scenario}/{phase}")
+            print(f"  {phase:<16} {value:>10.2f} ms  (baseline {reference:.2f} ms, {change:+.0%}){marker}")
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the agent loop with a scripted provider")
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run ({', '.join(SCENARIOS)})")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero on regressions against the baseline")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per scenario; the median is reported")
+    args = parser.parse_args()
+
+    from xerxes.tools.registry import register_tool
+    from xerxes.tools.shell import ShellTool
+
+    register_tool(ShellTool())
+
+    selected = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        print(f"❌ Unknown scenario: {', '.join(unknown)}")
+        return 1
+
+    results = {name: run_median(name, max(1, args.runs)) for name in selected}
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    regressions = compare(results, baseline)
+
+    if args.save_baseline:
+        BASELINE_FILE.write_text(json.dumps({**baseline, **results}, indent=2) + "\n")
+        print(f"\n✓ Baseline saved to {BASELINE_FILE.name}")
+
+    if regressions and args.check:
+        print(f"\n❌ Regressions: {', '.join(regressions)}")
+        return 1
+
+    print("\n✅ Agent benchmarks completed")
+    return 0
+
+
+if __name__ == "__main__":
+    # Run against default settings, not whatever ~/.xerxes/config.yaml holds on this machine.
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        status = main()
+    sys.exit(status)
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def measure(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def bench_provider_request_cache() -> None:
+    from xerxes.llm.base import Message
+    from xerxes.llm.vertex import VertexAIProvider
+    from xerxes.tools.registry import ToolRegistry
+    from xerxes.tools.shell import ShellTool
+
+    registry = ToolRegistry()
+    registry.register(ShellTool())
+    provider = VertexAIProvider(project_id="xerxes-benchmark")
+    messages = [Message(role="user", content="list all pods")]
+    iterations = 500
+
+    def uncached():
+        provider.invalidate_cache()
+        provider._prepare_request(messages, registry.get_function_schemas(), 3000, 0.4)
+
+    def cached():
+        provider._prepare_request(messages, registry.get_function_schemas(), 3000, 0.4)
+
+    before = measure(uncached, iterations)
+    after = measure(cached, iterations)
+
+    print(f"✓ provider request setup: {before:.1f} µs/iter uncached, {after:.1f} µs/iter cached")
+
+
+def bench_persistent_shell() -> None:
+    from xerxes.tools.shell import ShellTool
+
+    iterations = 1000
+    spawning = ShellTool()
+    persistent = ShellTool(persistent=True)
+
+    def spawn():
+        spawning.execute_raw_command("true")
+
+    def reuse():
+        persistent.execute_raw_command("true")
+
+    before = measure(spawn, iterations)
+    after = measure(reuse, iterations)
+    persistent.close()
+
+    print(
+        f"✓ {iterations} short commands: {before / 1000:.2f} ms/cmd spawned, "
+        f"{after / 1000:.2f} ms/cmd persistent shell"
+    )
+
+
+def bench_output_spool() -> None:
+    import tracemalloc
+
+    from xerxes.tools.capture import run_captured
+    from xerxes.tools.spool import OutputSpool
+
+    command = ["bash", "-c", "seq 1 2000000"]
+    spool = OutputSpool()
+
+    def capture(spool_to: OutputSpool | None) -> tuple[dict, float, int]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = run_captured(command, 60, 256 * 1024 * 1024, spool=spool_to)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed, peak
+
+    in_memory, memory_seconds, memory_peak = capture(None)
+    spooled, spool_seconds, spool_peak = capture(spool)
+    handle = spooled["spooled"]["handle"]
+
+    start = time.perf_counter()
+    spool.query({"handle": handle, "mode": "grep", "pattern": "^1999999$"})
+    grep_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    spool.query({"handle": handle, "mode": "lines", "start": 1_000_000, "end": 1_000_050})
+    slice_ms = (time.perf_counter() - start) * 1000
+    spool.close()
+
+    kept_kb = len(in_memory["stdout"]) // 1024
+    print(
+        f"✓ 2M-line output: {memory_peak / 1e6:.1f} MB peak / {kept_kb} KB "
+        f"result in memory ({memory_seconds:.2f}s), {spool_peak / 1e6:.1f} MB peak / "
+        f"{len(spooled['stdout'])} B result spooled ({spool_seconds:.2f}s); "
+        f"grep {grep_ms:.0f} ms, first slice {slice_ms:.0f} ms"
+    )
+
+
+def bench_output_pager() -> None:
+    import io
+
+    from rich.console import Console
+    from rich.panel import Panel
+
+    from xerxes.tools.spool import OutputSpool
+    from xerxes.ui.pager import LineIndex, Pager
+
+    lines = [
+        f"2026-10-17 12:00:{i % 60:02d} INFO worker-{i % 7} processed request {i}"
+        for i in range(500_000)
+    ]
+    output = "\n".join(lines)
+    panel_lines = 20_000
+
+    start = time.perf_counter()
+    panel = Panel("\n".join(lines[:panel_lines]), title="Output (full)")
+    Console(file=io.StringIO(), width=120).print(panel)
+    panel_seconds = time.perf_counter() - start
+
+    spool = OutputSpool()
+    handle, file = spool.create()
+    file.write(output.encode() + b"\n")
+    spooled = spool.register(handle, file, 500_000, 0)
+
+    with spooled.mapped() as data:
+        start = time.perf_counter()
+        pager = Pager(LineIndex(data), "Output")
+        pager.render(50, 120)
+        index_ms = (time.perf_counter() - start) * 1000
+        assert len(pager.index) == 500_000, len(pager.index)
+
+        pager.scroll_to(400_000)
+        page_us = measure(lambda: pager.render(50, 120), 1000)
+
+        start = time.perf_counter()
+        pager.start_search()
+        pager.type_search("request 499999")
+        search_ms = (time.perf_counter() - start) * 1000
+        assert pager.match_line == 499_999, pager.match_line
+    spool.close()
+
+    print(
+        f"✓ 500k-line output: {panel_seconds:.2f}s to render just {panel_lines // 1000}k lines in "
+        f"a Panel, pager {index_ms:.0f} ms to index the spooled file + first page, "
+        f"{page_us:.0f} µs/page, search {search_ms:.0f} ms"
+    )
+
+
+def bench_session_log() -> None:
+    import json
+    from pathlib import Path
+
+    from xerxes.agent.session_log import SessionLog, read_tail
+
+    records = [
+        {"role": "user", "content": f"Tool results: {'x' * 2000} {i}", "kind": "tool_result"}
+        for i in range(5000)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        log = SessionLog(directory / "background.jsonl")
+        sync_path = directory / "sync.jsonl"
+
+        def write_synced(record: dict) -> None:
+            with open(sync_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+        start = time.perf_counter()
+        for record in records[:500]:
+            write_synced(record)
+        synced_us = (time.perf_counter() - start) / 500 * 1_000_000
+
+        start = time.perf_counter()
+        for record in records:
+            log.append(record)
+        background_us = (time.perf_counter() - start) / len(records) * 1_000_000
+        log.close()
+
+        start = time.perf_counter()
+        with open(log.path, encoding="utf-8") as f:
+            full = [json.loads(line) for line in f]
+        full_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        tail = read_tail(log.path, 100_000)
+        tail_ms = (time.perf_counter() - start) * 1000
+
+    print(
+        f"✓ session log: {synced_us:.0f} µs/append with fsync per write, "
+        f"{background_us:.1f} µs/append background ({log.syncs} fsyncs); "
+        f"resume {tail_ms:.1f} ms for the last {len(tail)} messages "
+        f"vs {full_ms:.0f} ms parsing all {len(full)} records"
+    )
+
+
+def bench_history_summary() -> None:
+    from xerxes.agent.session import ChatSession
+    from xerxes.agent.summarizer import HistorySummarizer
+    from xerxes.llm.base import LLMResponse
+    from xerxes.llm.scripted import ScriptedProvider
+
+    def slow_provider(*_):
+        time.sleep(0.5)
+
+    responses = [LLMResponse(content="- pod api-7d9f8 in namespace prod") for _ in range(100)]
+    summarizer = HistorySummarizer(ScriptedProvider(responses, prepare=slow_provider))
+    session = ChatSession(max_prompt_tokens=20_000, summarizer=summarizer)
+    session.add_system_message("You are a DevOps agent.")
+
+    worst = 0.0
+    for turn in range(300):
+        start = time.perf_counter()
+        session.add_message("user", f"check pod api-{turn}")
+        session.add_tool_results(f"Tool results: {'pod status line ' * 200}")
+        session.add_message("assistant", f"api-{turn} is running")
+        session.get_messages()
+        worst = max(worst, time.perf_counter() - start)
+        time.sleep(0.01)
+
+    summarizer.close()
+    print(
+        f"✓ history summary: {summarizer.summaries} background summaries over 300 turns, "
+        f"slowest turn bookkeeping {worst * 1000:.1f} ms with a 500 ms summarizer"
+    )
+
+
+def bench_loop_detection() -> None:
+    from xerxes.executor.loops import LoopDetector
+
+    detector = LoopDetector()
+    result = {"success": True, "exit_code": 0, "stdout": "pod api-0 Running\n" * 50, "stderr": ""}
+    commands = ["kubectl get pods -n prod", "kubectl  describe pod api-0 -n prod"]
+    calls = [{"command": commands[idx % 2], "reasoning": f"attempt {idx}"} for idx in range(20)]
+
+    found = None
+    for idx, arguments in enumerate(calls):
+        loop = detector.record("bash_execute", arguments, result)
+        if loop and found is None:
+            found = (idx + 1, loop["detected"])
+
+    per_call = measure(lambda: detector.record("bash_execute", calls[0], result), 2000)
+    print(
+        f"✓ loop detection: {found[1]} caught after {found[0]} calls, "
+        f"{per_call:.1f} µs per recorded call"
+    )
+
+
+def bench_settings_access() -> None:
+    from xerxes.config.settings import Settings, get_settings
+
+    iterations = 2000
+    get_settings()
+
+    before = measure(Settings.load_from_file, iterations)
+    after = measure(get_settings, iterations)
+
+    print(f"✓ settings access: {before:.1f} µs/iter reloaded, {after:.1f} µs/iter cached")
+
+
+def bench_context_cache() -> None:
+    import json
+
+    from xerxes.agent.compaction import estimate_tokens
+    from xerxes.agent.prompts import get_system_prompt
+    from xerxes.llm.base import Message
+    from xerxes.llm.context_cache import LocalContextCache
+    from xerxes.llm.vertex import VertexAIProvider
+    from xerxes.tools.registry import ToolRegistry
+    from xerxes.tools.shell import ShellTool
+
+    registry = ToolRegistry()
+    registry.register(ShellTool())
+    schemas = registry.get_function_schemas()
+    system_prompt = get_system_prompt("Linux")
+
+    cache = LocalContextCache()
+    provider = VertexAIProvider(project_id="xerxes-benchmark", context_cache=cache)
+    messages = [Message(role="system", content=system_prompt)]
+    iterations = 20
+
+    for idx in range(iterations):
+        messages.append(Message(role="user", content=f"Tool results:\nstep {idx} ok"))
+        _, request = provider._prepare_request(messages, schemas, 3000, 0.4)
+        assert "tools" not in request and len(request["contents"]) == idx + 1
+
+    prefix_tokens = estimate_tokens(system_prompt) + estimate_tokens(json.dumps(schemas))
+
+    print(
+        f"✓ context cache: {cache.created} cache(s) for {iterations} requests, "
+        f"~{prefix_tokens} prefix tokens per request served from the cache "
+        f"(~{prefix_tokens * iterations} over the turn)"
+    )
+
+
+def bench_message_conversion() -> None:
+    from xerxes.agent.session import ChatSession
+    from xerxes.llm.vertex import VertexAIProvider
+
+    provider = VertexAIProvider(project_id="xerxes-benchmark")
+    session = ChatSession()
+    session.add_system_message("You are Xerxes.")
+    for idx in range(100):
+        session.add_message("user", f"step {idx}: " + "log line\n" * 40)
+        session.add_message("assistant", f"Checked step {idx}.")
+    iterations = 200
+
+    def full():
+        for msg in session.get_messages():
+            msg.native.clear()
+        provider._convert_messages(session.get_messages())
+
+    def incremental():
+        session.add_tool_results("Tool results:\nok")
+        provider._convert_messages(session.get_messages())
+
+    provider._convert_messages(session.get_messages())
+    size = len(session.get_messages())
+    before = measure(full, iterations)
+    after = measure(incremental, iterations)
+
+    print(
+        f"✓ {size}-message session: {before:.1f} µs/call full conversion, "
+        f"{after:.1f} µs/call converting only the appended message"
+    )
+
+
+def bench_llm_resilience() -> None:
+    import asyncio
+
+    from xerxes.llm.base import LLMResponse
+    from xerxes.llm.resilient import ResilientProvider
+    from xerxes.llm.scripted import FlakyProvider
+
+    def flaky(**overrides) -> FlakyProvider:
+        options = {"latency": 0.02, "slow_rate": 0.1, "slow_latency": 0.4, "seed": 1}
+        return FlakyProvider(LLMResponse(content="ok"), **{**options, **overrides})
+
+    async def run(provider, requests: int, parallel: int) -> tuple[int, float, float]:
+        slots = asyncio.Semaphore(parallel)
+        latencies = []
+
+        async def call() -> bool:
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    await provider.achat([])
+                except Exception:
+                    return False
+                latencies.append(time.perf_counter() - started)
+                return True
+
+        completed = await asyncio.gather(*(call() for _ in range(requests)))
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0
+        return requests - sum(completed), p50, p95
+
+    overloaded = {"error_rate": 0.05, "capacity": 8}
+    failures, _, _ = asyncio.run(run(flaky(**overloaded), 200, 200))
+    upstream = flaky(**overloaded)
+    provider = ResilientProvider(upstream, base_delay=0.01, max_concurrency=16)
+    retried, p50, p95 = asyncio.run(run(provider, 200, 200))
+    assert retried == 0, f"{retried} calls failed through ResilientProvider"
+    print(
+        f"✓ 200 concurrent calls, server capacity 8 and 5% errors: {failures} failed directly, "
+        f"0 with retries ({provider.retries} retries, p95 {p95:.0f} ms, "
+        f"limit settled at {provider.limiter.limit:.1f})"
+    )
+
+    _, _, plain_p95 = asyncio.run(run(flaky(), 100, 2))
+    provider = ResilientProvider(flaky(), hedge_after=0.05, max_concurrency=4)
+    _, _, hedged_p95 = asyncio.run(run(provider, 100, 2))
+    print(
+        f"✓ 100 calls with 10% slow responses: p95 {plain_p95:.0f} ms unhedged, "
+        f"{hedged_p95:.0f} ms hedged after 50 ms ({provider.hedges} hedges)"
+    )
+
+
+def start_mock_openai_server():
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    usage = {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+    call = {
+        "index": 0,
+        "id": "call_0",
+        "function": {"name": "bash_execute", "arguments": '{"command": "ls'},
+    }
+    events = [
+        {"choices": [{"index": 0, "delta": {"content": "Checking files"}}]},
+        {"choices": [{"index": 0, "delta": {"tool_calls": [call]}}]},
+        {
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"tool_calls": [{"index": 0, "function": {"arguments": ' -la"}'}}]},
+                    "finish_reason": "tool_calls",
+                }
+            ]
+        },
+        {"choices": [], "usage": usage},
+    ]
+    stream_body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    chat_body = json.dumps(
+        {
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "ok"},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+        }
+    )
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            streaming = request.get("stream")
+            payload = (stream_body if streaming else chat_body).encode()
+
+            self.send_response(200)
+            self.send_header(
+                "Content-Type", "text/event-stream" if streaming else "application/json"
+            )
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_http_provider() -> None:
+    from xerxes.llm.base import Message
+    from xerxes.llm.openai_compat import OpenAICompatibleProvider
+
+    server = start_mock_openai_server()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    messages = [Message(role="user", content="list files")]
+    iterations = 300
+
+    pooled = OpenAICompatibleProvider(base_url=base_url, api_key="test", model_name="mock")
+    chunks = list(pooled.stream_chat(messages))
+    tool_calls = [chunk.tool_call for chunk in chunks if chunk.tool_call]
+    assert tool_calls[0].arguments == {"command": "ls -la"}, tool_calls
+    assert chunks[-1].usage["total_tokens"] == 15, chunks[-1]
+
+    def fresh():
+        provider = OpenAICompatibleProvider(base_url=base_url, api_key="test", model_name="mock")
+        provider.chat(messages)
+        provider.close()
+
+    def reused():
+        pooled.chat(messages)
+
+    before = measure(fresh, iterations)
+    after = measure(reused, iterations)
+    pooled.close()
+    server.shutdown()
+
+    print(
+        f"✓ OpenAI-compatible chat against a local mock: {before / 1000:.2f} ms/request "
+        f"with a new connection, {after / 1000:.2f} ms/request over the pooled client"
+    )
+
+
+COMMAND_TEMPLATES = [
+    "ls -la {path}",
+    "ls {path}/*.{ext} | head -{n}",
+    "find {path} -name '*.{ext}' -type f | wc -l",
+    "find {path} -name '*.tmp' -delete",
+    "cat {path}/app.log | grep -i error | tail -{n}",
+    "kubectl get pods -n {ns} | grep {name}",
+    "kubectl -n {ns} describe deployment {name}",
+    "kubectl logs {name}-7d9f8 -n {ns} --tail={n}",
+    "kubectl delete pod {name}-7d9f8 -n {ns}",
+    "kubectl rollout restart deployment/{name} -n {ns}",
+    "docker ps -a --format '{{{{.Names}}}}' | grep {name}",
+    "docker run --rm -it {name}:latest",
+    "docker rm -f $(docker ps -aq --filter name={name})",
+    "docker compose -f {path}/compose.yml logs --tail {n}",
+    "git status && git log --oneline -{n}",
+    "git push --force origin {name}",
+    "git checkout -b feature/{name}",
+    "terraform plan -out {name}.tfplan",
+    "ps aux | grep {name} | awk '{{print $2}}' | xargs kill -9",
+    "gcloud compute instances list --filter=\"name~'{name}'\"",
+    "aws ec2 describe-instances --region us-east-1 --query 'Reservations[*].Instances[*].InstanceId'",
+    "sed -i 's/{name}/{ns}/g' {path}/config.yaml",
+    'echo "$(date) {name}" >> {path}/deploy.log',
+    "for f in {path}/*.{ext}; do wc -l $f; done",
+    "ffmpeg -i {name}.mp4 -c:v copy -an {name}-silent.mp4",
+    "cd {path} && du -sh * | sort -h | tail -{n}",
+    "systemctl status {name} --no-pager",
+    "curl -s https://{name}.example.com/healthz | jq .status",
+]
+
+
+LEGACY_DESTRUCTIVE_KEYWORDS = (
+    "delete",
+    "remove",
+    "destroy",
+    "terminate",
+    "kill",
+    "stop",
+    "rm",
+    "prune",
+    "drop",
+    "truncate",
+    "purge",
+)
+
+
+def build_command_corpus(size: int) -> list[str]:
+    rng = random.Random(42)
+    values = {
+        "path": ["/var/log", "~/projects", ".", "/etc/nginx", "/tmp/desktop", "build"],
+        "ext": ["py", "mp4", "log", "conf", "yaml"],
+        "ns": ["default", "prod", "staging", "kube-system"],
+        "name": ["nginx", "api", "frontend", "redis", "worker", "format", "terraform"],
+        "n": ["1", "5", "20", "100"],
+    }
+
+    return [
+        rng.choice(COMMAND_TEMPLATES).format(
+            **{key: rng.choice(options) for key, options in values.items()}
+        )
+        for _ in range(size)
+    ]
+
+
+def bench_command_classifier() -> None:
+    from xerxes.executor.safety import classify_command
+
+    corpus = build_command_corpus(50_000)
+    unique = list(dict.fromkeys(corpus))
+
+    def substring(command: str) -> bool:
+        command_lower = command.lower()
+        return any(keyword in command_lower for keyword in LEGACY_DESTRUCTIVE_KEYWORDS)
+
+    def per_command(func, commands: list[str]) -> tuple[float, list]:
+        start = time.perf_counter()
+        results = [func(command) for command in commands]
+        return (time.perf_counter() - start) / len(commands) * 1_000_000, results
+
+    # The corpus is synthetic and repeats itself, so per-command costs and counts are taken over the
+    # unique commands only; the cached figure replays the full stream to show the lookup hit cost.
+    substring_us, flagged = per_command(substring, unique)
+    classify_command.cache_clear()
+    uncached_us, results = per_command(classify_command.__wrapped__, unique)
+    cached_us, _ = per_command(classify_command, corpus)
+
+    flagged_before = sum(flagged)
+
+    flagged_after = sum(result.is_destructive for result in results)
+    readonly = sum(result.is_readonly for result in results)
+
+    print(
+        f"✓ {len(unique)} unique commands (from {len(corpus)} synthetic): "
+        f"{substring_us:.2f} µs/cmd substring, {uncached_us:.2f} µs/cmd classifier, "
+        f"{cached_us:.2f} µs/cmd with lookup cache"
+    )
+    print(
+        f"✓ destructive: {flagged_before} by substring, {flagged_after} by classifier; "
+        f"{readonly} read-only commands auto-runnable"
+    )
+
+
+BENCHMARKS = {
+    "provider_cache": bench_provider_request_cache,
+    "context_cache": bench_context_cache,
+    "message_conversion": bench_message_conversion,
+    "llm_resilience": bench_llm_resilience,
+    "http_provider": bench_http_provider,
+    "persistent_shell": bench_persistent_shell,
+    "output_spool": bench_output_spool,
+    "output_pager": bench_output_pager,
+    "session_log": bench_session_log,
+    "history_summary": bench_history_summary,
+    "loop_detection": bench_loop_detection,
+    "settings": bench_settings_access,
+    "classifier": bench_command_classifier,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        print(f"❌ Unknown benchmark: {unknown[0]}")
+        sys.exit(1)
+
+    # Settings, sessions and traces live under ~/.xerxes; keep the real one untouched.
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        for name in selected:
+            BENCHMARKS[name]()
+
+    print("\n✅ Benchmarks completed")
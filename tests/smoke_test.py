@@ -1,7 +1,849 @@
 #!/usr/bin/env python3
 
+import os
+import subprocess
 import sys
 
+CLI_IMPORT_THRESHOLD_MS = 750
+HEAVY_MODULES = ("vertexai", "google.cloud.aiplatform", "grpc", "prompt_toolkit")
+
+CLASSIFIER_CASES = {
+    "terraform plan": "readonly",
+    "docker run --rm nginx": "mutating",
+    "ls ~/Desktop | grep format": "readonly",
+    "kubectl get pods -n prod | grep nginx": "readonly",
+    "kubectl delete pod nginx-7d9f8": "destructive",
+    "ls > files.txt": "mutating",
+    "find . -name '*.tmp' -exec rm {} +": "destructive",
+    "echo \"$(rm -rf build)\"": "destructive",
+    "git status && git log --oneline -5": "readonly",
+    "ps aux | grep api | awk '{print $2}' | xargs kill": "destructive",
+    "echo `rm -rf ~`": "destructive",
+    "cat <(rm -f build.log)": "destructive",
+    "awk 'BEGIN{system(\"rm -rf ~\")}'": "mutating",
+    "awk -F: '$3 > 1000 {print $1}' /etc/passwd": "readonly",
+    "sed -n 'w /etc/passwd' x": "mutating",
+    "sed 's/a/b/e' x": "mutating",
+    "sed -n '/warning/p' app.log": "readonly",
+    "ip link set eth0 down": "mutating",
+    "ip -br addr show": "readonly",
+    "ifconfig eth0 down": "mutating",
+    "mount /dev/sdb1 /mnt": "mutating",
+    "date -s '2020-01-01 00:00'": "mutating",
+    "date +%s": "readonly",
+    "hostname evil": "mutating",
+    "terraform fmt": "mutating",
+    "terraform fmt -check": "readonly",
+    "aws lambda invoke --function-name get-user /tmp/o": "mutating",
+    "aws ec2 describe-instances --region us-east-1": "readonly",
+    "git -c core.fsmonitor='rm -rf ~' status": "mutating",
+    "tail -f /var/log/syslog": "streaming",
+    "kubectl logs -f api-7d9f8": "streaming",
+    "kubectl get pods -w": "streaming",
+    "docker logs -f api": "streaming",
+    "watch kubectl get pods": "streaming",
+}
+
+ADVERSARIAL_CASES = {
+    # Programs that read by default but write with an extra positional or flag.
+    "uniq in.txt out.txt": "mutating",
+    "uniq -f 2 in.txt": "readonly",
+    "xxd -r dump.hex /bin/ls": "mutating",
+    "xxd -s 16 dump.bin": "readonly",
+    "tree -o out.txt": "mutating",
+    "tree -L 2": "readonly",
+    "yq -i '.a = 1' f.yaml": "mutating",
+    "yq '.a' f.yaml": "readonly",
+    "history -c": "mutating",
+    "file -C -m magic": "mutating",
+    # Flags that execute a helper program.
+    "rg --pre ./evil pattern": "mutating",
+    "rg --pre=./evil pattern": "mutating",
+    "ag --pager ./evil pattern": "mutating",
+    "man -P 'sh -c id' ls": "mutating",
+    # Wrappers without an inner command, or wrapping an interactive shell.
+    "sudo -s": "destructive",
+    "sudo -i": "destructive",
+    "sudo su": "destructive",
+    "sudo bash": "destructive",
+    "nohup bash": "mutating",
+    "env PATH=/tmp/evil ls": "mutating",
+    "env FOO=1 ls": "readonly",
+    # Definitions that persist in the shell.
+    "function ls { rm -rf ~; }": "destructive",
+    "ls() { echo hi; }": "mutating",
+    "alias ls='rm -rf ~'": "destructive",
+    "alias ll='ls -l'": "mutating",
+    "export PATH=/tmp/evil:$PATH": "mutating",
+    "export -f ls": "mutating",
+    "export FOO=1": "readonly",
+    "PATH=/tmp/evil ls": "mutating",
+    "LD_PRELOAD=/tmp/x.so ls": "mutating",
+    # Verbs only count at the operation position.
+    "gcloud run deploy info --image x": "mutating",
+    "gcloud compute instances create list": "mutating",
+    "gcloud compute instances list": "readonly",
+    "az vm create -n list": "mutating",
+    # Short options that take a value end a combined flag cluster.
+    "git log -Sfoo": "readonly",
+    "git log -Gfoo": "readonly",
+    "kubectl get pods -owide": "readonly",
+    "kubectl get pods -nwatch": "readonly",
+}
+
+
+def check_loop_detector() -> None:
+    from xerxes.executor.loops import LoopDetector
+
+    detector = LoopDetector(max_repeats=3, stop_after=2)
+    failed = {"success": False, "exit_code": 2, "stdout": "", "stderr": "No such file"}
+    duplicate = {"success": False, "error": "This command was just executed.", "duplicate": True}
+
+    loops = []
+    for command in ["ls /nonexistent", "ls   /nonexistent"] * 2:
+        arguments = {"command": command, "reasoning": "check"}
+        result = duplicate if detector.is_duplicate("bash_execute", arguments) else failed
+        loops.append(detector.record("bash_execute", arguments, result))
+
+    assert loops[:2] == [None, None], loops
+    assert loops[2]["detected"] == "repeat" and not loops[2]["stop"], loops[2]
+    assert loops[3]["stop"], "consecutive duplicates never stopped the turn"
+    print("✓ Loop detector stops consecutive duplicate commands")
+
+
+def check_loop_cycles() -> None:
+    from xerxes.executor.loops import LoopDetector
+
+    detector = LoopDetector(max_repeats=0, max_cycles=2, stop_after=0)
+    result = {"success": True, "exit_code": 0, "stdout": "pending"}
+    loops = [
+        detector.record("bash_execute", {"command": command}, result)
+        for command in ["kubectl get pods", "kubectl describe pod api"] * 2
+    ]
+    assert loops[:3] == [None, None, None], loops
+    assert loops[3]["detected"] == "cycle" and loops[3]["period"] == 2, loops[3]
+    assert not loops[3]["stop"], "stop_after=0 should only warn"
+
+    changed = {**result, "stdout": "running"}
+    assert detector.record("bash_execute", {"command": "kubectl get pods"}, changed) is None
+    print("✓ Loop detector flags A/B cycles and resets when the output changes")
+
+
+def _llm_fakes():
+    import asyncio
+
+    from xerxes.llm.base import BaseLLMProvider, LLMResponse, ProviderError
+
+    class FaultyProvider(BaseLLMProvider):
+        def __init__(self, *script):
+            super().__init__()
+            self.script = list(script)
+            self.calls = 0
+            self.cancelled = 0
+
+        def chat(self, messages, tools=None, max_tokens=4096, temperature=0.0):
+            raise NotImplementedError
+
+        async def achat(self, messages, tools=None, max_tokens=4096, temperature=0.0):
+            self.calls += 1
+            step = self.script.pop(0) if self.script else 0.0
+            if isinstance(step, Exception):
+                raise step
+            try:
+                await asyncio.sleep(step)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            return LLMResponse(content=f"reply {self.calls}")
+
+        def is_available(self) -> bool:
+            return True
+
+        @property
+        def name(self) -> str:
+            return "faulty"
+
+    def error(status: int, retry_after: float | None = None) -> ProviderError:
+        return ProviderError(f"HTTP {status}", status_code=status, retry_after=retry_after)
+
+    return FaultyProvider, error
+
+
+def check_resilient_provider() -> None:
+    import asyncio
+    import time
+
+    from xerxes.llm.base import Message, ProviderError
+    from xerxes.llm.resilient import ResilientProvider
+
+    FaultyProvider, error = _llm_fakes()
+    messages = [Message(role="user", content="list pods")]
+
+    flaky = FaultyProvider(error(503), error(502))
+    provider = ResilientProvider(flaky, base_delay=0.001, max_retries=4)
+    response = asyncio.run(provider.achat(messages))
+    assert response.content == "reply 3" and provider.retries == 2, (response, provider.retries)
+
+    rejected = FaultyProvider(error(400))
+    try:
+        asyncio.run(ResilientProvider(rejected, base_delay=0.001).achat(messages))
+    except ProviderError:
+        pass
+    else:
+        raise AssertionError("a 400 response was retried into success")
+    assert rejected.calls == 1, f"non-retryable error was retried {rejected.calls - 1} times"
+
+    down = FaultyProvider(*[error(503)] * 5)
+    try:
+        asyncio.run(ResilientProvider(down, base_delay=0.001, max_retries=2).achat(messages))
+    except ProviderError:
+        pass
+    assert down.calls == 3, f"max_retries=2 made {down.calls} calls"
+
+    throttled = FaultyProvider(error(429, retry_after=0.2))
+    provider = ResilientProvider(throttled, base_delay=0.001, max_concurrency=8)
+    started = time.perf_counter()
+    asyncio.run(provider.achat(messages))
+    waited = time.perf_counter() - started
+    assert waited >= 0.2, f"Retry-After 0.2 s honoured as {waited:.3f} s"
+    assert provider.limiter.limit < 8, "429 did not shrink the concurrency limit"
+    print("✓ Resilient provider retries 5xx, honours Retry-After and gives up on 4xx")
+
+
+def check_adaptive_limiter() -> None:
+    import asyncio
+
+    from xerxes.llm.limits import AdaptiveLimiter
+
+    async def run() -> list[float]:
+        limiter = AdaptiveLimiter(initial=8, maximum=8)
+        limits = []
+        for _ in range(4):
+            await limiter.acquire()
+            limiter.release(ok=False, overloaded=True)
+            limits.append(limiter.limit)
+
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done(), "acquired past a limit of 1"
+        limiter.release()
+        limits.append(limiter.limit)
+        await asyncio.wait_for(waiter, 1)
+        limiter.release()
+        assert limiter.in_flight == 0, limiter.in_flight
+        return limits
+
+    limits = asyncio.run(run())
+    assert limits[:4] == [4.0, 2.0, 1.0, 1.0], limits
+    assert limits[4] == 2.0, f"additive increase from 1 gave {limits[4]}"
+    print("✓ Adaptive limiter halves on overload, floors at 1 and grows additively")
+
+
+def check_hedging() -> None:
+    import asyncio
+    import time
+
+    from xerxes.llm.base import Message
+    from xerxes.llm.resilient import ResilientProvider
+
+    FaultyProvider, _ = _llm_fakes()
+    slow = FaultyProvider(5.0, 0.01)
+    provider = ResilientProvider(slow, hedge_after=0.05, max_concurrency=4)
+
+    started = time.perf_counter()
+    response = asyncio.run(provider.achat([Message(role="user", content="list pods")]))
+    elapsed = time.perf_counter() - started
+
+    assert response.content == "reply 2", response
+    assert elapsed < 1.0, f"hedged request took {elapsed:.2f} s"
+    assert provider.hedges == 1 and slow.cancelled == 1, (provider.hedges, slow.cancelled)
+    assert provider.limiter.in_flight == 0, "cancelled attempt kept its limiter slot"
+    print("✓ Hedged requests return the fast attempt and cancel the slow one")
+
+
+def check_vertex_model_cache() -> None:
+    from xerxes.llm.base import Message
+    from xerxes.llm.context_cache import LocalContextCache
+    from xerxes.llm.vertex import VertexAIProvider
+
+    tools = [{"name": "shell_execute", "description": "Run a command", "parameters": {}}]
+    cache = LocalContextCache()
+    cached = VertexAIProvider(project_id="xerxes-smoke", context_cache=cache)
+    plain = VertexAIProvider(project_id="xerxes-smoke")
+
+    def prepare(provider, system: str, tool_schemas=tools):
+        messages = [Message(role="system", content=system), Message(role="user", content="hi")]
+        return provider._prepare_request(messages, tool_schemas, 256, 0.0)
+
+    model, request = prepare(cached, "You are a DevOps agent.")
+    assert "tools" not in request and cache.created == 1, request
+    assert prepare(cached, "You are a DevOps agent.")[0] is model and cache.created == 1
+    assert prepare(cached, "You are a terse DevOps agent.")[0] is not model
+    assert cache.created == 2, "system instruction change did not rebuild the cached model"
+    prepare(cached, "You are a terse DevOps agent.", None)
+    assert cache.created == 3, "tool change did not rebuild the cached model"
+
+    model, request = prepare(plain, "You are a DevOps agent.")
+    assert request["tools"] and prepare(plain, "You are a DevOps agent.")[0] is model
+    assert prepare(plain, "You are a terse DevOps agent.")[0] is not model
+    print("✓ Vertex model cache is keyed on the system instruction and tool set")
+
+
+def check_settings_cache() -> None:
+    import tempfile
+
+    from xerxes.config.settings import Settings, get_settings
+
+    original_home = os.environ.get("HOME")
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        try:
+            settings = get_settings()
+            assert get_settings() is settings, "unchanged settings were reloaded"
+
+            config_file = Settings.get_config_file()
+            config_file.write_text("max_iterations: 7\n")
+            stat = config_file.stat()
+            os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            reloaded = get_settings()
+            assert reloaded is not settings and reloaded.max_iterations == 7, reloaded
+
+            reloaded.update_setting("max_iterations", "9")
+            assert get_settings().max_iterations == 9, "update_setting did not invalidate"
+        finally:
+            if original_home is None:
+                os.environ.pop("HOME", None)
+            else:
+                os.environ["HOME"] = original_home
+
+    get_settings()
+    assert not str(Settings.get_config_file()).startswith(home), "settings still point at HOME"
+    print("✓ Settings are cached and reloaded when the config file changes")
+
+
+def check_registry_index() -> None:
+    import tempfile
+    from pathlib import Path
+
+    from xerxes.tools.base import BaseTool
+    from xerxes.tools.registry import ToolRegistry
+
+    class SmokeTool(BaseTool):
+        name = "smoke"
+        cli_command = "xerxes-smoke-cli"
+        description = "Smoke test tool"
+        checks = 0
+
+        def is_installed(self) -> bool:
+            SmokeTool.checks += 1
+            return super().is_installed()
+
+    registry = ToolRegistry()
+    registry.register(SmokeTool())
+    original_path = os.environ.get("PATH", "")
+    with tempfile.TemporaryDirectory() as directory:
+        binary = Path(directory) / "xerxes-smoke-cli"
+        binary.write_text("#!/bin/sh\n")
+        binary.chmod(0o755)
+        try:
+            assert registry.find_tool("smoke_execute") is None
+            assert registry.get_function_schemas() == [] and SmokeTool.checks == 1
+
+            os.environ["PATH"] = f"{directory}{os.pathsep}{original_path}"
+            assert registry.find_tool("smoke_execute") is not None, "PATH change was ignored"
+            registry.get_function_schemas()
+            assert SmokeTool.checks == 2, "index rebuilt without a PATH change"
+        finally:
+            os.environ["PATH"] = original_path
+
+    assert registry.find_tool("smoke_execute") is None and SmokeTool.checks == 3
+    print("✓ Tool registry reuses its function index until PATH changes")
+
+
+def check_output_buffer() -> None:
+    from xerxes.tools.capture import OutputBuffer
+    from xerxes.tools.spool import OutputSpool
+
+    small = OutputBuffer(64)
+    small.write(b"ok\n")
+    assert small.getvalue() == "ok\n" and small.dropped_bytes == 0
+
+    ring = OutputBuffer(20)
+    for idx in range(10):
+        ring.write(b"%d" % idx * 5)
+    assert ring.dropped_bytes == 30, ring.dropped_bytes
+    assert ring.getvalue() == "0000011111\n... [30 bytes dropped] ...\n8888899999", ring.getvalue()
+
+    spool = OutputSpool(threshold=32)
+    lines = OutputBuffer(1024, spool=spool)
+    lines.write(b"line 1\nline 2\n")
+    assert lines.finish() is None, "spooled below the threshold"
+    for idx in range(3, 8):
+        lines.write(b"line %d\n" % idx)
+    spooled = lines.finish()
+    assert spooled is not None and spooled.lines == 7 and lines.dropped_bytes == 0, spooled
+    assert spool.head(spooled, 2) == "line 1\nline 2", "buffered bytes lost at switch-over"
+    assert spool.tail(spooled, 1) == "line 7"
+    spool.close()
+    print("✓ Output buffer keeps head and tail and hands over to the spool without losing bytes")
+
+
+def check_persistent_shell() -> None:
+    import threading
+    import time
+
+    from xerxes.tools.shell_session import PersistentShell
+
+    shell = PersistentShell()
+    try:
+        assert shell.run("cd /tmp && export XERXES_SMOKE=kept")["success"]
+        result = shell.run("pwd; echo $XERXES_SMOKE")
+        assert result["stdout"] == "/tmp\nkept" and shell.cwd == "/tmp", result
+
+        result = shell.run("printf partial; echo '__XERXES_fake__ 0 /'; echo oops >&2; false")
+        assert result["stdout"] == "partial__XERXES_fake__ 0 /", result
+        assert result["stderr"] == "oops" and result["exit_code"] == 1, result
+
+        timer = threading.Timer(0.3, shell.interrupt)
+        timer.start()
+        started = time.perf_counter()
+        result = shell.run("sleep 30")
+        assert time.perf_counter() - started < 5 and result["exit_code"] != 0, result
+        assert shell.run("echo alive")["stdout"] == "alive" and shell.starts == 1
+
+        result = shell.run("exit 3")
+        assert result["exit_code"] == 3 and "Shell session exited" in result["stderr"], result
+        result = shell.run("pwd")
+        assert result["stdout"] == "/tmp" and shell.starts == 2, (result, shell.starts)
+
+        result = shell.run("sleep 30", timeout=1)
+        assert "timed out" in result["stderr"] and shell.run("true")["success"], result
+        assert shell.starts == 3, shell.starts
+    finally:
+        shell.close()
+    print("✓ Persistent shell keeps cd/env, survives interrupts and restarts after exit or timeout")
+
+
+def check_compaction() -> None:
+    import json
+
+    from xerxes.agent.compaction import CHARS_PER_TOKEN, ToolResultCompactor
+
+    stdout = "\x1b[31mred\x1b[0m\n" + "same\n" * 50
+    stderr = "\n".join(f"warning {idx}" for idx in range(400))
+    result = {"success": True, "stdout": stdout, "stderr": stderr, "exit_code": 0, "error": None}
+    compactor = ToolResultCompactor(token_budget=400)
+    [entry] = json.loads(compactor.compact([{"tool_call_id": "1", "result": result}]))
+
+    compacted = entry["result"]
+    assert "error" not in compacted and compacted["stdout"].startswith("red\nsame\n"), compacted
+    assert "[previous line repeated 49 more times]" in compacted["stdout"], compacted["stdout"]
+    assert list(compacted["elided"]) == ["stderr"] and "note" in compacted, compacted
+
+    saved = {field: len(result[field]) - len(compacted[field]) for field in ("stdout", "stderr")}
+    expected_tokens = sum(chars // CHARS_PER_TOKEN for chars in saved.values())
+    assert compactor.stats() == {
+        "bytes_saved": sum(saved.values()),
+        "tokens_saved": expected_tokens,
+        "results_elided": 1,
+    }, (compactor.stats(), saved)
+
+    compactor.compact([{"tool_call_id": "2", "result": {"success": True, "stdout": "ok"}}])
+    assert compactor.stats() == {"bytes_saved": 0, "tokens_saved": 0, "results_elided": 0}
+    print("✓ Compaction strips, collapses and truncates, and estimates savings per field")
+
+
+def check_output_spool() -> None:
+    from xerxes.tools.spool import MAX_QUERY_LINES, OutputSpool
+
+    spool = OutputSpool(max_total_bytes=64 * 1024)
+
+    def spooled(data: bytes):
+        handle, file = spool.create()
+        file.write(data)
+        return spool.register(handle, file, data.count(b"\n"), 0)
+
+    empty = spooled(b"")
+    assert spool.head(empty, 5) == spool.tail(empty, 5) == ""
+    assert spool.grep(empty, "x") == ("", 0)
+
+    log = spooled(b"".join(b"line %d\n" % idx for idx in range(1, 1001)) + b"last")
+    assert spool.lines(log, 10, 11) == "line 10\nline 11"
+    assert spool.tail(log, 2) == "line 1000\nlast"
+    assert spool.head(log, 10_000).count("\n") == MAX_QUERY_LINES - 1
+    matches = "\n".join(f"{n}:line {n}" for n in range(990, 1000))
+    assert spool.grep(log, r"^line 99\d$") == (matches, 10)
+
+    trailing = spooled(b"a\nb\n\n\n")
+    assert spool.tail(trailing, 1) == "b"
+
+    invalid = spool.query({"handle": log.handle, "mode": "grep", "pattern": "("})
+    assert not invalid["success"] and "Invalid pattern" in invalid["error"], invalid
+    assert not spool.query({"handle": "out-999"})["success"]
+
+    spooled(b"x" * 60 * 1024)
+    assert spool.get(log.handle) is None, "oldest output survived the spool size cap"
+    assert not os.path.exists(log.path), "evicted spool file left on disk"
+    spool.close()
+    print("✓ Output spool handles empty, unterminated and evicted outputs")
+
+
+def check_session_log() -> None:
+    import json
+    import tempfile
+    from pathlib import Path
+
+    from xerxes.agent.session_log import SessionLog, read_tail, session_path
+
+    path = Path(tempfile.mkdtemp()) / "smoke.jsonl"
+    log = SessionLog(path, fsync_interval=0.01)
+    log.append({"role": "user", "content": "before clear"})
+    log.append({"op": "clear"})
+    for idx in range(4):
+        log.append({"role": "user", "content": f"old {idx}"})
+    log.append({"op": "summary", "content": "Facts so far", "kept": 2})
+    log.append({"role": "user", "content": "new 1"})
+    log.append({"role": "assistant", "content": "new 2"})
+    log.close()
+    assert log.syncs >= 1 and log.error is None, (log.syncs, log.error)
+
+    with open(path, "a") as f:
+        f.write('{"role": "user", "content": "torn')
+
+    lines = path.read_text().splitlines()
+    assert json.loads(lines[0])["session"] == "smoke", lines[0]
+    messages = read_tail(path, max_tokens=10_000)
+    contents = [msg.content for msg in messages]
+    assert contents == ["Facts so far", "old 2", "old 3", "new 1", "new 2"], contents
+    assert messages[0].kind == "summary"
+    assert [msg.content for msg in read_tail(path, max_tokens=1)] == ["new 2"]
+
+    try:
+        session_path("../../etc/passwd")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("session_path accepted a path traversal")
+    print("✓ Session log replays summaries, stops at clears and skips torn lines")
+
+
+def check_summarizer() -> None:
+    import time
+
+    from xerxes.agent.summarizer import SUMMARY_HEADER, HistorySummarizer
+    from xerxes.llm.base import Message
+    from xerxes.llm.scripted import ScriptedProvider, text_response
+
+    transcripts = []
+    llm = ScriptedProvider(
+        [text_response("- pod api-7d9f8 is crashlooping"), text_response("  ")],
+        prepare=lambda messages, *_: transcripts.append(messages[-1].content),
+    )
+    summarizer = HistorySummarizer(llm, max_message_chars=100)
+
+    def wait() -> str | None:
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            summary = summarizer.collect()
+            if summary is not None or not summarizer.pending:
+                return summary
+            time.sleep(0.01)
+        raise AssertionError("summary never finished")
+
+    long_turn = [Message(role="user", content="a" * 500), Message(role="assistant", content="ok")]
+    summarizer.submit(long_turn)
+    summary = wait()
+    assert summary == f"{SUMMARY_HEADER}\n- pod api-7d9f8 is crashlooping", summary
+    assert "[...]" in transcripts[0] and len(transcripts[0]) < 200, transcripts[0]
+
+    summarizer.submit([Message(role="user", content="b")])
+    assert wait() is None and summarizer.failures == 1, "empty summary was accepted"
+    summarizer.close()
+    print("✓ History summarizer trims long messages and rejects empty summaries")
+
+
+def check_batch_runner() -> None:
+    import asyncio
+    import tempfile
+    from pathlib import Path
+
+    from xerxes.agent import core
+    from xerxes.agent.batch import BatchRunner, load_tasks
+    from xerxes.llm.scripted import ScriptedProvider, text_response
+
+    directory = Path(tempfile.mkdtemp())
+    tasks_file = directory / "tasks.yaml"
+    tasks_file.write_text("tasks:\n  - check disk\n  - id: pods\n    prompt: list pods\n")
+    tasks = load_tasks(tasks_file)
+    assert [task.id for task in tasks] == ["1", "pods"], tasks
+    assert [task.prompt for task in tasks] == ["check disk", "list pods"], tasks
+
+    tasks_file.write_text("- prompt: rm -rf build\n  approval: everything\n")
+    try:
+        load_tasks(tasks_file)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown approval policy was accepted")
+
+    llm = ScriptedProvider([text_response("Disk is fine."), text_response("2 pods running.")])
+    reported = []
+    core.console.quiet = True
+    try:
+        results = asyncio.run(BatchRunner(llm, workers=2).run(tasks, on_result=reported.append))
+    finally:
+        core.console.quiet = False
+    assert [result["id"] for result in results] == ["1", "pods"], results
+    assert all(result["status"] == "completed" for result in results), results
+    assert len(reported) == 2 and llm.calls == 2, (reported, llm.calls)
+    assert all(result["session"] is None for result in results), results
+    print("✓ Batch runner loads task files, reports every task and keeps no sessions")
+
+    agent = core.AsyncAgent(llm=_slow_provider(), interactive=False, persist_session=False)
+    try:
+        asyncio.run(asyncio.wait_for(agent.chat("check disk"), 0.05))
+    except asyncio.TimeoutError:
+        pass
+    else:
+        raise AssertionError("cancelled chat did not propagate the cancellation")
+    agent.close()
+    assert agent.turn_status == "cancelled", agent.turn_status
+
+    runner = BatchRunner(_slow_provider(), timeout=0.05)
+    [result] = asyncio.run(runner.run(tasks[:1]))
+    assert result["status"] == "timeout", result
+    print("✓ Cancelled turns propagate and batch tasks report timeouts")
+
+
+def _slow_provider():
+    import asyncio
+
+    from xerxes.llm.scripted import ScriptedProvider, text_response
+
+    class SlowProvider(ScriptedProvider):
+        async def astream_chat(self, *args, **kwargs):
+            await asyncio.sleep(10)
+            async for chunk in super().astream_chat(*args, **kwargs):
+                yield chunk
+
+    return SlowProvider([text_response("too late")])
+
+
+class EchoRegistry:
+    def __init__(self):
+        self.commands = []
+
+    def get_tool(self, name):
+        return None
+
+    def find_tool(self, name):
+        return None
+
+    async def aexecute_function(self, function_name, arguments, on_output=None):
+        import asyncio
+
+        self.commands.append(arguments["command"])
+        await asyncio.sleep(arguments.get("delay", 0))
+        return {"success": True, "stdout": arguments["command"]}
+
+
+def check_parallel_tool_calls() -> None:
+    import asyncio
+    import time
+
+    from xerxes.executor import command
+    from xerxes.executor.command import CommandExecutor
+
+    executor = CommandExecutor(interactive=False)
+    executor.registry = EchoRegistry()
+    executor.settings = executor.settings.model_copy(update={"max_parallel_tool_calls": 4})
+    calls = [("shell", {"command": f"echo {idx}", "delay": 0.2 - idx * 0.05}) for idx in range(4)]
+    command.console.quiet = True
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(executor.aexecute_tool_calls(calls))
+        elapsed = time.perf_counter() - started
+    finally:
+        command.console.quiet = False
+
+    assert [result["stdout"] for result in results] == [f"echo {idx}" for idx in range(4)], results
+    assert elapsed < 0.4, f"tool calls ran one after another ({elapsed:.2f}s)"
+    print("✓ Parallel tool calls run concurrently and return results in call order")
+
+
+def check_stream_parser() -> None:
+    import json
+
+    from xerxes.llm.openai_compat import StreamParser
+
+    def delta(index, name="", arguments="", finish=None):
+        call = {"index": index, "id": f"call_{index}" if name else None}
+        call["function"] = {"name": name, "arguments": arguments}
+        choice = {"delta": {"tool_calls": [call]}, "finish_reason": finish}
+        return "data: " + json.dumps({"choices": [choice]})
+
+    parser = StreamParser()
+    assert not list(parser.feed(delta(0, "shell", '{"command": ')))
+    assert not list(parser.feed(delta(0, arguments='"df -h"}')))
+    [first] = parser.feed(delta(1, "shell", '{"command": "ls'))
+    assert first.tool_call.arguments == {"command": "df -h"}, first
+    [second] = parser.feed(delta(1, arguments='}', finish="tool_calls"))
+    assert second.tool_call.error and '"ls' in second.tool_call.error, second
+    assert second.tool_call.arguments == {}, second
+    [end] = parser.finish()
+    assert end.tool_call is None and end.stop_reason == "tool_calls", end
+    print("✓ Stream parser emits each tool call once complete and flags invalid arguments")
+
+
+def check_policy_denial() -> None:
+    import asyncio
+
+    from xerxes.executor import command
+    from xerxes.executor.command import CommandExecutor
+
+    executor = CommandExecutor(interactive=False, approval_policy="readonly")
+    executor.registry = EchoRegistry()
+    command.console.quiet = True
+    try:
+        results = asyncio.run(executor.aexecute_tool_calls([
+            ("shell", {"command": "kubectl get pods"}),
+            ("shell", {"command": "kubectl delete pod api"}),
+            ("shell", {"command": "df -h"}),
+        ]))
+        single = asyncio.run(executor.aexecute_tool_call("shell", {"command": "touch x"}))
+    finally:
+        command.console.quiet = False
+
+    assert executor.registry.commands == ["kubectl get pods", "df -h"], executor.registry.commands
+    assert results[0]["success"] and results[2]["success"], results
+    assert results[1]["denied"] and "destructive" in results[1]["error"], results[1]
+    assert single["denied"] and "mutating" in single["error"], single
+    assert not any(result.get("skipped") for result in [*results, single])
+    print("✓ Approval policy denies single calls without skipping the rest of the batch")
+
+
+class ReadySummarizer:
+    pending = False
+    ready = False
+
+    def submit(self, messages) -> None:
+        self.pending = True
+
+    def collect(self) -> str | None:
+        if not self.ready:
+            return None
+        self.pending = False
+        return "Facts so far:\n- pod api-7d9f8"
+
+    def discard(self) -> None:
+        self.pending = False
+
+
+def check_result_cache() -> None:
+    from xerxes.tools.result_cache import ResultCache
+
+    cache = ResultCache()
+    key, ttl = cache.prepare("kubectl get pods", "/tmp")
+    assert key is not None and ttl > 0
+    assert cache.get(key, ttl) is None
+    cache.put(key, {"success": True, "stdout": "api"}, cache.generation)
+    assert cache.get(key, ttl)["cached"]
+
+    assert cache.prepare("export KUBECONFIG=/tmp/other", "/tmp") == (None, 0.0)
+    assert cache.get(key, ttl) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "flushes": 1, "entries": 0}
+    print("✓ Result cache flushes when the shell environment changes")
+
+
+def check_history_budget() -> None:
+    from xerxes.agent.compaction import estimate_tokens
+    from xerxes.agent.session import EVICTED, TOOL_RESULT, ChatSession
+
+    session = ChatSession(max_prompt_tokens=1000)
+    session.add_system_message("You are a DevOps agent.")
+
+    def recount() -> int:
+        return sum(estimate_tokens(msg.content) for msg in session.messages)
+
+    for turn in range(40):
+        session.add_message("user", f"check pod api-{turn}")
+        session.add_tool_results("Tool results: " + "r" * 600)
+        assert session.messages[-1].kind == TOOL_RESULT, "tool result evicted before it was read"
+        session.add_message("assistant", f"api-{turn} is running")
+        assert session.raw_token_estimate() == recount(), (turn, session.raw_token_estimate())
+        assert session.token_estimate() <= 1000, session.token_estimate()
+
+    kinds = [msg.kind for msg in session.messages]
+    assert session.messages[0].role == "system" and EVICTED in kinds, kinds
+    assert session.messages[1].role == "user", "history starts mid-turn"
+
+    before = len(session.messages)
+    session.calibrate(2000, 1000)
+    assert session.token_estimate() <= 1000 and len(session.messages) < before
+    assert session.raw_token_estimate() == recount()
+
+    session.add_system_message("You are a terse DevOps agent.")
+    assert session.raw_token_estimate() == recount()
+    session.clear()
+    assert session.raw_token_estimate() == recount() and len(session.messages) == 1
+    print("✓ Chat history stays within the token budget and keeps an exact running total")
+
+
+def check_summary_boundary() -> None:
+    from xerxes.agent.session import SUMMARY, ChatSession
+
+    summarizer = ReadySummarizer()
+    session = ChatSession(max_prompt_tokens=1000, summarizer=summarizer)
+    session.add_system_message("You are a DevOps agent.")
+    turn = 0
+    while not summarizer.pending:
+        session.add_message("user", f"check pod api-{turn} " + "x" * 300)
+        session.add_tool_results("Tool results: " + "r" * 400)
+        session.add_message("assistant", f"api-{turn} is running")
+        turn += 1
+
+    assert session._summary_boundary.kind is None, "summary cut at a tool result"
+    summarizer.ready = True
+    messages = session.get_messages()
+    assert messages[1].kind == SUMMARY, [msg.kind for msg in messages]
+    assert session.token_estimate() <= 1000, session.token_estimate()
+
+    summarizer.ready = False
+    while not summarizer.pending:
+        session.add_message("user", "y" * 300)
+    boundary = session._summary_boundary
+    for _ in range(3):
+        session.calibrate(4000, 1000)
+    assert all(msg is not boundary for msg in session.messages), "boundary was not trimmed"
+    summarizer.ready = True
+    before = len(session.messages)
+    session.get_messages()
+    assert len(session.messages) == before, "summary applied after its boundary was dropped"
+    print("✓ History summaries cut at user prompts and are dropped with their boundary")
+
+
+def measure_cli_import() -> tuple[float, set[str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import xerxes.cli"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = (part.strip() for part in line[len("import time:") :].split("|"))
+        imported.add(module)
+        if module == "xerxes.cli":
+            cumulative_us = int(cumulative)
+
+    return cumulative_us / 1000, imported
+
+
 try:
     import xerxes
     from xerxes.cli import app
@@ -18,6 +860,44 @@ try:
     all_tools = registry.get_all_tools()
     print(f"✓ {len(all_tools)} tools registered")
 
+    from xerxes.executor.safety import classify_command
+
+    for command, risk in {**CLASSIFIER_CASES, **ADVERSARIAL_CASES}.items():
+        actual = classify_command(command).risk
+        assert actual == risk, f"{command!r} classified {actual}, expected {risk}"
+    print(f"✓ Command classifier handles {len(CLASSIFIER_CASES)} sample commands")
+    print(f"✓ Command classifier handles {len(ADVERSARIAL_CASES)} adversarial commands")
+
+    check_loop_detector()
+    check_loop_cycles()
+    check_result_cache()
+    check_compaction()
+    check_history_budget()
+    check_summary_boundary()
+    check_resilient_provider()
+    check_adaptive_limiter()
+    check_hedging()
+    check_vertex_model_cache()
+    check_settings_cache()
+    check_registry_index()
+    check_output_buffer()
+    check_persistent_shell()
+    check_output_spool()
+    check_session_log()
+    check_summarizer()
+    check_batch_runner()
+    check_policy_denial()
+    check_parallel_tool_calls()
+    check_stream_parser()
+
+    import_ms, imported = measure_cli_import()
+    heavy = sorted(module for module in imported if module.startswith(HEAVY_MODULES))
+    assert not heavy, f"xerxes.cli eagerly imports {', '.join(heavy[:5])}"
+    assert import_ms < CLI_IMPORT_THRESHOLD_MS, (
+        f"xerxes.cli import took {import_ms:.0f} ms (threshold {CLI_IMPORT_THRESHOLD_MS} ms)"
+    )
+    print(f"✓ CLI imports in {import_ms:.0f} ms without the Vertex/gRPC stack")
+
     print("\n✅ All smoke tests passed!")
     sys.exit(0)
 